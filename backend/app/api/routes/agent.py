@@ -1,8 +1,9 @@
+import asyncio
 import logging
 import uuid
 from typing import List
 
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, FastAPI
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, FastAPI, Response
 from sqlalchemy.orm import joinedload
 from sqlmodel import select, desc
 
@@ -11,7 +12,9 @@ from app.crud import create_run
 from app.models import AgentRun, AgentRunsPublic, Event, AgentRunPublic, AgentRunAndEventsPublic
 
 # Importer l'agent
-from app.monitoring_agent.main import run
+from app.monitoring_agent.graph_image import graph_images
+from app.monitoring_agent.main import get_graph, run
+from app.monitoring_agent.tools.prometheus_tool import promql_cache
 from app.websocket.websocket import manager
 
 router = APIRouter()
@@ -58,3 +61,24 @@ async def get_run(session: SessionDep, current_user: CurrentUser, id: uuid.UUID)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     return run
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(current_user: CurrentUser) -> dict:
+    """
+    Get the hit and miss counters of the PromQL result cache
+    """
+    return {"promql": promql_cache.stats()}
+
+
+@router.get("/graph.png")
+async def get_graph_image(current_user: CurrentUser) -> Response:
+    """
+    Get the image of the workflow graph, rendered once per version of the graph
+    """
+    try:
+        image = await asyncio.to_thread(graph_images.get, get_graph())
+    except Exception as e:
+        logging.error(f"Exception when rendering the graph image: {e}")
+        raise HTTPException(status_code=502, detail=f"Could not render the graph image: {e}")
+    return Response(content=image, media_type="image/png")
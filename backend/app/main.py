@@ -1,3 +1,6 @@
+import os
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from fastapi import FastAPI, WebSocketDisconnect, WebSocket
 from fastapi.routing import APIRoute
@@ -5,6 +8,7 @@ from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.monitoring_agent.llm import agent_models, escalation_model, llm_cache, llm_clients, stream_tokens
 from app.websocket.websocket import manager
 
 
@@ -15,8 +19,21 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the connections of the LLM client before the first run
+    if os.getenv("LLM_WARM_UP", "false").lower() == "true":
+        # Models of all the agents and the escalation model, the OpenAI ones share the same connection pool
+        models = {os.getenv("LLM_MODEL", "gpt-3.5-turbo"), *agent_models.values(), escalation_model}
+        for model in sorted(model for model in models if model.startswith("gpt")):
+            await llm_clients.warm(model, cache=llm_cache, streaming=stream_tokens)
+    yield
+    await llm_clients.aclose()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
 )
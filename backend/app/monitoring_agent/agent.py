@@ -1,55 +1,38 @@
 import logging
 
 from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_experimental.llms.ollama_functions import OllamaFunctions
-from langchain_openai import ChatOpenAI
 
 from app.monitoring_agent.tools.tool_binder import extract_tool_metadata
 
 
-def create_agent(llm, tools, system_message: str):
+def create_agent(llm, tools, system_prompt: str):
     """
-    Create and agent with the given LLM and tools.
+    Create and agent with the given LLM and tools. The compiled system prompt comes first, then the messages and
+    finally the volatile values of the run, so the beginning of the prompt stays the same across calls.
     """
-    system_message_text = (
-        "You are a helpful AI assistant, collaborating with other assistants."
-        " Use the provided tools to progress towards answering the question."
-        " If you are unable to fully answer, that's OK, another assistant with different tools "
-        " will help where you left off. Execute what you can to make progress."
-        " If you or any of the other assistants struggle with the question, you can all decide to stop,"
-        " do it by prefix your response with UNSUCCESSFUL and give a summary of the progress made so far."
-        " If you successfully answer the question and no diagnostic is needed, do it by prefix your response with"
-        " FINISHED."
-    )
-
-    if tools:
-        system_message_text += " You have access to the following tools: {tool_names}."
-
-    system_message_text += " {system_message}"
-
     prompt = ChatPromptTemplate.from_messages(
         [
-            ("system", system_message_text),
+            SystemMessage(content=system_prompt),
             MessagesPlaceholder(variable_name="messages"),
+            MessagesPlaceholder(variable_name="volatile", optional=True),
         ]
     )
-    prompt = prompt.partial(system_message=system_message)
-
-    if tools:
-        prompt = prompt.partial(tool_names=", ".join([tool.name for tool in tools]))
 
     # Bind the tools to the LLM
     # Note: This is a temporary solution until we have a better way to handle tools with Ollama. To call tools with
     # Ollama we have to user OllamaFunctions which is an experimental feature from LangChain. If no tools are needed for
     # a task, better use Ollama directly.
     if tools:
-        if isinstance(llm, ChatOpenAI):
-            prompt_with_llm = prompt | llm.bind_tools(tools)
-        elif isinstance(llm, OllamaFunctions):
+        if isinstance(llm, OllamaFunctions):
             binded_tools = [extract_tool_metadata(tool) for tool in tools]
             print("binded_tools: ", binded_tools)
             prompt_with_llm = prompt | llm.bind_tools(tools=tools)
+        elif isinstance(llm, BaseChatModel):
+            # ChatOpenAI and the other chat models implementing bind_tools, like the scripted model of the benchmarks
+            prompt_with_llm = prompt | llm.bind_tools(tools)
         else:
             raise Exception("Unsupported LLM model")
     else:
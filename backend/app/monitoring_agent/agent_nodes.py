@@ -1,35 +1,48 @@
 import functools
+import logging
 import os
 
 from langchain_core.messages import AIMessage, ToolMessage
 
 from app.monitoring_agent.agent import create_agent
-from app.monitoring_agent.llm import get_llm
-from app.monitoring_agent.prompts import tasks_config
+from app.monitoring_agent.llm import agent_model, escalation_model, get_llm
+from app.monitoring_agent.model_routing import escalation_reason, model_provider
+from app.monitoring_agent.prompt_compiler import compile_system_prompt, volatile_messages
+from app.monitoring_agent.views import full_view, parse_views
 from app.monitoring_agent.tools.kubernetes_tool import get_pod_names, get_pod_logs, get_nodes_resources, get_pod_yaml, \
-    get_pod_resources
-from app.monitoring_agent.tools.prometheus_tool import execute_prometheus_query
+    get_pod_resources, get_namespace_resources
+from app.monitoring_agent.tools.prometheus_tool import execute_prometheus_query, execute_prometheus_queries, \
+    execute_prometheus_range_query
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 
+# Messages seen by each agent, the solution and the incident reporter only need the conclusions of the others
+agent_views = parse_views(os.getenv("AGENT_MESSAGE_VIEWS", "solution=conclusions,incident_reporter=findings"))
 
-def parse_config(config):
-    """
-    Helper function to parse the configuration for the system message.
-    """
-    return f"role: {config['role']}, goal: {config['goal']}, backstory: {config['backstory']}, description: {config['description']}, expected_output: {config['expected_output']}, examples: {config['examples']}"
 
-
-def agent_node(state, agent, name):
+async def agent_node(state, agent, name, escalation=None, tools=()):
     """
-    Helper function to create a node for a given agent.
+    Helper function to create a node for a given agent. The response is generated again by the escalation agent when
+    the agent gives up or calls the tools wrongly.
     """
-    result = agent.invoke(state)
+    view = agent_views.get(name, full_view)
+    input = {"messages": view(state["messages"]), "volatile": volatile_messages(state)}
+    # The agents are awaited so the shared async HTTP client of the LLM is used
+    result = await agent.ainvoke(input)
+    reason = escalation_reason(result, tools) if escalation is not None and isinstance(result, AIMessage) else None
+    if reason:
+        logging.warning(f"Escalating {name} to {escalation_model}: {reason}")
+        # The rejected response may already be streamed, the clients drop it when the escalation starts
+        result = await escalation.ainvoke(input, config={"metadata": {"discarded_message_id": result.id}})
     # We convert the agent output into a format that is suitable to append to the global state
     if isinstance(result, ToolMessage):
         pass
     else:
-        result = AIMessage(**result.dict(exclude={"type", "name"}), name=name)
+        # The id of the response tags its streamed tokens. A replayed response already in the state gets a new id, so
+        # it does not replace the message it was recorded from.
+        known_ids = {message.id for message in state["messages"]}
+        exclude = {"type", "name", "id"} if result.id in known_ids else {"type", "name"}
+        result = AIMessage(**result.dict(exclude=exclude), name=name)
     return {
         "messages": [result],
         # Since we have a strict workflow, we can track the sender so we know who to pass to next.
@@ -38,36 +51,32 @@ def agent_node(state, agent, name):
 
 
 # Define the tools available for each agent
-metric_analyser_tools = [get_pod_names, execute_prometheus_query, get_pod_resources, get_nodes_resources]
-diagnostic_tools = [execute_prometheus_query, get_pod_logs, get_pod_yaml, get_pod_resources]
+metric_analyser_tools = [get_pod_names, execute_prometheus_query, execute_prometheus_queries,
+                         execute_prometheus_range_query, get_namespace_resources, get_pod_resources,
+                         get_nodes_resources]
+diagnostic_tools = [execute_prometheus_query, execute_prometheus_range_query, get_pod_logs, get_pod_yaml,
+                    get_pod_resources]
 solution_tools = []
 incident_tools = []
 
-# Create an agent for each task
-metric_analyser_agent = create_agent(
-    get_llm(metric_analyser_tools),
-    metric_analyser_tools,
-    system_message=parse_config(tasks_config["analyse_metric_task"]),
-)
-metric_analyser_node = functools.partial(agent_node, agent=metric_analyser_agent, name="metric_analyser")
 
-diagnostic_agent = create_agent(
-    get_llm(diagnostic_tools),
-    diagnostic_tools,
-    system_message=parse_config(tasks_config["diagnose_issue_task"]),
-)
-diagnostic_node = functools.partial(agent_node, agent=diagnostic_agent, name="diagnostic")
+def create_agent_node(name: str, task: str, tools):
+    """
+    Create the node of an agent with the model of its policy. An agent which does not use the escalation model
+    escalates to an agent with the same prompt and tools on the escalation model, when both models are served by the
+    same provider.
+    """
+    system_prompt = compile_system_prompt(task, tuple(tool.name for tool in tools))
+    model = agent_model(name)
+    agent = create_agent(get_llm(tools, model), tools, system_prompt=system_prompt)
+    escalation = None
+    if escalation_model and model != escalation_model and model_provider(model) == model_provider(escalation_model):
+        escalation = create_agent(get_llm(tools, escalation_model), tools, system_prompt=system_prompt)
+    return functools.partial(agent_node, agent=agent, name=name, escalation=escalation, tools=tools)
 
-solution_agent = create_agent(
-    get_llm(solution_tools),
-    solution_tools,
-    system_message=parse_config(tasks_config["provide_solution_task"]),
-)
-solution_node = functools.partial(agent_node, agent=solution_agent, name="solution")
 
-incident_reporter_agent = create_agent(
-    get_llm(incident_tools),
-    incident_tools,
-    system_message=parse_config(tasks_config["report_incident_task"]),
-)
-incident_reporter_node = functools.partial(agent_node, agent=incident_reporter_agent, name="incident_reporter")
+# Create an agent for each task
+metric_analyser_node = create_agent_node("metric_analyser", "analyse_metric_task", metric_analyser_tools)
+diagnostic_node = create_agent_node("diagnostic", "diagnose_issue_task", diagnostic_tools)
+solution_node = create_agent_node("solution", "provide_solution_task", solution_tools)
+incident_reporter_node = create_agent_node("incident_reporter", "report_incident_task", incident_tools)
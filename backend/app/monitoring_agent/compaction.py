@@ -0,0 +1,92 @@
+import logging
+import math
+import os
+from typing import Callable, List, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, ToolMessage
+
+from app.monitoring_agent.agent_nodes import agent_views
+from app.monitoring_agent.edge import router
+from app.monitoring_agent.views import full_view
+
+# Token budget of the messages given to the agents after the compaction
+token_budgets = {
+    "solution": int(os.getenv("SOLUTION_TOKEN_BUDGET", "6000")),
+    "incident_reporter": int(os.getenv("INCIDENT_REPORTER_TOKEN_BUDGET", "6000")),
+}
+
+# Tool outputs smaller than this are kept as they are
+min_tokens = int(os.getenv("COMPACTION_MIN_TOKENS", "200"))
+
+summary_chars = int(os.getenv("COMPACTION_SUMMARY_CHARS", "600"))
+
+
+def estimate_tokens(message: BaseMessage) -> int:
+    """
+    Estimate the number of tokens of a message, about 4 characters per token
+    """
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return math.ceil(len(content) / 4)
+
+
+def summarize(message: BaseMessage, max_chars: int) -> BaseMessage:
+    """
+    Keep the beginning of the content of a message, where the tools put their headers and most relevant rows
+    """
+    tokens = estimate_tokens(message)
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    summary = f"{content[:max_chars]}\n[compacted, {tokens} tokens originally]"
+    return message.copy(update={"content": summary})
+
+
+def compact_messages(messages: Sequence[BaseMessage], budget: int,
+                     view: Callable[[Sequence[BaseMessage]], List[BaseMessage]] = full_view
+                     ) -> Tuple[List[BaseMessage], int]:
+    """
+    Replace the tool outputs by their summary, then shrink the largest messages until the messages seen by the next
+    agent through its view fit in the budget. A message is only shrunk when it makes the view smaller. The first
+    message (the request) and the last one (the conclusion of the previous agent) are kept. Returns the replaced
+    messages, with the id of the originals, and the number of tokens saved.
+    """
+    compacted = {
+        message.id: summarize(message, summary_chars)
+        for message in messages
+        if isinstance(message, ToolMessage) and estimate_tokens(message) > min_tokens
+    }
+
+    def current(message: BaseMessage) -> BaseMessage:
+        return compacted.get(message.id, message)
+
+    def view_tokens() -> int:
+        return sum(estimate_tokens(message) for message in view([current(message) for message in messages]))
+
+    total = view_tokens()
+    shrinkable = sorted(messages[1:-1], key=lambda message: estimate_tokens(current(message)), reverse=True)
+    for message in shrinkable:
+        if total <= budget:
+            break
+        previous = compacted.get(message.id)
+        compacted[message.id] = summarize(message, summary_chars)
+        shrunk = view_tokens()
+        if shrunk < total:
+            total = shrunk
+        elif previous is None:
+            del compacted[message.id]
+        else:
+            compacted[message.id] = previous
+
+    saved = sum(estimate_tokens(message) for message in messages if message.id in compacted) - \
+        sum(estimate_tokens(message) for message in compacted.values())
+    return list(compacted.values()), saved
+
+
+def compaction_node(state):
+    """
+    Compact the messages once the diagnostic agent is done, within the token budget of the messages seen by the next
+    agent. The messages are replaced in the state by their id.
+    """
+    next_agent = "solution" if router(state) == "continue" else "incident_reporter"
+    messages, saved = compact_messages(state["messages"], token_budgets[next_agent],
+                                       agent_views.get(next_agent, full_view))
+    logging.info(f"Compaction before {next_agent}: {len(messages)} messages compacted, {saved} tokens saved")
+    return {"messages": messages, "tokens_saved": saved}
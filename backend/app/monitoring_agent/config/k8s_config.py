@@ -1,4 +1,7 @@
 import logging
+import threading
+from datetime import datetime
+
 from google.auth.transport.requests import Request
 from google.oauth2 import service_account
 from kubernetes import client
@@ -10,15 +13,29 @@ class KubernetesConfig:
     Manage the configuration of the Kubernetes client
     """
 
-    def __init__(self, kube_host: str, credentials_path: str, scopes: list):
+    def __init__(self, kube_host: str, credentials_path: str, scopes: list, pool_size: int = 10, debug: bool = False,
+                 refresh_margin: float = 300.0):
         """
         Initialize the Kubernetes configuration
+
+        Parameters:
+        - pool_size (int): The size of the HTTP connection pool shared by all the API clients.
+        - debug (bool): Log every HTTP request and response body.
+        - refresh_margin (float): Seconds before the expiry of the access token at which it is refreshed.
         """
         self.kube_host = kube_host
         self.credentials_path = credentials_path
         self.scopes = scopes
+        self.pool_size = pool_size
+        self.debug = debug
+        self.refresh_margin = refresh_margin
+        self.credentials = None
         self.configuration = None
+        self.api_client = None
         self.v1 = None
+        self.custom_objects = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
 
     def authenticate(self):
         """
@@ -31,24 +48,73 @@ class KubernetesConfig:
 
         # Get access token
         credentials.refresh(Request())
+        self.credentials = credentials
 
-        # Configure the Kubernetes client
+        # Configure the Kubernetes client, the configuration is passed explicitly to the clients instead of being
+        # installed as the global default
         self.configuration = client.Configuration()
         self.configuration.host = self.kube_host
         self.configuration.verify_ssl = False
-        self.configuration.debug = True
+        self.configuration.debug = self.debug
+        self.configuration.connection_pool_maxsize = self.pool_size
         self.configuration.api_key = {"authorization": "Bearer " + credentials.token}
-        client.Configuration.set_default(self.configuration)
-        self.v1 = client.CoreV1Api()
+        self.configuration.refresh_api_key_hook = self._refresh_api_key
+        self.api_client = client.ApiClient(self.configuration)
+        self.v1 = client.CoreV1Api(self.api_client)
+
+    def _seconds_before_expiry(self) -> float:
+        if not self.credentials.expiry:
+            return float("inf")
+        return (self.credentials.expiry - datetime.utcnow()).total_seconds()
+
+    def _refresh_token(self):
+        """
+        Refresh the access token unless another thread already did it
+        """
+        with self._refresh_lock:
+            if self._seconds_before_expiry() > self.refresh_margin:
+                return
+            try:
+                credentials = service_account.Credentials.from_service_account_file(
+                    self.credentials_path, scopes=self.scopes
+                )
+                credentials.refresh(Request())
+                self.credentials = credentials
+                self.configuration.api_key = {"authorization": "Bearer " + credentials.token}
+            except Exception as e:
+                logging.error(f"Exception when refreshing the Kubernetes access token: {e}")
+
+    def _refresh_api_key(self, configuration):
+        """
+        Hook called by the Kubernetes client before each request. The token is refreshed in the background when it
+        gets close to its expiry, so in-flight calls keep using the current one. Calls only wait for the refresh once
+        the token has actually expired.
+        """
+        remaining = self._seconds_before_expiry()
+        if remaining <= 0:
+            self._refresh_token()
+        elif remaining <= self.refresh_margin and not self._refresh_lock.locked():
+            threading.Thread(target=self._refresh_token, name="kubernetes-token-refresh", daemon=True).start()
 
     def get_client(self):
         """
         Singleton method to get the Kubernetes client
         """
         if not self.v1:
-            self.authenticate()
+            with self._lock:
+                if not self.v1:
+                    self.authenticate()
         return self.v1
 
+    def get_custom_objects_client(self):
+        """
+        Singleton method to get the Kubernetes custom objects client, used for the metrics API
+        """
+        if not self.custom_objects:
+            self.get_client()
+            self.custom_objects = client.CustomObjectsApi(self.api_client)
+        return self.custom_objects
+
 
 class GoogleCloudLogging:
     """
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class PrometheusError(Exception):
+    """
+    Error returned by the Prometheus HTTP API
+    """
+
+
+class PrometheusClient:
+    """
+    Process-wide Prometheus client sharing a pooled keep-alive HTTP session and a cached health state
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0, connect_timeout: float = 3.0, pool_size: int = 10,
+                 health_interval: float = 30.0, retries: int = 2):
+        """
+        Initialize the Prometheus client configuration
+        """
+        self.url = url.rstrip("/")
+        self.timeout = (connect_timeout, timeout)
+        self.pool_size = pool_size
+        self.health_interval = health_interval
+        self.retries = retries
+        self.session = None
+        self._healthy = None
+        self._health_checked_at = 0.0
+        self._health_thread = None
+        self._lock = threading.Lock()
+
+    def get_session(self) -> requests.Session:
+        """
+        Singleton method to get the pooled HTTP session
+        """
+        if not self.session:
+            with self._lock:
+                if not self.session:
+                    retry = Retry(
+                        total=self.retries,
+                        backoff_factor=0.2,
+                        status_forcelist=[502, 503, 504],
+                        allowed_methods=["GET", "POST"],
+                    )
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+                    session = requests.Session()
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    session.verify = False
+                    self.session = session
+        return self.session
+
+    def _get(self, path: str, params: dict) -> dict:
+        """
+        Send a GET request to the Prometheus HTTP API and return the data of the response
+        """
+        try:
+            response = self.get_session().get(f"{self.url}{path}", params=params, timeout=self.timeout)
+        except requests.ConnectionError:
+            self._set_health(False)
+            raise
+
+        self._set_health(True)
+        try:
+            payload = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise PrometheusError(f"Invalid response from Prometheus: {response.text[:200]}")
+
+        if payload.get("status") != "success":
+            raise PrometheusError(f"{payload.get('errorType', 'error')}: {payload.get('error', response.text[:200])}")
+        return payload["data"]
+
+    def query(self, query: str, time: float | None = None) -> list:
+        """
+        Evaluate an instant query, optionally at the given unix timestamp
+        """
+        params = {"query": query}
+        if time is not None:
+            params["time"] = time
+        return self._get("/api/v1/query", params)["result"]
+
+    def query_range(self, query: str, start: float, end: float, step: float) -> list:
+        """
+        Evaluate a range query and return the matrix result
+        """
+        params = {"query": query, "start": start, "end": end, "step": step}
+        return self._get("/api/v1/query_range", params)["result"]
+
+    def check_health(self) -> bool:
+        """
+        Check the Prometheus health endpoint and update the cached health state
+        """
+        try:
+            response = self.get_session().get(f"{self.url}/-/healthy", timeout=self.timeout)
+            healthy = response.ok
+        except requests.RequestException as e:
+            logging.error(f"Prometheus health check failed: {e}")
+            healthy = False
+        self._set_health(healthy)
+        return healthy
+
+    def is_healthy(self) -> bool:
+        """
+        Return the cached health state, refreshed in the background and by every query. An unknown or healthy state is
+        returned without sending a request, so the first query is not delayed. An unhealthy state is checked again
+        with the health endpoint, so the queries go through as soon as Prometheus is back.
+        """
+        self._start_health_thread()
+        if self._healthy is False:
+            return self.check_health()
+        return True
+
+    def _set_health(self, healthy: bool):
+        self._healthy = healthy
+        self._health_checked_at = time.monotonic()
+
+    def _start_health_thread(self):
+        if self._health_thread is not None or self.health_interval <= 0:
+            return
+        with self._lock:
+            if self._health_thread is None:
+                self._health_thread = threading.Thread(
+                    target=self._health_loop, name="prometheus-health", daemon=True
+                )
+                self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            # Skip the check when a query recently reported the state
+            if time.monotonic() - self._health_checked_at >= self.health_interval:
+                self.check_health()
+            time.sleep(self.health_interval)
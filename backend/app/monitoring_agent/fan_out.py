@@ -0,0 +1,90 @@
+from typing import List
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.constants import Send
+
+
+def analysis_request(namespaces: List[str]) -> HumanMessage:
+    """
+    Message asking to analyse the metrics of the pods of the namespaces. The current time is given to the agents at
+    the end of their prompt.
+    """
+    return HumanMessage(
+        content=f"Check the metrics for all pods in the following namespaces {', '.join(namespaces)}, "
+                f"and if needed run a diagnostic and find solutions to any issue."
+    )
+
+
+def namespace_table(verdict_table: str, namespace: str) -> str:
+    """
+    Keep the header and the rows of a namespace from the pre-analysis verdict table
+    """
+    lines = verdict_table.splitlines()
+    return "\n".join([lines[0], *[line for line in lines[1:] if line.startswith(f"{namespace} | ")]])
+
+
+def fan_out(state) -> List[Send]:
+    """
+    Edge starting an independent analysis branch for each namespace. Each branch only receives the request and the
+    pre-analysis of its namespace, so its context stays small.
+    """
+    sends = []
+    for namespace in state["namespaces"]:
+        messages = [analysis_request([namespace])]
+        if state.get("verdict_table"):
+            messages.append(HumanMessage(
+                content=f"Pre-analysis of the trigger criteria for every pod, computed from Prometheus and the "
+                        f"resources allocated in Kubernetes. Start your analysis from these numbers and only query "
+                        f"further metrics when needed:\n{namespace_table(state['verdict_table'], namespace)}",
+                name="pre_analysis",
+            ))
+        sends.append(Send("namespace_analyser", {
+            "namespace": namespace, "messages": messages, "current_time": state["current_time"]
+        }))
+    return sends
+
+
+async def namespace_analyser_node(state, config, graph):
+    """
+    Run the metric analysis of a single namespace in its own graph and keep only its final report
+    """
+    result = await graph.ainvoke(
+        {"namespace": state["namespace"], "messages": state["messages"], "current_time": state["current_time"]}, config
+    )
+    return {"findings": [{"namespace": state["namespace"], "report": result["messages"][-1].content}]}
+
+
+def report_decision(report: str) -> str:
+    """
+    Decision of a namespace report with the precedence of the router: a report without any keyword continues to the
+    diagnostic
+    """
+    if "DIAGNOSTIC NEEDED" in report:
+        return "DIAGNOSTIC NEEDED"
+    if "UNSUCCESSFUL" in report:
+        return "UNSUCCESSFUL"
+    if "FINISHED" in report:
+        return "FINISHED"
+    return "DIAGNOSTIC NEEDED"
+
+
+def merge_findings_node(state):
+    """
+    Merge the reports of the namespace branches in a single metric analyser message. A diagnostic is needed as soon
+    as one namespace needs it, the run is only unsuccessful when no namespace could be analysed.
+    """
+    findings = sorted(state["findings"], key=lambda finding: finding["namespace"])
+    decisions = [report_decision(finding["report"]) for finding in findings]
+
+    if "DIAGNOSTIC NEEDED" in decisions:
+        decision = "DIAGNOSTIC NEEDED"
+    elif all(decision == "UNSUCCESSFUL" for decision in decisions):
+        decision = "UNSUCCESSFUL"
+    else:
+        decision = "FINISHED"
+
+    content = "\n\n".join([f"Namespace {finding['namespace']}:\n{finding['report']}" for finding in findings])
+    return {
+        "messages": [AIMessage(content=f"{content}\n\n{decision}", name="metric_analyser")],
+        "sender": "metric_analyser",
+    }
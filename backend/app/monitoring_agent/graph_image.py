@@ -0,0 +1,62 @@
+import hashlib
+import os
+import sys
+import threading
+from typing import Dict
+
+
+def graph_version(graph) -> str:
+    """
+    Version of a compiled graph, the hash of its Mermaid definition which is generated locally
+    """
+    return hashlib.sha256(graph.get_graph(xray=1).draw_mermaid().encode()).hexdigest()[:12]
+
+
+class GraphImageCache:
+    """
+    PNG images of the compiled graphs, rendered at most once per graph version. Rendering calls the mermaid.ink API, so
+    the images are kept in memory and in a directory where they survive restarts.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize the cache.
+
+        Parameters:
+        - directory (str): Directory of the rendered images, created on the first render.
+        """
+        self.directory = directory
+        self.images: Dict[str, bytes] = {}
+        self.lock = threading.Lock()
+
+    def get(self, graph) -> bytes:
+        """
+        Get the PNG image of a graph, rendered when its version was never rendered before
+        """
+        version = graph_version(graph)
+        with self.lock:
+            if version not in self.images:
+                path = os.path.join(self.directory, f"graph-{version}.png")
+                if os.path.exists(path):
+                    with open(path, "rb") as file:
+                        self.images[version] = file.read()
+                else:
+                    image = graph.get_graph(xray=1).draw_mermaid_png()
+                    os.makedirs(self.directory, exist_ok=True)
+                    with open(path, "wb") as file:
+                        file.write(image)
+                    self.images[version] = image
+            return self.images[version]
+
+
+graph_images = GraphImageCache(os.getenv("GRAPH_IMAGE_DIR", ".graph"))
+
+
+if __name__ == "__main__":
+    # Export the image of the workflow graph: python -m app.monitoring_agent.graph_image [graph.png]
+    from app.monitoring_agent.main import get_graph
+
+    output = sys.argv[1] if len(sys.argv) > 1 else "graph.png"
+    with open(output, "wb") as output_file:
+        output_file.write(graph_images.get(get_graph()))
+    print(f"Graph image written to {output}")
@@ -2,16 +2,58 @@ import os
 
 from langchain_community.llms.ollama import Ollama
 from langchain_experimental.llms.ollama_functions import OllamaFunctions
-from langchain_openai import ChatOpenAI
 
+from app.monitoring_agent.llm_cache import create_llm_cache
+from app.monitoring_agent.llm_clients import LLMClientRegistry
+from app.monitoring_agent.model_routing import model_provider, parse_models
 
-def get_llm(tools):
+# Recorded responses of the LLM to run the graph deterministically in development and benchmarks
+llm_cache = create_llm_cache(
+    os.getenv("LLM_CACHE_MODE", "passthrough"),
+    os.getenv("LLM_CACHE_DIR", ".llm_cache"),
+    int(os.getenv("LLM_CACHE_MAX_BYTES", str(100 * 1024 * 1024))),
+)
+
+# Forward the tokens to the WebSocket while the responses are generated
+stream_tokens = os.getenv("AGENT_STREAM_TOKENS", "true").lower() == "true"
+
+# Clients shared by all the agents and the concurrent runs
+llm_clients = LLMClientRegistry(
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10")),
+    keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60")),
+)
+
+
+# The OpenAI models of the agents and of the escalation are only the default when LLM_MODEL is an OpenAI model, so a
+# deployment on another provider never sends its prompts to OpenAI
+openai_defaults = model_provider(os.getenv("LLM_MODEL", "gpt-3.5-turbo")) == "openai"
+
+# Model of each agent, the other agents use LLM_MODEL. A fast model triages the metrics and writes the report, a
+# stronger one runs the diagnostic.
+agent_models = parse_models(os.getenv(
+    "AGENT_MODELS", "metric_analyser=gpt-4o-mini,incident_reporter=gpt-4o-mini,diagnostic=gpt-4o" if openai_defaults
+    else ""
+))
+
+# Model generating again the response of an agent which gave up or called the tools wrongly, empty to disable
+escalation_model = os.getenv("LLM_ESCALATION_MODEL", "gpt-4o" if openai_defaults else "")
+
+
+def agent_model(name: str) -> str:
+    """
+    Get the model of an agent
+    """
+    return agent_models.get(name, os.getenv("LLM_MODEL", "gpt-3.5-turbo"))
+
+
+def get_llm(tools, model: str | None = None):
     """
-    Get the LLM model to use for the monitoring agent.
+    Get the LLM model to use for the monitoring agent, LLM_MODEL by default.
     """
-    model = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+    model = model or os.getenv("LLM_MODEL", "gpt-3.5-turbo")
     if model.startswith("gpt"):
-        return ChatOpenAI(model=model, temperature=0)
+        return llm_clients.get_chat_openai(model, cache=llm_cache, streaming=stream_tokens)
     elif model == "llama3":
         # EXPERIMENTAL OllamaFunctions
         # TODO: Currently does not work
@@ -24,12 +66,14 @@ def get_llm(tools):
                 keep_alive=-1,
                 temperature=0,
                 max_new_tokens=512,
-                format="json"
+                format="json",
+                cache=llm_cache
             )
         else:
             return Ollama(
                 model=model,
                 base_url=ollama_base_url,
                 keep_alive=-1,
-                temperature=0
+                temperature=0,
+                cache=llm_cache
             )
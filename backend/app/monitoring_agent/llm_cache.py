@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+# Modes of the recorded responses: record calls the provider on a miss and stores the response, replay only serves
+# stored responses and passthrough always calls the provider
+llm_cache_modes = ["record", "replay", "passthrough"]
+
+
+class LLMCacheMiss(Exception):
+    """
+    Raised in replay mode when no response was recorded for a call
+    """
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Remove from the serialized messages of a call the values changing at every run: the ids given to the messages by
+    the graph and the volatile messages, like the current time
+    """
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    if not isinstance(messages, list):
+        return prompt
+
+    normalized = []
+    for message in messages:
+        kwargs = message.get("kwargs", {}) if isinstance(message, dict) else {}
+        if kwargs.get("additional_kwargs", {}).get("volatile"):
+            continue
+        if kwargs:
+            message = {**message, "kwargs": {key: value for key, value in kwargs.items() if key != "id"}}
+        normalized.append(message)
+    return json.dumps(normalized, sort_keys=True)
+
+
+class RecordedResponseCache(BaseCache):
+    """
+    On-disk store of the LLM responses. LangChain keys the calls on the model parameters with the bound tools and on
+    the serialized messages, normalized so the key is the same across runs. Each response is stored in a file named by
+    the hash of this key. The least recently used responses are evicted once the store exceeds its size.
+    """
+
+    def __init__(self, path: str, mode: str = "record", max_bytes: int = 100 * 1024 * 1024):
+        """
+        Initialize the store.
+
+        Parameters:
+        - path (str): Directory of the recorded responses.
+        - mode (str): record or replay.
+        - max_bytes (int): Maximum size of the recorded responses.
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unsupported LLM cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, prompt: str, llm_string: str) -> str:
+        key = hashlib.sha256(f"{llm_string}\n{normalize_prompt(prompt)}".encode()).hexdigest()
+        return os.path.join(self.path, f"{key}.json")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        file = self._file(prompt, llm_string)
+        try:
+            with open(file) as f:
+                generations = loads(f.read())
+            # Mark the response as recently used for the eviction
+            os.utime(file)
+            return generations
+        except FileNotFoundError:
+            if self.mode == "replay":
+                raise LLMCacheMiss(f"No recorded LLM response for {os.path.basename(file)}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        file = self._file(prompt, llm_string)
+        with self.lock:
+            with open(f"{file}.tmp", "w") as f:
+                f.write(dumps(return_val))
+            os.replace(f"{file}.tmp", file)
+            self._evict()
+
+    def _evict(self):
+        entries = [entry for entry in os.scandir(self.path) if entry.name.endswith(".json")]
+        size = sum(entry.stat().st_size for entry in entries)
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            if size <= self.max_bytes:
+                break
+            size -= entry.stat().st_size
+            os.remove(entry.path)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self.lock:
+            for entry in os.scandir(self.path):
+                if entry.name.endswith(".json"):
+                    os.remove(entry.path)
+
+
+def create_llm_cache(mode: str, path: str, max_bytes: int) -> RecordedResponseCache | None:
+    """
+    Create the store of the recorded responses, None in passthrough mode
+    """
+    if mode not in llm_cache_modes:
+        raise ValueError(f"Unsupported LLM cache mode: {mode}, expected one of {', '.join(llm_cache_modes)}")
+    if mode == "passthrough":
+        return None
+    logging.info(f"LLM responses are {mode}ed in {path}")
+    return RecordedResponseCache(path, mode=mode, max_bytes=max_bytes)
@@ -0,0 +1,101 @@
+import logging
+import os
+import threading
+from typing import Dict, List, Tuple
+
+import httpx
+from langchain_core.caches import BaseCache
+from langchain_openai import ChatOpenAI
+
+OPENAI_API_BASE = "https://api.openai.com/v1"
+
+
+class LLMClientRegistry:
+    """
+    Registry of the LLM clients shared by the agents and the concurrent runs. One pooled HTTP client with keep-alive is
+    built per provider and endpoint, and one chat model per model, cache and streaming mode on top of it. Clients are
+    created on first use or warmed at startup.
+    """
+
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10, keepalive_expiry: float = 60.0,
+                 timeout: float = 120.0):
+        """
+        Initialize the registry.
+
+        Parameters:
+        - max_connections (int): Maximum number of connections of a pool.
+        - max_keepalive_connections (int): Maximum number of idle connections kept alive in a pool.
+        - keepalive_expiry (float): Seconds after which an idle connection is closed.
+        - timeout (float): Timeout of the requests in seconds.
+        """
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = timeout
+        self.http_clients: Dict[Tuple[str, str], Tuple[httpx.Client, httpx.AsyncClient]] = {}
+        self.transports: List[Tuple[httpx.HTTPTransport, httpx.AsyncHTTPTransport]] = []
+        self.chat_models: Dict[Tuple[str, str, int, bool], ChatOpenAI] = {}
+        self.lock = threading.Lock()
+
+    def get_http_clients(self, provider: str, base_url: str) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        """
+        Get the pooled sync and async HTTP clients of an endpoint
+        """
+        with self.lock:
+            if (provider, base_url) not in self.http_clients:
+                transport = httpx.HTTPTransport(limits=self.limits)
+                async_transport = httpx.AsyncHTTPTransport(limits=self.limits)
+                self.transports.append((transport, async_transport))
+                self.http_clients[(provider, base_url)] = (
+                    httpx.Client(transport=transport, timeout=self.timeout),
+                    httpx.AsyncClient(transport=async_transport, timeout=self.timeout),
+                )
+            return self.http_clients[(provider, base_url)]
+
+    def get_chat_openai(self, model: str, cache: BaseCache | None = None, streaming: bool = False) -> ChatOpenAI:
+        """
+        Get the shared OpenAI chat model, the tools are bound per agent on top of it. With streaming, the responses are
+        generated token by token to the callbacks.
+        """
+        base_url = os.getenv("OPENAI_API_BASE") or OPENAI_API_BASE
+        http_client, http_async_client = self.get_http_clients("openai", base_url)
+        key = (base_url, model, id(cache), streaming)
+        with self.lock:
+            if key not in self.chat_models:
+                self.chat_models[key] = ChatOpenAI(
+                    model=model,
+                    temperature=0,
+                    base_url=base_url,
+                    cache=cache,
+                    streaming=streaming,
+                    stream_usage=streaming,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                )
+            return self.chat_models[key]
+
+    async def warm(self, model: str, cache: BaseCache | None = None, streaming: bool = False):
+        """
+        Build the clients of the model and open a connection to its endpoint, so the first run does not pay the TLS
+        handshake. The cache and streaming must be the ones of the agents to warm the model they use.
+        """
+        chat_model = self.get_chat_openai(model, cache=cache, streaming=streaming)
+        _, http_async_client = self.get_http_clients("openai", chat_model.openai_api_base)
+        try:
+            await http_async_client.get(
+                f"{chat_model.openai_api_base}/models",
+                headers={"Authorization": f"Bearer {chat_model.openai_api_key.get_secret_value()}"},
+            )
+        except httpx.HTTPError as e:
+            logging.warning(f"Could not warm the LLM client of {model}: {e}")
+
+    async def aclose(self):
+        """
+        Close the pooled connections of all the HTTP clients. The clients stay usable by the agents built on them, the
+        next request opens a new connection.
+        """
+        with self.lock:
+            transports = list(self.transports)
+        for transport, async_transport in transports:
+            transport.close()
+            await async_transport.aclose()
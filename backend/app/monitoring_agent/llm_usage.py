@@ -0,0 +1,87 @@
+import logging
+import time
+from typing import Any, Dict, List
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+
+class LLMUsage(AsyncCallbackHandler):
+    """
+    Record the model, latency and tokens of every LLM call of a run, with the part of the input tokens served from
+    the prompt cache of the provider. The cached tokens are only reported by the provider for the responses that are
+    not streamed, the ratio is None otherwise.
+    """
+
+    def __init__(self):
+        self.starts: Dict[UUID, Dict[str, Any]] = {}
+        self.calls: List[Dict[str, Any]] = []
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *,
+                                  run_id: UUID, metadata: Dict[str, Any] | None = None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        params = kwargs.get("invocation_params") or {}
+        self.starts[run_id] = {
+            "node": metadata.get("langgraph_node"),
+            "model": metadata.get("ls_model_name") or params.get("model_name") or params.get("model"),
+            "start": time.perf_counter(),
+        }
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        start = self.starts.pop(run_id, {})
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        message = getattr(response.generations[0][0], "message", None) if response.generations else None
+        usage_metadata = (message and message.usage_metadata) or {}
+        input_tokens = usage.get("prompt_tokens", usage_metadata.get("input_tokens"))
+        output_tokens = usage.get("completion_tokens", usage_metadata.get("output_tokens"))
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+
+        call = {
+            "node": start.get("node"),
+            "model": start.get("model"),
+            "latency": round(time.perf_counter() - start["start"], 3) if start else None,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cached_tokens": cached_tokens,
+            "cached_ratio": round(cached_tokens / input_tokens, 3) if cached_tokens is not None and input_tokens
+            else None,
+        }
+        self.calls.append(call)
+        logging.info(f"LLM call of {call['node']} with {call['model']} in {call['latency']}s: {input_tokens} input "
+                     f"tokens, {cached_tokens} cached (ratio {call['cached_ratio']}), {output_tokens} output tokens")
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.starts.pop(run_id, None)
+
+    def agents(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Calls, models, total latency and tokens of each agent
+        """
+        agents = {}
+        for call in self.calls:
+            agent = agents.setdefault(call["node"], {
+                "calls": 0, "models": [], "latency": 0.0, "input_tokens": 0, "output_tokens": 0
+            })
+            agent["calls"] += 1
+            if call["model"] not in agent["models"]:
+                agent["models"].append(call["model"])
+            agent["latency"] = round(agent["latency"] + (call["latency"] or 0), 3)
+            agent["input_tokens"] += call["input_tokens"] or 0
+            agent["output_tokens"] += call["output_tokens"] or 0
+        return agents
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Totals of the run, the usage of each agent and of each call
+        """
+        input_tokens = sum(call["input_tokens"] or 0 for call in self.calls)
+        cached_tokens = sum(call["cached_tokens"] or 0 for call in self.calls)
+        return {
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "cached_ratio": round(cached_tokens / input_tokens, 3) if input_tokens else None,
+            "agents": self.agents(),
+            "calls": self.calls,
+        }
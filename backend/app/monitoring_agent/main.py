@@ -1,31 +1,46 @@
-import io
+import asyncio
+import functools
 import logging
 import os
 import uuid
 from datetime import datetime
 from typing import Any, Dict
 
-from PIL import Image
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, ToolMessage, AIMessage
 from langgraph.constants import END
 from langgraph.graph import StateGraph
-from langgraph.prebuilt import ToolNode
 
 from app.api.deps import SessionDep
 from app.crud import create_event, set_run_status
 from app.monitoring_agent.agent_nodes import metric_analyser_node, diagnostic_node, solution_node, \
     incident_reporter_node
+from app.monitoring_agent.compaction import compaction_node
 from app.monitoring_agent.edge import router
-from app.monitoring_agent.state import AgentState
+from app.monitoring_agent.fan_out import analysis_request, fan_out, merge_findings_node, namespace_analyser_node
+from app.monitoring_agent.llm import stream_tokens
+from app.monitoring_agent.llm_usage import LLMUsage
+from app.monitoring_agent.pre_analysis import all_healthy, format_verdicts, healthy_report, pre_analysis_node, \
+    run_pre_analysis
+from app.monitoring_agent.state import AgentState, NamespaceState
+from app.monitoring_agent.streaming import TokenStreamHandler
+from app.monitoring_agent.tool_node import ConcurrentToolNode, parse_timeouts
 from app.monitoring_agent.tools.kubernetes_tool import get_pod_names, get_pod_logs, get_nodes_resources, get_pod_yaml, \
-    get_pod_resources
-from app.monitoring_agent.tools.prometheus_tool import execute_prometheus_query
+    get_pod_resources, get_namespace_resources
+from app.monitoring_agent.tools.prometheus_tool import execute_prometheus_query, execute_prometheus_queries, \
+    execute_prometheus_range_query
 
 load_dotenv()
 
-tools = [get_pod_names, execute_prometheus_query, get_pod_logs, get_nodes_resources, get_pod_yaml, get_pod_resources]
-tool_node = ToolNode(tools)
+tools = [get_pod_names, execute_prometheus_query, execute_prometheus_queries, execute_prometheus_range_query,
+         get_pod_logs, get_nodes_resources, get_pod_yaml, get_pod_resources, get_namespace_resources]
+tool_node = ConcurrentToolNode(
+    tools,
+    max_concurrency=int(os.getenv("TOOL_MAX_CONCURRENCY", "4")),
+    timeout=float(os.getenv("TOOL_TIMEOUT", "60")),
+    timeouts=parse_timeouts(os.getenv("TOOL_TIMEOUTS")),
+    max_workers=int(os.getenv("TOOL_MAX_WORKERS", "32")),
+)
 
 
 def extract_message_info(message) -> Dict[str, Any]:
@@ -79,25 +94,61 @@ def event_to_json(event: Dict[str, Any]) -> Dict[str, Any]:
     return recursive_serialize(event)
 
 
-def generate_graph():
-    workflow = StateGraph(AgentState)
+def generate_namespace_graph():
+    """
+    Graph analysing the metrics of a single namespace with the metric analyser and its tools
+    """
+    workflow = StateGraph(NamespaceState)
 
     workflow.add_node("metric_analyser", metric_analyser_node)
+    workflow.add_node("call_tool", tool_node)
+
+    workflow.add_conditional_edges(
+        "metric_analyser",
+        router,
+        {"continue": END, "call_tool": "call_tool", "__end__": END},
+    )
+    workflow.add_edge("call_tool", "metric_analyser")
+
+    workflow.set_entry_point("metric_analyser")
+
+    return workflow.compile()
+
+
+def generate_graph(**compile_options):
+    workflow = StateGraph(AgentState)
+
+    # The metrics of each namespace are analysed concurrently, then merged in a single metric_analyser message
+    namespace_graph = generate_namespace_graph()
+
+    workflow.add_node("pre_analysis", pre_analysis_node)
+    workflow.add_node("namespace_analyser", functools.partial(namespace_analyser_node, graph=namespace_graph))
+    workflow.add_node("metric_analyser", merge_findings_node)
     workflow.add_node("diagnostic", diagnostic_node)
+    workflow.add_node("compaction", compaction_node)
     workflow.add_node("solution", solution_node)
     workflow.add_node("incident_reporter", incident_reporter_node)
     workflow.add_node("call_tool", tool_node)
 
+    workflow.add_conditional_edges("pre_analysis", fan_out, ["namespace_analyser"])
+    workflow.add_edge("namespace_analyser", "metric_analyser")
+
     workflow.add_conditional_edges(
         "metric_analyser",
         router,
-        {"continue": "diagnostic", "call_tool": "call_tool", "__end__": "incident_reporter"},
+        {"continue": "diagnostic", "__end__": "incident_reporter"},
     )
 
+    # The tool outputs of the diagnostic are compacted before the next agents
     workflow.add_conditional_edges(
         "diagnostic",
         router,
-        {"continue": "solution", "call_tool": "call_tool", "__end__": "incident_reporter"},
+        {"continue": "compaction", "call_tool": "call_tool", "__end__": "compaction"},
+    )
+    workflow.add_conditional_edges(
+        "compaction",
+        router,
+        {"continue": "solution", "__end__": "incident_reporter"},
     )
     workflow.add_conditional_edges(
         "solution",
@@ -109,7 +160,6 @@ def generate_graph():
         "call_tool",
         lambda x: x["sender"],
         {
-            "metric_analyser": "metric_analyser",
             "diagnostic": "diagnostic",
             "__end__": "incident_reporter"
         },
@@ -117,47 +167,78 @@ def generate_graph():
 
     workflow.add_edge("incident_reporter", END)
 
-    workflow.set_entry_point("metric_analyser")
+    workflow.set_entry_point("pre_analysis")
 
-    graph = workflow.compile()
+    graph = workflow.compile(**compile_options)
 
     return graph
 
 
-def export_graph_image(graph):
-    img_bytes = graph.get_graph(xray=1).draw_mermaid_png()
-    image = Image.open(io.BytesIO(img_bytes))
-    image.save("graph.png")
-    image.show()
+@functools.lru_cache(maxsize=None)
+def get_graph(**compile_options):
+    """
+    Compiled graph shared by all the runs of the process, built on first use. Each variant of the compile options, for
+    example get_graph(debug=True), is compiled once. Sequence options must be given as tuples.
+    """
+    return generate_graph(**compile_options)
 
 
-async def run(web_socket_manager, session: SessionDep, run_id: uuid.UUID):
+async def pre_analyse(namespaces):
+    """
+    Compute the trigger criteria before starting the workflow. Returns None when the fast path is disabled or the
+    pre-analysis failed, the workflow then computes it again in its pre_analysis node.
+    """
+    if os.getenv("AGENT_FAST_PATH", "true").lower() != "true":
+        return None
+
     try:
-        # Create the graph with full workflow
-        graph = generate_graph()
+        return await asyncio.to_thread(run_pre_analysis, namespaces)
+    except Exception as e:
+        logging.error(f"Pre-analysis failed before the workflow: {e}")
+        return None
 
-        # Export the graph image
-        export_graph_image(graph)
+
+async def run(web_socket_manager, session: SessionDep, run_id: uuid.UUID):
+    try:
+        # The graph with full workflow is compiled once per process, its image is served by the /agent/graph.png
+        # endpoint
+        graph = get_graph()
 
         namespaces = os.getenv("NAMESPACES", "default").split(',')
 
         current_time_utc = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
 
         input = {
-            "messages": [
-                HumanMessage(
-                    content=f"Check the metrics for all pods in the following namespaces {', '.join(namespaces)}, "
-                            f"and if needed run a diagnostic and find solutions to any issue. Current time is {current_time_utc}"
-                )
-            ],
+            "messages": [analysis_request(namespaces)],
+            "namespaces": namespaces,
+            "current_time": current_time_utc,
         }
 
         create_event(session, run_id, event_to_json({"metric_analyser": input}))
 
+        verdicts = await pre_analyse(namespaces)
+        if verdicts and all_healthy(verdicts):
+            # Every pod is healthy, report it without running the LLM workflow
+            message = AIMessage(content=healthy_report(verdicts, namespaces), name="incident_reporter")
+            json_event = event_to_json({"incident_reporter": {"messages": [message], "sender": "incident_reporter"}})
+            create_event(session, run_id, json_event)
+            await web_socket_manager.send_json(json_event)
+            set_run_status(session, run_id, "finished")
+            return
+
+        if verdicts:
+            input["verdict_table"] = format_verdicts(verdicts)
+
+        # The tokens are forwarded as they are generated, the messages are persisted once per node with the updates
+        callbacks = [TokenStreamHandler(web_socket_manager.send_frame)] if stream_tokens else []
+        # Model, latency and tokens of every LLM call, stored with the run to tune the models of the agents
+        llm_usage = LLMUsage()
+        callbacks.append(llm_usage)
+
         async for event in graph.astream(
                 input,
                 stream_mode="updates",
-                config={"recursion_limit": 30},
+                config={"recursion_limit": 30, "callbacks": callbacks},
         ):
             print(event)
 
@@ -166,6 +247,8 @@ async def run(web_socket_manager, session: SessionDep, run_id: uuid.UUID):
             inserted_event = create_event(session, run_id, json_event)
             await web_socket_manager.send_json(json_event)
 
+        create_event(session, run_id, {"llm_usage": llm_usage.summary()})
+
         set_run_status(session, run_id, "finished")
 
     except Exception as e:
@@ -184,4 +267,4 @@ async def run(web_socket_manager, session: SessionDep, run_id: uuid.UUID):
         await web_socket_manager.send_json({"error": str(e)})
         raise e
     finally:
-        await web_socket_manager.delete_current_run_json()
+        web_socket_manager.delete_current_run_json()
@@ -0,0 +1,41 @@
+from typing import Dict, Sequence
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import BaseTool
+
+
+def parse_models(models: str | None) -> Dict[str, str]:
+    """
+    Parse the models of the agents in the format "agent=model,agent=model"
+    """
+    parsed = {}
+    for item in (models or "").split(","):
+        if "=" in item:
+            agent, model = item.split("=", 1)
+            if not model.strip():
+                raise ValueError(f"Missing model for agent {agent.strip()}")
+            parsed[agent.strip()] = model.strip()
+    return parsed
+
+
+def model_provider(model: str) -> str:
+    """
+    Get the provider serving a model: openai for the GPT models, ollama for the others
+    """
+    return "openai" if model.startswith("gpt") else "ollama"
+
+
+def escalation_reason(message: AIMessage, tools: Sequence[BaseTool]) -> str | None:
+    """
+    Get the reason to generate the response of an agent again with a stronger model: the agent gave up, or its tool
+    calls could not be parsed or name a tool it does not have. None when the response is fine.
+    """
+    if "UNSUCCESSFUL" in message.content:
+        return "the agent gave up"
+    if message.invalid_tool_calls:
+        return f"malformed tool calls {', '.join(str(call['name']) for call in message.invalid_tool_calls)}"
+    tool_names = {tool.name for tool in tools}
+    unknown = [tool_call["name"] for tool_call in message.tool_calls if tool_call["name"] not in tool_names]
+    if unknown:
+        return f"unknown tools {', '.join(unknown)}"
+    return None
@@ -0,0 +1,232 @@
+import logging
+import math
+import os
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from langchain_core.messages import HumanMessage
+
+from app.monitoring_agent.prompts import trigger_criteria
+from app.monitoring_agent.tools.kubernetes_tool import list_pods, node_snapshots, resource_table
+from app.monitoring_agent.tools.prometheus_tool import promql_cache, query_executor
+
+PodKey = Tuple[str, str]
+
+# Queries of the trigger criteria, evaluated once for all the namespaces and grouped by namespace and pod
+usage_queries = {
+    "cpu": 'sum(rate(container_cpu_usage_seconds_total{{namespace=~"{namespaces}", container!=""}}[5m])) '
+           'by (namespace, pod)',
+    "memory": 'sum(avg_over_time(container_memory_working_set_bytes{{namespace=~"{namespaces}", container!=""}}[5m])) '
+              'by (namespace, pod)',
+    "network": 'sum(rate(container_network_receive_bytes_total{{namespace=~"{namespaces}"}}[5m])) by (namespace, pod) '
+               '+ sum(rate(container_network_transmit_bytes_total{{namespace=~"{namespaces}"}}[5m])) by (namespace, pod)',
+    "rps": 'sum(rate(http_requests_total{{namespace=~"{namespaces}"}}[5m])) by (namespace, pod)',
+    "latency": 'histogram_quantile(0.95, sum(rate(http_request_duration_seconds_bucket{{namespace=~"{namespaces}"}}[2m])) '
+               'by (le, namespace, pod))',
+}
+
+columns = ["cpu", "memory", "network", "rps", "latency"]
+
+
+def collect_usage(namespaces: List[str]) -> Dict[str, Dict[PodKey, float]]:
+    """
+    Execute the usage queries of all the criteria concurrently and index the results by namespace and pod
+    """
+    selector = "|".join(namespaces)
+    queries = {name: query.format(namespaces=selector) for name, query in usage_queries.items()}
+    results = dict(zip(queries, query_executor.map(promql_cache.query, queries.values()), strict=True))
+
+    usage = {}
+    for name, data in results.items():
+        usage[name] = {
+            (series["metric"].get("namespace", ""), series["metric"].get("pod", "")): float(series["value"][1])
+            for series in data
+        }
+    return usage
+
+
+def collect_allocations(namespaces: List[str]) -> Dict[PodKey, Dict[str, float]]:
+    """
+    List the pods of each namespace and sum the CPU (cores) and memory (bytes) allocated to their containers. The
+    limit of a container is used when set, otherwise its request. The usage is measured over all the containers of a
+    pod, so the allocation of a resource is NaN (no percentage) when a container declares neither.
+    """
+    allocations = {}
+    for namespace in namespaces:
+        table = resource_table(list_pods(namespace))
+        for pod, cpu_request, cpu_limit, memory_request, memory_limit in zip(
+                table["pod"], table["cpu_request"], table["cpu_limit"], table["memory_request"], table["memory_limit"],
+                strict=True
+        ):
+            allocation = allocations.setdefault((namespace, pod), {"cpu": 0.0, "memory": 0.0})
+            cpu = cpu_limit if cpu_limit is not None else cpu_request
+            memory = memory_limit if memory_limit is not None else memory_request
+            allocation["cpu"] += cpu / 1000 if cpu is not None else math.nan
+            allocation["memory"] += memory if memory is not None else math.nan
+    return allocations
+
+
+def _percent(usage: np.ndarray, allocated: np.ndarray) -> np.ndarray:
+    return np.divide(usage, allocated, out=np.full_like(usage, np.nan), where=allocated > 0) * 100
+
+
+def compute_verdicts(usage: Dict[str, Dict[PodKey, float]], allocations: Dict[PodKey, Dict[str, float]],
+                     network_bandwidth: float | None = None) -> Dict[str, Any]:
+    """
+    Compute the trigger criteria of every pod in a single vectorized pass.
+
+    Returns:
+    - dict: A columnar table with the namespace and pod names, the CPU, memory and network usage in percent of the
+    allocated resources, the HTTP requests per second, the p95 HTTP latency and the list of breached criteria per pod.
+    """
+    keys = sorted(set(allocations) | {key for values in usage.values() for key in values if all(key)})
+
+    def column(values: Dict[PodKey, float]) -> np.ndarray:
+        return np.array([values.get(key, np.nan) for key in keys], dtype=float)
+
+    table = {
+        "cpu": _percent(column(usage.get("cpu", {})), column({k: v["cpu"] for k, v in allocations.items()})),
+        "memory": _percent(column(usage.get("memory", {})), column({k: v["memory"] for k, v in allocations.items()})),
+        "network": _percent(column(usage.get("network", {})), np.full(len(keys), network_bandwidth or np.nan)),
+        "rps": column(usage.get("rps", {})),
+        "latency": column(usage.get("latency", {})),
+    }
+
+    # NaN values, e.g. no limit or no HTTP metrics, never breach a threshold
+    thresholds = np.array([trigger_criteria[name] for name in columns], dtype=float)
+    with np.errstate(invalid="ignore"):
+        breached = np.stack([table[name] for name in columns], axis=1) > thresholds
+
+    return {
+        "namespace": [key[0] for key in keys],
+        "pod": [key[1] for key in keys],
+        **{name: table[name].tolist() for name in columns},
+        "breaches": [[columns[i] for i in np.flatnonzero(row)] for row in breached],
+    }
+
+
+def format_verdicts(verdicts: Dict[str, Any]) -> str:
+    """
+    Format the verdicts as a compact table for the LLM
+    """
+
+    def fmt(value: float, spec: str) -> str:
+        return "-" if math.isnan(value) else format(value, spec)
+
+    lines = ["namespace | pod | cpu % | memory % | network % | requests/s | p95 latency s | verdict"]
+    for i, pod in enumerate(verdicts["pod"]):
+        breaches = verdicts["breaches"][i]
+        lines.append(" | ".join([
+            verdicts["namespace"][i],
+            pod,
+            fmt(verdicts["cpu"][i], ".1f"),
+            fmt(verdicts["memory"][i], ".1f"),
+            fmt(verdicts["network"][i], ".1f"),
+            fmt(verdicts["rps"][i], ".3g"),
+            fmt(verdicts["latency"][i], ".3g"),
+            "OVER THRESHOLD: " + ", ".join(breaches) if breaches else "OK",
+        ]))
+
+    over = sum(1 for breaches in verdicts["breaches"] if breaches)
+    lines.append(f"{len(verdicts['pod'])} pods checked, {over} over a threshold")
+
+    if verdicts.get("nodes"):
+        lines.append("node | cpu % of allocatable | memory % of allocatable")
+        for node in verdicts["nodes"]:
+            lines.append(" | ".join([
+                node["node"],
+                fmt(node["cpu_usage_percent"] if node["cpu_usage_percent"] is not None else math.nan, ".1f"),
+                fmt(node["memory_usage_percent"] if node["memory_usage_percent"] is not None else math.nan, ".1f"),
+            ]))
+    return "\n".join(lines)
+
+
+def run_pre_analysis(namespaces: List[str]) -> Dict[str, Any]:
+    """
+    Fetch the usage and the allocated resources of every pod of the namespaces and compute the trigger criteria
+    """
+    bandwidth = os.getenv("POD_NETWORK_BANDWIDTH")
+    future_allocations = query_executor.submit(collect_allocations, namespaces)
+    future_nodes = query_executor.submit(node_snapshots.snapshot)
+    usage = collect_usage(namespaces)
+    verdicts = compute_verdicts(usage, future_allocations.result(), float(bandwidth) if bandwidth else None)
+
+    try:
+        verdicts["nodes"] = future_nodes.result()
+    except Exception as e:
+        # Node usage is context only, the metrics API may not be installed
+        logging.error(f"Exception when calling Metrics API: {e}")
+    return verdicts
+
+
+def fully_evaluated(verdicts: Dict[str, Any]) -> bool:
+    """
+    Check that the CPU and memory percentages of every pod are known. A pod without usage data or without limits and
+    requests cannot be judged healthy, and no data at all usually means a monitoring issue.
+    """
+    return bool(verdicts["pod"]) and not any(
+        math.isnan(cpu) or math.isnan(memory) for cpu, memory in zip(verdicts["cpu"], verdicts["memory"], strict=True)
+    )
+
+
+def all_healthy(verdicts: Dict[str, Any]) -> bool:
+    """
+    Check whether every pod was evaluated and none is over a threshold of the trigger criteria
+    """
+    return fully_evaluated(verdicts) and not any(verdicts["breaches"])
+
+
+def checked_criteria(verdicts: Dict[str, Any]) -> List[str]:
+    """
+    Criteria evaluated for at least one pod, e.g. the network is not evaluated without POD_NETWORK_BANDWIDTH
+    """
+    return [name for name in columns if any(not math.isnan(value) for value in verdicts[name])]
+
+
+def healthy_report(verdicts: Dict[str, Any], namespaces: List[str]) -> str:
+    """
+    Templated incident report of a run where every pod is healthy
+    """
+    labels = {
+        "cpu": f"CPU ({trigger_criteria['cpu']}%)",
+        "memory": f"memory ({trigger_criteria['memory']}%)",
+        "network": f"network ({trigger_criteria['network']}%)",
+        "rps": f"HTTP requests per second ({trigger_criteria['rps']})",
+        "latency": f"HTTP latency ({trigger_criteria['latency']}s)",
+    }
+    checked = [labels[name] for name in checked_criteria(verdicts)]
+    thresholds = checked[0] if len(checked) == 1 else f"{', '.join(checked[:-1])} or {checked[-1]}"
+    return (
+        f"FINISHED\n"
+        f"Incident report: no incident. The {len(verdicts['pod'])} pods of the {', '.join(namespaces)} namespaces are "
+        f"healthy, none of them exceeds the {thresholds} thresholds, so no diagnostic is needed.\n\n"
+        f"{format_verdicts(verdicts)}"
+    )
+
+
+def pre_analysis_node(state):
+    """
+    Node computing the trigger criteria before the metric analyser so it starts from ready-made numbers. The table is
+    reused when it was already computed before the graph started.
+    """
+    table = state.get("verdict_table")
+    if not table:
+        try:
+            table = format_verdicts(run_pre_analysis(state["namespaces"]))
+        except Exception as e:
+            # The metric analyser can still gather the metrics with its tools
+            logging.error(f"Pre-analysis failed: {e}")
+            return {"verdict_table": "", "sender": "pre_analysis"}
+
+    return {
+        "messages": [
+            HumanMessage(
+                content=f"Pre-analysis of the trigger criteria for every pod, computed from Prometheus and the "
+                        f"resources allocated in Kubernetes. Start your analysis from these numbers and only query "
+                        f"further metrics when needed:\n{table}",
+                name="pre_analysis",
+            )
+        ],
+        "verdict_table": table,
+        "sender": "pre_analysis",
+    }
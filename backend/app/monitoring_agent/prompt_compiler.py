@@ -0,0 +1,56 @@
+import functools
+import json
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.messages import BaseMessage, SystemMessage
+
+from app.monitoring_agent.prompts import tasks_config
+
+preamble = (
+    "You are a helpful AI assistant, collaborating with other assistants."
+    " Use the provided tools to progress towards answering the question."
+    " If you are unable to fully answer, that's OK, another assistant with different tools "
+    " will help where you left off. Execute what you can to make progress."
+    " If you or any of the other assistants struggle with the question, you can all decide to stop,"
+    " do it by prefix your response with UNSUCCESSFUL and give a summary of the progress made so far."
+    " If you successfully answer the question and no diagnostic is needed, do it by prefix your response with"
+    " FINISHED."
+)
+
+
+def render_task(task: Dict[str, Any]) -> str:
+    """
+    Render a task of the configuration, the examples are serialized with sorted keys so the text never changes
+    """
+    return "\n".join([
+        f"role: {task['role']}",
+        f"goal: {task['goal']}",
+        f"backstory: {task['backstory']}",
+        f"description: {task['description']}",
+        f"expected_output: {task['expected_output']}",
+        f"examples: {json.dumps(task['examples'], sort_keys=True, ensure_ascii=False)}",
+    ])
+
+
+@functools.lru_cache(maxsize=None)
+def compile_system_prompt(task_name: str, tool_names: Tuple[str, ...]) -> str:
+    """
+    Compile the static system prompt of an agent once. It only depends on the task and the tools, so it is
+    byte-identical across calls and runs and the provider can cache it as a prompt prefix. Volatile values are added
+    at the end of the prompt by volatile_messages.
+    """
+    prompt = preamble
+    if tool_names:
+        prompt += f" You have access to the following tools: {', '.join(tool_names)}."
+    return f"{prompt}\n\n{render_task(tasks_config[task_name])}"
+
+
+def volatile_messages(state: Dict[str, Any]) -> List[BaseMessage]:
+    """
+    Values changing at every run, placed after the messages so they do not invalidate the cached prefix. They are
+    flagged as volatile so the recorded responses are not keyed on them.
+    """
+    if state.get("current_time"):
+        return [SystemMessage(content=f"Current time is {state['current_time']} UTC.",
+                              additional_kwargs={"volatile": True})]
+    return []
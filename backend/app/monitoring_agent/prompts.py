@@ -1,3 +1,12 @@
+# Thresholds of the trigger criteria of the analyse_metric_task, percentages are relative to the allocated resources
+trigger_criteria = {
+    "cpu": 80,  # % of the allocated CPU over the last 5 minutes
+    "memory": 80,  # % of the allocated memory over the last 5 minutes
+    "network": 80,  # % of the allocated network bandwidth over the last 5 minutes
+    "rps": 100,  # HTTP requests per second over the last 5 minutes
+    "latency": 0.3,  # HTTP latency in seconds over the last 2 minutes
+}
+
 tasks_config = {
     "analyse_metric_task": {
         "role": "Metrics analyser",
@@ -24,6 +33,16 @@ tasks_config = {
                 "tool": "execute_prometheus_query",
                 "tool_input": 'sum(rate(container_cpu_usage_seconds_total{namespace="default"}[5m])) by (pod)',
                 "tool_response": '{pod="pod1"}: 0.85\n{pod="pod2"}: 0.65'
+            },
+            {
+                "user": "Get CPU and memory usage for the past 5 minutes for all pods in the 'default' namespace.",
+                "tool": "execute_prometheus_queries",
+                "tool_input": ['sum(rate(container_cpu_usage_seconds_total{namespace="default"}[5m])) by (pod)',
+                               'sum(avg_over_time(container_memory_working_set_bytes{namespace="default"}[5m])) by (pod)'],
+                "tool_response": '# sum(rate(container_cpu_usage_seconds_total{namespace="default"}[5m])) by (pod)\n'
+                                 '{pod="pod1"}: 0.85\n{pod="pod2"}: 0.65\n\n'
+                                 '# sum(avg_over_time(container_memory_working_set_bytes{namespace="default"}[5m])) by (pod)\n'
+                                 '{pod="pod1"}: 104857600\n{pod="pod2"}: 52428800'
             }
         ]
     },
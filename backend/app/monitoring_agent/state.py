@@ -1,12 +1,29 @@
 import operator
-from typing import Annotated, Sequence, TypedDict
+from typing import Annotated, Dict, List, Sequence, TypedDict
 
 from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
 
 
 class AgentState(TypedDict):
     """
-    The state passed between each node in the graph.
+    The state passed between each node in the graph. Messages are appended, or replaced when they have the id of an
+    existing message.
+    """
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+    sender: str
+    namespaces: List[str]
+    current_time: str
+    verdict_table: str
+    findings: Annotated[List[Dict[str, str]], operator.add]
+    tokens_saved: Annotated[int, operator.add]
+
+
+class NamespaceState(TypedDict):
+    """
+    The state of the analysis branch of a single namespace.
     """
     messages: Annotated[Sequence[BaseMessage], operator.add]
     sender: str
+    namespace: str
+    current_time: str
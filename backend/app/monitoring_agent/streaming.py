@@ -0,0 +1,70 @@
+from typing import Any, Awaitable, Callable, Dict, List
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import BaseMessage
+
+
+class TokenStreamHandler(AsyncCallbackHandler):
+    """
+    Forward the tokens generated by the LLM of each node as small frames, tagged with the node and the id of the
+    message being generated. The tokens are buffered until min_chars characters are ready to limit the number of
+    frames, the last frame of a message is flagged with done. When a response is rejected and generated again, a
+    discard frame tells the clients to drop the message already streamed.
+    """
+
+    def __init__(self, send: Callable[[Dict[str, Any]], Awaitable[None]], min_chars: int = 20):
+        """
+        Initialize the handler.
+
+        Parameters:
+        - send (callable): Coroutine sending a frame to the clients.
+        - min_chars (int): Minimum number of characters of a frame.
+        """
+        self.send = send
+        self.min_chars = min_chars
+        self.nodes: Dict[UUID, str] = {}
+        self.buffers: Dict[UUID, str] = {}
+        # Id of the frames of each generated message, by the id of the message
+        self.frame_ids: Dict[str, str] = {}
+
+    async def _flush(self, run_id: UUID, done: bool = False):
+        delta = self.buffers.pop(run_id, "")
+        if delta or done:
+            await self.send({
+                "type": "token",
+                "node": self.nodes.get(run_id),
+                "message_id": f"run-{run_id}",
+                "delta": delta,
+                "done": done,
+            })
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *,
+                                  run_id: UUID, metadata: Dict[str, Any] | None = None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        self.nodes[run_id] = metadata.get("langgraph_node")
+        if metadata.get("discarded_message_id"):
+            await self.send({
+                "type": "discard",
+                "node": self.nodes[run_id],
+                "message_id": self.frame_ids.get(metadata["discarded_message_id"], metadata["discarded_message_id"]),
+            })
+
+    async def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if not token:
+            return
+        self.buffers[run_id] = self.buffers.get(run_id, "") + token
+        if len(self.buffers[run_id]) >= self.min_chars:
+            await self._flush(run_id)
+
+    async def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id in self.nodes:
+            await self._flush(run_id, done=True)
+            message = getattr(response.generations[0][0], "message", None) if response.generations else None
+            if message is not None and message.id:
+                self.frame_ids[message.id] = f"run-{run_id}"
+            self.nodes.pop(run_id)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.buffers.pop(run_id, None)
+        self.nodes.pop(run_id, None)
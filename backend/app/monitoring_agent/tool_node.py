@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Callable, Dict, Sequence, Union
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langgraph.prebuilt import ToolNode
+from langgraph.prebuilt.tool_node import str_output
+
+
+def parse_timeouts(timeouts: str | None) -> Dict[str, float]:
+    """
+    Parse per-tool timeouts in the format "tool=seconds,tool=seconds"
+    """
+    parsed = {}
+    for item in (timeouts or "").split(","):
+        if "=" in item:
+            name, seconds = item.split("=", 1)
+            parsed[name.strip()] = float(seconds)
+    return parsed
+
+
+class ConcurrentToolNode(ToolNode):
+    """
+    Tool node running the tool calls of a message concurrently without blocking the event loop. Tools with a coroutine
+    are awaited, the synchronous ones run in a dedicated thread pool. At most max_concurrency calls run at once and a
+    call exceeding its timeout is answered with an error message, so the agent can go on with the other results.
+
+    A thread cannot be stopped, so a synchronous call which timed out keeps its worker until it returns. The pool has
+    more workers than the concurrency limit to leave room for them, and the timeout of a call only starts once a
+    worker runs it. The wait for a worker is bounded by the timeout as well, and a tool raising an exception is
+    answered with an error message like a timeout.
+    """
+
+    def __init__(self, tools: Sequence[Union[BaseTool, Callable]], max_concurrency: int = 4, timeout: float = 60.0,
+                 timeouts: Dict[str, float] | None = None, max_workers: int = 32, **kwargs):
+        """
+        Initialize the tool node.
+
+        Parameters:
+        - tools (list): The tools that can be called.
+        - max_concurrency (int): Maximum number of tool calls running at the same time.
+        - timeout (float): Default timeout of a tool call in seconds.
+        - timeouts (dict): Timeouts of specific tools in seconds, by tool name.
+        - max_workers (int): Threads of the pool running the synchronous tools, including the ones still running
+        after a timeout.
+        """
+        super().__init__(tools, **kwargs)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+
+    async def _run_tool(self, tool: BaseTool, args: Dict[str, Any], config: RunnableConfig, timeout: float) -> Any:
+        if getattr(tool, "coroutine", None):
+            return await asyncio.wait_for(tool.ainvoke(args, config), timeout)
+
+        loop = asyncio.get_running_loop()
+        started = asyncio.Event()
+        context = copy_context()
+
+        def run() -> Any:
+            loop.call_soon_threadsafe(started.set)
+            return context.run(tool.invoke, args, config)
+
+        future = loop.run_in_executor(self.executor, run)
+        try:
+            # The time waiting for a free worker does not count in the timeout of the call, but is bounded by it
+            await asyncio.wait_for(started.wait(), timeout)
+        except asyncio.TimeoutError:
+            # The call does not run once a worker is free
+            future.cancel()
+            raise
+        return await asyncio.wait_for(future, timeout)
+
+    async def _afunc(self, input: Union[list[AnyMessage], dict[str, Any]], config: RunnableConfig) -> Any:
+        if isinstance(input, list):
+            output_type = "list"
+            message: AnyMessage = input[-1]
+        elif messages := input.get("messages", []):
+            output_type = "dict"
+            message = messages[-1]
+        else:
+            raise ValueError("No message found in input")
+
+        if not isinstance(message, AIMessage):
+            raise ValueError("Last message is not an AIMessage")
+
+        # The semaphore is bound to the running loop, so it is created for each call
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_one(call: ToolCall) -> ToolMessage:
+            timeout = self.timeouts.get(call["name"], self.timeout)
+            async with semaphore:
+                try:
+                    output = await self._run_tool(self.tools_by_name[call["name"]], call["args"], config, timeout)
+                except asyncio.TimeoutError:
+                    logging.error(f"Tool {call['name']} timed out after {timeout}s")
+                    output = f"Exception with {call['name']}: timed out after {timeout}s"
+                except Exception as e:
+                    logging.error(f"Exception with {call['name']}: {e}")
+                    output = f"Exception with {call['name']}: {e}"
+            return ToolMessage(content=str_output(output), name=call["name"], tool_call_id=call["id"])
+
+        outputs = await asyncio.gather(*(run_one(call) for call in message.tool_calls))
+        if output_type == "list":
+            return outputs
+        else:
+            return {"messages": outputs}
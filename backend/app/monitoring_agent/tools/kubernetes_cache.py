@@ -0,0 +1,181 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, List
+
+from kubernetes import client, watch
+
+
+class Informer:
+    """
+    Keep an in-memory copy of a Kubernetes resource. The resource is listed once, then watched from the returned
+    resourceVersion, and relisted every resync period or when the watch expires.
+    """
+
+    def __init__(self, name: str, get_api: Callable[[], Any], list_method: str, key_func: Callable[[Any], Hashable],
+                 indexers: Dict[str, Callable[[Any], List[str]]] | None = None, resync_period: float = 300.0,
+                 watch_timeout: int = 60):
+        """
+        Initialize the informer.
+
+        Parameters:
+        - name (str): The name of the informer, used in logs and for the thread name.
+        - get_api (callable): Returns the API client, called on every list so it can be re-authenticated.
+        - list_method (str): The name of the list method of the API client, e.g. list_pod_for_all_namespaces.
+        - key_func (callable): Returns the key of an object in the store.
+        - indexers (dict): Functions returning the index values of an object, by index name.
+        - resync_period (float): Seconds between two full relists.
+        - watch_timeout (int): Server side timeout of a single watch request in seconds.
+        """
+        self.name = name
+        self.get_api = get_api
+        self.list_method = list_method
+        self.key_func = key_func
+        self.indexers = indexers or {}
+        self.resync_period = resync_period
+        self.watch_timeout = watch_timeout
+        self.resource_version = None
+        self._store: Dict[Hashable, Any] = {}
+        self._indexes: Dict[str, Dict[str, set]] = {name: defaultdict(set) for name in self.indexers}
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._watch = None
+
+    def start(self):
+        """
+        Start listing and watching in a background thread, does nothing if already started
+        """
+        with self._lock:
+            if self._thread is None:
+                # Each thread has its own stop event, a thread still finishing after stop() is not restarted
+                self._stopped = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stopped,), name=f"informer-{self.name}",
+                                                daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread, the informer can be started again
+        """
+        with self._lock:
+            self._stopped.set()
+            if self._watch:
+                self._watch.stop()
+            self._thread = None
+            self._ready.clear()
+
+    def is_ready(self) -> bool:
+        """
+        Whether the store holds a complete list of the resource. Readers must fall back to direct reads otherwise.
+        """
+        return self._ready.is_set()
+
+    def wait_until_ready(self, timeout: float | None = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            return self._store.get(key)
+
+    def list(self) -> List[Any]:
+        with self._lock:
+            return list(self._store.values())
+
+    def by_index(self, index: str, value: str) -> List[Any]:
+        """
+        Get the objects of an index value, e.g. by_index("namespace", "default") or by_index("label", "app=api")
+        """
+        with self._lock:
+            return [self._store[key] for key in self._indexes[index].get(value, ())]
+
+    def _run(self, stopped: threading.Event):
+        backoff = 1.0
+        while not stopped.is_set():
+            try:
+                self._list()
+                backoff = 1.0
+                self._watch_until_resync(stopped)
+            except client.ApiException as e:
+                if e.status == 410:
+                    # The resourceVersion is too old, relist immediately
+                    logging.warning(f"Informer {self.name}: watch expired, relisting")
+                    continue
+                logging.error(f"Informer {self.name}: exception when calling {self.list_method}: {e}")
+                self._ready.clear()
+                stopped.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+            except Exception as e:
+                logging.error(f"Informer {self.name}: {e}")
+                self._ready.clear()
+                stopped.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+    def _list(self):
+        response = getattr(self.get_api(), self.list_method)()
+        with self._lock:
+            self._store = {}
+            self._indexes = {name: defaultdict(set) for name in self.indexers}
+            for obj in response.items:
+                self._add(obj)
+            self.resource_version = response.metadata.resource_version
+        self._ready.set()
+
+    def _watch_until_resync(self, stopped: threading.Event | None = None):
+        stopped = stopped or self._stopped
+        deadline = time.monotonic() + self.resync_period
+        while not stopped.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            self._watch = watch.Watch()
+            for event in self._watch.stream(
+                    getattr(self.get_api(), self.list_method),
+                    resource_version=self.resource_version,
+                    timeout_seconds=max(1, int(min(self.watch_timeout, remaining))),
+                    allow_watch_bookmarks=True,
+            ):
+                obj = event["object"]
+                with self._lock:
+                    if event["type"] in ("ADDED", "MODIFIED"):
+                        self._remove(self.key_func(obj))
+                        self._add(obj)
+                    elif event["type"] == "DELETED":
+                        self._remove(self.key_func(obj))
+                    self.resource_version = self._watch.resource_version or self.resource_version
+
+    def _add(self, obj: Any):
+        key = self.key_func(obj)
+        self._store[key] = obj
+        for name, indexer in self.indexers.items():
+            for value in indexer(obj):
+                self._indexes[name][value].add(key)
+
+    def _remove(self, key: Hashable):
+        obj = self._store.pop(key, None)
+        if obj is None:
+            return
+        for name, indexer in self.indexers.items():
+            for value in indexer(obj):
+                keys = self._indexes[name].get(value)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._indexes[name][value]
+
+
+def pod_key(pod: client.V1Pod) -> tuple[str, str]:
+    return pod.metadata.namespace, pod.metadata.name
+
+
+pod_indexers = {
+    "namespace": lambda pod: [pod.metadata.namespace],
+    "label": lambda pod: [f"{key}={value}" for key, value in (pod.metadata.labels or {}).items()],
+}
+
+
+def node_key(node: client.V1Node) -> str:
+    return node.metadata.name
@@ -5,32 +5,145 @@ from typing import List, Any, Dict
 from langchain_core.tools import tool
 from dotenv import load_dotenv
 from kubernetes import client
-from kubernetes.client import ApiClient
-from kubernetes.client.api import custom_objects_api
 
 from app.monitoring_agent.config.k8s_config import KubernetesConfig, GoogleCloudLogging
+from app.monitoring_agent.tools.kubernetes_cache import Informer, node_key, pod_indexers, pod_key
+from app.monitoring_agent.tools.log_backends import FileLogBackend, GoogleCloudLogBackend, KubernetesLogBackend, \
+    LogBackend
+from app.monitoring_agent.tools.log_fetch import LogWindowCache
+from app.monitoring_agent.tools.log_templates import TemplateMiner
+from app.monitoring_agent.tools.node_snapshot import NodeSnapshotService
+from app.monitoring_agent.tools.pod_spec import PodSpecRenderer
+from app.monitoring_agent.tools.quantity import to_bytes, to_millicores
 
 load_dotenv()
 
 k8s_config = KubernetesConfig(
     kube_host=os.getenv("KUBE_HOST"),
     credentials_path=os.getenv("GOOGLE_APPLICATION_CREDENTIALS_FILE"),
-    scopes=['https://www.googleapis.com/auth/cloud-platform']
+    scopes=['https://www.googleapis.com/auth/cloud-platform'],
+    pool_size=int(os.getenv("KUBE_POOL_SIZE", "10")),
+    debug=os.getenv("KUBE_DEBUG", "false").lower() == "true",
 )
 
 gcloud_logging_config = GoogleCloudLogging(
     credentials_path=os.getenv("GOOGLE_APPLICATION_CREDENTIALS_FILE")
 )
 
+log_fetch_budget = int(os.getenv("LOG_FETCH_BUDGET", "2000000"))
+log_max_templates = int(os.getenv("LOG_MAX_TEMPLATES", "50"))
+log_summary_max_chars = int(os.getenv("LOG_SUMMARY_MAX_CHARS", "10000"))
+log_windows = LogWindowCache(ttl=float(os.getenv("LOG_CACHE_TTL", "600")))
+
+informers_enabled = os.getenv("K8S_INFORMER_ENABLED", "true").lower() == "true"
+
+pod_informer = Informer(
+    "pods",
+    k8s_config.get_client,
+    "list_pod_for_all_namespaces",
+    pod_key,
+    indexers=pod_indexers,
+    resync_period=float(os.getenv("K8S_INFORMER_RESYNC", "300")),
+)
+
+node_informer = Informer(
+    "nodes",
+    k8s_config.get_client,
+    "list_node",
+    node_key,
+    resync_period=float(os.getenv("K8S_INFORMER_RESYNC", "300")),
+)
+
+
+def cached(informer: Informer) -> Informer | None:
+    """
+    Start the informer on first use and return it once its store is complete, None while tools must read the API
+    """
+    if not informers_enabled:
+        return None
+    informer.start()
+    return informer if informer.is_ready() else None
+
+
+def list_pods(namespace: str) -> List[client.V1Pod]:
+    """
+    List the pods of a namespace from the informer cache, or from the API server when the cache is not ready
+    """
+    informer = cached(pod_informer)
+    if informer:
+        return informer.by_index("namespace", namespace)
+    return k8s_config.get_client().list_namespaced_pod(namespace).items
+
+
+def read_pod(pod: str, namespace: str) -> client.V1Pod:
+    """
+    Read a pod from the informer cache, or from the API server when the cache is not ready or does not know the pod yet
+    """
+    informer = cached(pod_informer)
+    pod_info = informer.get((namespace, pod)) if informer else None
+    if pod_info is None:
+        pod_info = k8s_config.get_client().read_namespaced_pod(pod, namespace)
+    return pod_info
+
+
+def resource_table(pods: List[client.V1Pod]) -> Dict[str, List[Any]]:
+    """
+    Build a columnar table of the requests and limits of every container of the pods, CPU in millicores and memory in
+    bytes. Unset values are None.
+    """
+    table = {
+        "pod": [], "container": [], "cpu_request": [], "cpu_limit": [], "memory_request": [], "memory_limit": []
+    }
+    for pod in pods:
+        for container in pod.spec.containers:
+            requests = (container.resources and container.resources.requests) or {}
+            limits = (container.resources and container.resources.limits) or {}
+            table["pod"].append(pod.metadata.name)
+            table["container"].append(container.name)
+            table["cpu_request"].append(to_millicores(requests.get("cpu")))
+            table["cpu_limit"].append(to_millicores(limits.get("cpu")))
+            table["memory_request"].append(to_bytes(requests.get("memory")))
+            table["memory_limit"].append(to_bytes(limits.get("memory")))
+    return table
+
+
+def list_nodes() -> List[client.V1Node]:
+    informer = cached(node_informer)
+    if informer:
+        return informer.list()
+    return k8s_config.get_client().list_node().items
+
+
+def create_log_backend(name: str) -> LogBackend:
+    """
+    Create the log backend selected by LOG_BACKEND: gcp (Google Cloud Logging), kubernetes (API server) or file (JSONL
+    file at LOG_FILE)
+    """
+    if name == "kubernetes":
+        return KubernetesLogBackend(k8s_config.get_client, list_pods, log_windows, log_fetch_budget,
+                                    limit_bytes=int(os.getenv("LOG_READ_BYTES", "10000000")),
+                                    max_concurrency=k8s_config.pool_size)
+    if name == "file":
+        return FileLogBackend(os.getenv("LOG_FILE"), log_windows, log_fetch_budget)
+    return GoogleCloudLogBackend(gcloud_logging_config.get_client, log_windows, log_fetch_budget)
+
+
+log_backend = create_log_backend(os.getenv("LOG_BACKEND", "gcp"))
+
+pod_spec_renderer = PodSpecRenderer()
+
+node_snapshots = NodeSnapshotService(
+    list_nodes,
+    k8s_config.get_custom_objects_client,
+    ttl=float(os.getenv("NODE_SNAPSHOT_TTL", "10")),
+)
+
 
 @tool
 def get_pod_names(namespace: str) -> list[Any] | str:
     """Get pods in given namespace. Returns a list of pod names in the specified namespace."""
-    v1 = k8s_config.get_client()
-
     try:
-        pods = v1.list_namespaced_pod(namespace)
-        return [pod.metadata.name for pod in pods.items]
+        return sorted(pod.metadata.name for pod in list_pods(namespace))
     except client.ApiException as e:
         logging.error(f"Exception when calling CoreV1Api->list_namespaced_pod: {e}")
         return f"Exception when calling CoreV1Api->list_namespaced_pod: {e}"
@@ -42,10 +155,8 @@ def get_pod_resources(pod: str, namespace: str) -> Dict[str, Any] | str:
      Get resources allocated to a specific pod in a namespace. Returns a dictionary with resource requests and
     limits.
     """
-    v1 = k8s_config.get_client()
-
     try:
-        pod_info = v1.read_namespaced_pod(pod, namespace)
+        pod_info = read_pod(pod, namespace)
         containers = pod_info.spec.containers
         resources = {
             'pod': pod,
@@ -66,28 +177,47 @@ def get_pod_resources(pod: str, namespace: str) -> Dict[str, Any] | str:
         logging.error(f"Exception when calling CoreV1Api->read_namespaced_pod: {e}")
         return f"Exception when calling CoreV1Api->read_namespaced_pod: {e}"
 
+@tool
+def get_namespace_resources(namespace: str) -> str:
+    """
+    Get the resources allocated to every container of every pod in a namespace with a single call. Prefer it over
+    get_pod_resources to calculate the usage percentages of all the pods of a namespace.
+
+    Parameters:
+    - namespace (str): The namespace of the pods.
+
+    Returns:
+    - str: A table with one row per container, CPU requests and limits in millicores and memory requests and limits
+    in bytes, "-" when not set.
+
+    Example usage:
+    >>> get_namespace_resources('default')
+    'pod | container | cpu_request_m | cpu_limit_m | memory_request_bytes | memory_limit_bytes\npod1 | app | 100 | 500 | 134217728 | 268435456'
+    """
+    try:
+        table = resource_table(sorted(list_pods(namespace), key=lambda pod: pod.metadata.name))
+
+        def fmt(value: float | None) -> str:
+            return "-" if value is None else f"{value:.0f}"
+
+        lines = ["pod | container | cpu_request_m | cpu_limit_m | memory_request_bytes | memory_limit_bytes"]
+        for row in zip(*table.values(), strict=True):
+            lines.append(" | ".join([row[0], row[1], *[fmt(value) for value in row[2:]]]))
+
+        return "\n".join(lines)
+    except client.ApiException as e:
+        logging.error(f"Exception when calling CoreV1Api->list_namespaced_pod: {e}")
+        return f"Exception when calling CoreV1Api->list_namespaced_pod: {e}"
+
+
 @tool
 def get_nodes_resources() -> List[Dict[str, Any]] | str:
-    """Get nodes resources. Returns a list of nodes resources including capacity and usage."""
-    v1 = k8s_config.get_client()
+    """
+    Get nodes resources. Returns a list of nodes resources including capacity, allocatable and usage, CPU in
+    millicores and memory in bytes, and the CPU and memory usage in percent of the allocatable resources.
+    """
     try:
-        nodes = v1.list_node()
-        metrics_api = custom_objects_api.CustomObjectsApi(ApiClient())
-        node_metrics = metrics_api.list_cluster_custom_object(
-            "metrics.k8s.io", "v1beta1", "nodes"
-        )
-        node_resources = []
-        for node in nodes.items:
-            capacity = node.status.capacity
-            allocatable = node.status.allocatable
-            usage = next((item['usage'] for item in node_metrics['items'] if item['metadata']['name'] == node.metadata.name), {})
-            node_resources.append({
-                'node': node.metadata.name,
-                'capacity': capacity,
-                'allocatable': allocatable,
-                'usage': usage
-            })
-        return node_resources
+        return node_snapshots.snapshot()
     except Exception as e:
         logging.error(f"Exception when calling Metrics API: {e}")
         return f"Exception when calling Metrics API: {e}"
@@ -96,35 +226,37 @@ def get_nodes_resources() -> List[Dict[str, Any]] | str:
 @tool
 def get_pod_logs(logs_filter: str) -> str | list[Any]:
     """
-        Get logs from a pod in a namespace. Returns logs of a pod in the specified namespace.
+        Get logs from a pod in a namespace. Returns the log templates of a pod in the specified namespace: similar
+        lines are grouped in a template where variable parts are replaced by <*>, with their highest severity, number
+        of occurrences and first and last timestamps. The most severe and the rarest templates come first.
 
         Parameters:
         - logs_filter (str): The logs filter in the format of a Google Cloud Logging filter.
 
         Returns:
-        - str: The requested logs.
+        - str: The log templates of the requested logs.
 
         Notes:
         - Always use timestamp>= and timestamp<= to filter logs by time and avoid fetching all unnecessary logs.
 
         Example usage:
         >>> get_pod_logs('resource.type="k8s_container" resource.labels.project_id="plenary-stacker-422509-j4" resource.labels.location="europe-west6-a" resource.labels.cluster_name="gke-monitoring-agent" resource.labels.namespace_name="boutique" labels.k8s-pod/app="adservice" severity>=DEFAULT timestamp>="2024-07-08T16:41:00Z" timestamp<="2024-07-08T16:42:00Z"')
+        '120 entries in 2 templates, showing 2\nseverity | count | first | last | template\nERROR | 3 | 2024-07-08T16:41:12Z | 2024-07-08T16:41:58Z | failed to retrieve ads <*>\nINFO | 117 | 2024-07-08T16:41:00Z | 2024-07-08T16:42:00Z | received ad request context_words <*>'
         """
     try:
-        logging_client = gcloud_logging_config.get_client()
-
-        entries = logging_client.list_entries(filter_=logs_filter, page_size=50)
-
-        formatted_entries = [entry.to_api_repr() for entry in entries]
-
-        # Convert list of entries to a single string
-        entries_str = ''.join(map(str, formatted_entries))
+        entries, complete = log_backend.fetch(logs_filter)
 
-        # Get the last 10000 characters to avoid OpenAI token limit
-        if len(entries_str) > 10000:
-            entries_str = entries_str[-10000:]
+        # Entries are condensed in templates, so larger windows fit in the context of the LLM
+        miner = TemplateMiner()
+        for entry in entries:
+            miner.add_entry(entry)
 
-        return entries_str
+        summary = miner.summary(log_max_templates, log_summary_max_chars)
+        if not complete:
+            last = entries[-1]["timestamp"] if entries else "the start of the window"
+            summary += f"\nThe log budget or read limit was reached, only the entries until {last} were read. Narrow the time " \
+                       f"window to read the rest."
+        return summary
 
     except Exception as e:
         logging.error(f"Exception with get_pod_logs: {e}")
@@ -132,13 +264,23 @@ def get_pod_logs(logs_filter: str) -> str | list[Any]:
 
 
 @tool
-def get_pod_yaml(pod: str, namespace: str) -> str:
-    """Get pod YAML configuration in a namespace. Returns the YAML configuration of a pod in the specified namespace."""
-    v1 = k8s_config.get_client()
+def get_pod_yaml(pod: str, namespace: str, fields: List[str] | None = None) -> str:
+    """
+    Get pod YAML configuration in a namespace. Returns a compact YAML view of a pod in the specified namespace with
+    its phase, node and, for each container, the selected fields.
+
+    Parameters:
+    - pod (str): The name of the pod.
+    - namespace (str): The namespace of the pod.
+    - fields (List[str]): Optional container fields to include among image, resources, probes, env (names only),
+    ports, restartCount, state and lastTermination. All of them by default.
 
+    Example usage:
+    >>> get_pod_yaml('adservice-5d9c8f6b7-x2k4p', 'boutique', ['resources', 'restartCount', 'lastTermination'])
+    'name: adservice-5d9c8f6b7-x2k4p\nnamespace: boutique\nnode: node-1\nphase: Running\ncontainers:\n- name: server\n  resources:\n    limits:\n      memory: 300Mi\n  restartCount: 3\n  lastTermination:\n    reason: OOMKilled\n    exitCode: 137\n    finishedAt: 2024-07-08T16:41:00+00:00\n'
+    """
     try:
-        pod = v1.read_namespaced_pod(pod, namespace)
-        return pod
+        return pod_spec_renderer.render(read_pod(pod, namespace), fields)
     except client.ApiException as e:
         logging.error(f"Exception when calling CoreV1Api->read_namespaced_pod: {e}")
         return f"Exception when calling CoreV1Api->read_namespaced_pod: {e}"
@@ -0,0 +1,242 @@
+import heapq
+import json
+import re
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from google.cloud.logging import ASCENDING
+from kubernetes import client
+
+from app.monitoring_agent.tools.log_fetch import LogWindowCache, WindowTruncated, format_timestamp, \
+    parse_timestamp, split_time_window, take_within_budget
+from app.monitoring_agent.tools.log_templates import severities
+
+_clause = re.compile(r'([\w./-]+)\s*(>=|=)\s*(?:"([^"]*)"|(\S+))')
+
+_level = re.compile(r"\b(EMERGENCY|ALERT|CRITICAL|FATAL|PANIC|ERROR|ERR|WARNING|WARN|NOTICE|INFO|DEBUG)\b", re.I)
+
+_level_aliases = {"FATAL": "CRITICAL", "PANIC": "CRITICAL", "ERR": "ERROR", "WARN": "WARNING"}
+
+# Fields of the filter known for the entries read from the API server, the other labels are specific to Google Cloud
+_kubernetes_fields = ("resource.type", "resource.labels.namespace_name", "resource.labels.pod_name",
+                      "resource.labels.container_name")
+
+
+def parse_log_filter(logs_filter: str) -> Tuple[Dict[str, str], str]:
+    """
+    Parse the equality clauses and the minimum severity of a Cloud Logging filter, the other clauses are ignored
+    """
+    fields, min_severity = {}, "DEFAULT"
+    for field, operator, quoted, value in _clause.findall(logs_filter):
+        if field == "severity" and operator == ">=":
+            min_severity = (quoted or value).upper()
+        elif operator == "=":
+            fields[field] = quoted or value
+    return fields, min_severity
+
+
+def lookup(entry: Dict[str, Any], path: str) -> Any:
+    """
+    Get a field of an entry by its filter path, keys can contain dots like in labels.k8s-pod/app.kubernetes.io/name
+    """
+    if path in entry:
+        return entry[path]
+    for i, char in enumerate(path):
+        if char == "." and isinstance(entry.get(path[:i]), dict):
+            value = lookup(entry[path[:i]], path[i + 1:])
+            if value is not None:
+                return value
+    return None
+
+
+def matches(entry: Dict[str, Any], fields: Dict[str, str], min_severity: str) -> bool:
+    if severities.get(entry.get("severity", "DEFAULT"), 0) < severities.get(min_severity, 0):
+        return False
+    return all(str(lookup(entry, path)) == value for path, value in fields.items())
+
+
+def guess_severity(message: str) -> str:
+    level = _level.search(message[:200])
+    if not level:
+        return "DEFAULT"
+    level = level.group(1).upper()
+    return _level_aliases.get(level, level)
+
+
+class LogBackend(ABC):
+    """
+    Source of log entries in the Cloud Logging API representation. The time window of a filter is split from the
+    resource, the windows are fetched within the budget and cached by the LogWindowCache.
+    """
+
+    def __init__(self, cache: LogWindowCache, budget: int):
+        """
+        Initialize the backend.
+
+        Parameters:
+        - cache (LogWindowCache): Cache of the time windows already fetched.
+        - budget (int): Maximum bytes of entries fetched by a call.
+        """
+        self.cache = cache
+        self.budget = budget
+
+    @abstractmethod
+    def stream(self, resource: str, start: datetime | None, end: datetime | None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the entries of the resource filter in the window [start, end) in chronological order. Raises
+        WindowTruncated after the entries read when the source cannot return the rest of the window.
+        """
+
+    def fetch(self, logs_filter: str) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Fetch the entries of a filter within the budget. Returns the entries and whether all of them were fetched.
+        """
+        resource, start, end = split_time_window(logs_filter)
+        if start is None or end is None:
+            return take_within_budget(self.stream(resource, start, end), self.budget)
+        return self.cache.fetch(resource, start, end, lambda s, e: self.stream(resource, s, e), self.budget)
+
+
+class GoogleCloudLogBackend(LogBackend):
+    """
+    Logs of Google Cloud Logging, the pages are fetched lazily
+    """
+
+    def __init__(self, get_client: Callable, cache: LogWindowCache, budget: int, page_size: int = 500):
+        super().__init__(cache, budget)
+        self.get_client = get_client
+        self.page_size = page_size
+
+    def stream(self, resource: str, start: datetime | None, end: datetime | None) -> Iterator[Dict[str, Any]]:
+        logs_filter = resource
+        if start:
+            logs_filter += f' timestamp>="{format_timestamp(start)}"'
+        if end:
+            logs_filter += f' timestamp<"{format_timestamp(end)}"'
+        for entry in self.get_client().list_entries(filter_=logs_filter, order_by=ASCENDING, page_size=self.page_size):
+            yield entry.to_api_repr()
+
+
+class KubernetesLogBackend(LogBackend):
+    """
+    Logs read from the API server with read_namespaced_pod_log, the containers of the pods are read concurrently.
+    The namespace is required in the filter, pods are selected by resource.labels.pod_name or labels.k8s-pod/<label>
+    and containers by resource.labels.container_name.
+
+    The API server can only read a log forward from a point in time, so each container is read from the start of the
+    window up to limit_bytes. When a container reaches the limit before the end of the window, the entries stop at
+    its last line read and the window is incomplete.
+    """
+
+    def __init__(self, get_client: Callable[[], client.CoreV1Api], list_pods: Callable[[str], List[client.V1Pod]],
+                 cache: LogWindowCache, budget: int, limit_bytes: int = 10 ** 7, max_concurrency: int = 8):
+        super().__init__(cache, budget)
+        self.get_client = get_client
+        self.list_pods = list_pods
+        self.limit_bytes = limit_bytes
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="pod-logs")
+
+    def _containers(self, fields: Dict[str, str]) -> List[Tuple[client.V1Pod, str]]:
+        namespace = fields.get("resource.labels.namespace_name")
+        if not namespace:
+            raise ValueError("The filter must select a namespace with resource.labels.namespace_name")
+
+        entry_fields = {
+            path: value for path, value in fields.items() if path in _kubernetes_fields or path.startswith("labels.")
+        }
+        containers = []
+        for pod in self.list_pods(namespace):
+            for container in pod.spec.containers:
+                if matches(self._resource(pod, container.name), entry_fields, "DEFAULT"):
+                    containers.append((pod, container.name))
+        return containers
+
+    @staticmethod
+    def _resource(pod: client.V1Pod, container: str) -> Dict[str, Any]:
+        return {
+            "resource": {"type": "k8s_container", "labels": {
+                "namespace_name": pod.metadata.namespace,
+                "pod_name": pod.metadata.name,
+                "container_name": container,
+            }},
+            "labels": {f"k8s-pod/{key}": value for key, value in (pod.metadata.labels or {}).items()},
+        }
+
+    def _read(self, pod: client.V1Pod, container: str, start: datetime | None,
+              end: datetime | None) -> Tuple[List[Dict[str, Any]], datetime | None]:
+        """
+        Read the entries of a container in the window. Returns the entries and, when the limit was reached before the
+        end of the window, the timestamp of the last line read.
+        """
+        kwargs = {"container": container, "timestamps": True, "limit_bytes": self.limit_bytes}
+        if start:
+            kwargs["since_seconds"] = max(1, int((datetime.now(timezone.utc) - start).total_seconds()) + 1)
+        text = self.get_client().read_namespaced_pod_log(pod.metadata.name, pod.metadata.namespace, **kwargs)
+
+        lines = text.splitlines()
+        limited = len(text.encode()) >= self.limit_bytes
+        if limited:
+            # The last line may be cut by the limit
+            lines = lines[:-1]
+
+        entries, last = [], start
+        for line in lines:
+            timestamp, _, message = line.partition(" ")
+            try:
+                parsed = parse_timestamp(timestamp)
+            except ValueError:
+                continue
+            last = parsed
+            if (start and parsed < start) or (end and parsed >= end):
+                continue
+            entries.append({
+                "timestamp": format_timestamp(parsed),
+                "severity": guess_severity(message),
+                "textPayload": message,
+                **self._resource(pod, container),
+            })
+        truncated = limited and last is not None and not (end and last >= end)
+        return entries, last if truncated else None
+
+    def stream(self, resource: str, start: datetime | None, end: datetime | None) -> Iterator[Dict[str, Any]]:
+        fields, min_severity = parse_log_filter(resource)
+        containers = self._containers(fields)
+        reads = list(self.executor.map(lambda target: self._read(*target, start, end), containers))
+
+        # The entries are complete until the earliest point where a container was truncated
+        cut = min((truncated for _, truncated in reads if truncated), default=None)
+        for entry in heapq.merge(*(entries for entries, _ in reads), key=lambda entry: entry["timestamp"]):
+            if cut and parse_timestamp(entry["timestamp"]) > cut:
+                break
+            if matches(entry, {}, min_severity):
+                yield entry
+        if cut:
+            raise WindowTruncated(f"The log of a container reached {self.limit_bytes} bytes at {cut}")
+
+
+class FileLogBackend(LogBackend):
+    """
+    Logs read from a JSONL file of entries in the Cloud Logging API representation sorted by timestamp, for example
+    exported with gcloud logging read --format=json. The equality clauses and the severity of the filter are applied.
+    """
+
+    def __init__(self, path: str, cache: LogWindowCache, budget: int):
+        super().__init__(cache, budget)
+        self.path = path
+
+    def stream(self, resource: str, start: datetime | None, end: datetime | None) -> Iterator[Dict[str, Any]]:
+        fields, min_severity = parse_log_filter(resource)
+        with open(self.path) as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                timestamp = parse_timestamp(entry["timestamp"])
+                if start and timestamp < start:
+                    continue
+                if end and timestamp >= end:
+                    break
+                if matches(entry, fields, min_severity):
+                    yield entry
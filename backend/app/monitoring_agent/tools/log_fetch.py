@@ -0,0 +1,176 @@
+import bisect
+import json
+import re
+import threading
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from app.monitoring_agent.cache import MISSING, TTLCache
+
+# A timestamp clause with the AND operator joining it to the other clauses, so the resource filter stays valid
+_timestamp_clause = re.compile(r'\s*(?:\bAND\s+)?\btimestamp\s*(>=|<=|>|<)\s*"([^"]+)"(?:\s+AND\b)?')
+
+_fraction = re.compile(r"\.(\d+)")
+
+_resolution = timedelta(microseconds=1)
+
+
+def parse_timestamp(value: str) -> datetime:
+    # Fractions are read as microseconds, the API server and Cloud Logging return nanoseconds
+    value = _fraction.sub(lambda fraction: "." + fraction.group(1)[:6].ljust(6, "0"), value.replace("Z", "+00:00"), 1)
+    timestamp = datetime.fromisoformat(value)
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def format_timestamp(timestamp: datetime) -> str:
+    return timestamp.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def split_time_window(logs_filter: str) -> Tuple[str, datetime | None, datetime | None]:
+    """
+    Split a Cloud Logging filter in the filter of the resource and its time window. The window is returned as a
+    half-open interval [start, end), None when it is not bounded.
+    """
+    start = end = None
+    for operator, value in _timestamp_clause.findall(logs_filter):
+        timestamp = parse_timestamp(value)
+        if operator == ">=":
+            start = timestamp
+        elif operator == ">":
+            start = timestamp + _resolution
+        elif operator == "<=":
+            end = timestamp + _resolution
+        else:
+            end = timestamp
+    return " ".join(_timestamp_clause.sub("", logs_filter).split()), start, end
+
+
+class WindowTruncated(Exception):
+    """
+    Raised by a log source after the entries it could read, when it reached its own limit before the end of the window
+    """
+
+
+def take_within_budget(entries: Iterable[Dict[str, Any]], max_bytes: int) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Consume entries until their size reaches the budget or the source is truncated, the remaining pages are never
+    fetched. Returns the entries and whether all of them were consumed.
+    """
+    taken, size = [], 0
+    try:
+        for entry in entries:
+            size += len(json.dumps(entry, default=str))
+            if size > max_bytes:
+                return taken, False
+            taken.append(entry)
+    except WindowTruncated:
+        return taken, False
+    return taken, True
+
+
+class LogWindowCache:
+    """
+    Cache of the log entries fetched for each resource, indexed by the time segments already fetched. A request only
+    fetches the parts of its window that are not covered yet.
+    """
+
+    def __init__(self, max_resources: int = 128, ttl: float = 600.0, settle: float = 60.0):
+        """
+        Initialize the cache.
+
+        Parameters:
+        - max_resources (int): Maximum number of resources (filters without time window) kept in the cache.
+        - ttl (float): Seconds during which the entries of a resource are kept.
+        - settle (float): Seconds after which logs are considered complete, more recent segments are not cached.
+        """
+        self.cache = TTLCache(max_size=max_resources, ttl=ttl)
+        self.settle = timedelta(seconds=settle)
+        self.lock = threading.Lock()
+        # A lock only lives while a fetch of its resource holds it
+        self.resource_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+    def _segments(self, resource: str) -> List[list]:
+        segments = self.cache.get(resource)
+        if segments is MISSING:
+            segments = []
+            self.cache.set(resource, segments)
+        return segments
+
+    def missing(self, resource: str, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """
+        Parts of the window [start, end) not covered by the cached segments
+        """
+        gaps, cursor = [], start
+        with self.lock:
+            for segment_start, segment_end, _ in self._segments(resource):
+                if segment_end <= cursor or segment_start >= end:
+                    continue
+                if segment_start > cursor:
+                    gaps.append((cursor, segment_start))
+                cursor = max(cursor, segment_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def add(self, resource: str, start: datetime, end: datetime, entries: List[Dict[str, Any]]) -> datetime:
+        """
+        Cache the entries fetched for the segment [start, end), the segment must not overlap the cached ones. Returns
+        the end of the cached part, which excludes the logs that may not be complete yet.
+        """
+        end = max(start, min(end, datetime.now(timezone.utc) - self.settle))
+        if end == start:
+            return end
+        timestamped = [(parse_timestamp(entry["timestamp"]), entry) for entry in entries
+                       if start <= parse_timestamp(entry["timestamp"]) < end]
+        with self.lock:
+            segments = self._segments(resource)
+            bisect.insort(segments, [start, end, timestamped], key=lambda segment: segment[0])
+
+            # Merge the contiguous segments
+            merged = [segments[0]]
+            for segment in segments[1:]:
+                if segment[0] <= merged[-1][1]:
+                    merged[-1] = [merged[-1][0], max(merged[-1][1], segment[1]), merged[-1][2] + segment[2]]
+                else:
+                    merged.append(segment)
+            segments[:] = merged
+        return end
+
+    def entries(self, resource: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [entry for _, _, timestamped in self._segments(resource)
+                    for timestamp, entry in timestamped if start <= timestamp < end]
+
+    def resource_lock(self, resource: str) -> threading.Lock:
+        with self.lock:
+            return self.resource_locks.setdefault(resource, threading.Lock())
+
+    def fetch(self, resource: str, start: datetime, end: datetime,
+              fetch_range: Callable[[datetime, datetime], Iterable[Dict[str, Any]]],
+              max_bytes: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Get the entries of the window, fetching the missing parts with fetch_range in chronological order until the
+        budget is reached. Returns the entries sorted by timestamp and whether the window is complete. When the budget
+        is reached, the entries stop at the last one fetched.
+
+        The fetches of a resource are serialized, so concurrent calls never fetch and cache the same part twice.
+        """
+        with self.resource_lock(resource):
+            cached = self.entries(resource, start, end)
+            fetched: List[Dict[str, Any]] = []
+            complete = True
+            for gap_start, gap_end in self.missing(resource, start, end):
+                entries, complete = take_within_budget(fetch_range(gap_start, gap_end), max_bytes)
+                max_bytes -= sum(len(json.dumps(entry, default=str)) for entry in entries)
+                covered = gap_end if complete else (
+                    parse_timestamp(entries[-1]["timestamp"]) if entries else gap_start
+                )
+                self.add(resource, gap_start, covered, entries)
+                fetched.extend(entries)
+                if not complete:
+                    # The cached entries after the gap are not returned, so the entries have no hole
+                    cached = [entry for entry in cached if parse_timestamp(entry["timestamp"]) < gap_start]
+                    break
+
+        return sorted(cached + fetched, key=lambda entry: parse_timestamp(entry["timestamp"])), complete
@@ -0,0 +1,152 @@
+import json
+import re
+from typing import Any, Dict, List
+
+# Rank of the Cloud Logging severities, unknown severities rank as DEFAULT
+severities = {
+    "DEFAULT": 0, "DEBUG": 100, "INFO": 200, "NOTICE": 300, "WARNING": 400, "ERROR": 500, "CRITICAL": 600,
+    "ALERT": 700, "EMERGENCY": 800,
+}
+
+WILDCARD = "<*>"
+
+_separators = re.compile(r"[\s,;=\"'()\[\]{}]+")
+
+
+def tokenize(message: str) -> List[str]:
+    return [token for token in _separators.split(message.strip()) if token]
+
+
+def entry_message(entry: Dict[str, Any]) -> str:
+    """
+    Get the message of a Cloud Logging entry from its text or JSON payload
+    """
+    if entry.get("textPayload"):
+        return entry["textPayload"]
+    payload = entry.get("jsonPayload") or entry.get("protoPayload") or {}
+    for key in ("message", "msg", "error"):
+        if isinstance(payload.get(key), str):
+            return payload[key]
+    return json.dumps(payload, sort_keys=True, default=str)
+
+
+class LogTemplate:
+    """
+    Template of a group of similar log lines, variable tokens are replaced by a wildcard
+    """
+
+    def __init__(self, tokens: List[str], severity: str, timestamp: str | None):
+        self.tokens = tokens
+        self.count = 1
+        self.severity = severity
+        self.first = timestamp
+        self.last = timestamp
+
+    def similarity(self, tokens: List[str]) -> float:
+        return sum(1 for a, b in zip(self.tokens, tokens, strict=True) if a == b) / len(tokens)
+
+    def add(self, tokens: List[str], severity: str, timestamp: str | None):
+        self.tokens = [a if a == b else WILDCARD for a, b in zip(self.tokens, tokens, strict=True)]
+        self.count += 1
+        if severities.get(severity, 0) > severities.get(self.severity, 0):
+            self.severity = severity
+        if timestamp:
+            self.first = min(self.first or timestamp, timestamp)
+            self.last = max(self.last or timestamp, timestamp)
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+
+class TemplateMiner:
+    """
+    Streaming log template miner based on Drain. Lines are routed by their number of tokens and their first tokens,
+    then joined to the most similar template of that group or start a new one.
+    """
+
+    def __init__(self, depth: int = 3, similarity: float = 0.5, max_templates: int = 1000):
+        """
+        Initialize the miner.
+
+        Parameters:
+        - depth (int): Number of leading tokens used to route a line, tokens with digits are routed as a wildcard.
+        - similarity (float): Minimum share of identical tokens to join a template.
+        - max_templates (int): Maximum number of templates, further new lines join the most similar template of
+        their group, or a single template of the other lines when their group has none.
+        """
+        self.depth = depth
+        self.similarity = similarity
+        self.max_templates = max_templates
+        self.groups: Dict[tuple, List[LogTemplate]] = {}
+        self.templates: List[LogTemplate] = []
+        self.overflow: LogTemplate | None = None
+        self.entries = 0
+
+    def _route(self, tokens: List[str]) -> tuple:
+        prefix = [WILDCARD if any(c.isdigit() for c in token) else token for token in tokens[:self.depth]]
+        return (len(tokens), *prefix)
+
+    def add(self, message: str, severity: str = "DEFAULT", timestamp: str | None = None) -> LogTemplate:
+        """
+        Add a log line and return its template
+        """
+        self.entries += 1
+        tokens = [WILDCARD if token.isdigit() else token for token in tokenize(message)] or [""]
+        group = self.groups.setdefault(self._route(tokens), [])
+
+        best = max(group, key=lambda template: template.similarity(tokens), default=None)
+        # The last template left under the cap is kept for the lines of the groups without a template
+        full = len(self.templates) >= self.max_templates - (self.overflow is None)
+        if best and (best.similarity(tokens) >= self.similarity or full):
+            best.add(tokens, severity, timestamp)
+            return best
+        if full:
+            # No template of the group to join, the line is counted in the template of the other lines
+            if self.overflow is None:
+                self.overflow = LogTemplate([WILDCARD], severity, timestamp)
+                self.templates.append(self.overflow)
+            else:
+                self.overflow.add(self.overflow.tokens, severity, timestamp)
+            return self.overflow
+
+        template = LogTemplate(tokens, severity, timestamp)
+        group.append(template)
+        self.templates.append(template)
+        return template
+
+    def add_entry(self, entry: Dict[str, Any]) -> LogTemplate:
+        """
+        Add a Cloud Logging entry in its API representation
+        """
+        return self.add(entry_message(entry), entry.get("severity", "DEFAULT"), entry.get("timestamp"))
+
+    def ranked(self) -> List[LogTemplate]:
+        """
+        Templates by decreasing severity, then the rarest first
+        """
+        return sorted(self.templates, key=lambda template: (-severities.get(template.severity, 0), template.count))
+
+    def summary(self, limit: int = 50, max_chars: int = 10000, max_template_chars: int = 500) -> str:
+        """
+        Format the top templates as a table with their severity, count and first and last timestamps. Each template
+        is cut at max_template_chars and the rows stop before the table exceeds max_chars, as a template can hold a
+        whole JSON payload.
+        """
+        ranked = self.ranked()
+        rows = []
+        size = 0
+        for template in ranked[:limit]:
+            text = template.template
+            if len(text) > max_template_chars:
+                text = text[:max_template_chars] + "..."
+            row = f"{template.severity} | {template.count} | {template.first} | {template.last} | {text}"
+            size += len(row) + 1
+            if size > max_chars:
+                break
+            rows.append(row)
+        lines = [
+            f"{self.entries} entries in {len(ranked)} templates, showing {len(rows)}",
+            "severity | count | first | last | template",
+        ]
+        return "\n".join(lines + rows)
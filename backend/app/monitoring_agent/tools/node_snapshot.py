@@ -0,0 +1,76 @@
+from typing import Any, Callable, Dict, List
+
+from kubernetes import client
+
+from app.monitoring_agent.cache import MISSING, TTLCache
+from app.monitoring_agent.tools.quantity import to_bytes, to_millicores
+
+
+def normalize_resources(resources: Dict[str, str] | None) -> Dict[str, float]:
+    """
+    Convert Kubernetes quantities to numbers, CPU in millicores and the other resources (memory, storage, pods) in
+    their base unit
+    """
+    return {
+        name: to_millicores(quantity) if name == "cpu" else to_bytes(quantity)
+        for name, quantity in (resources or {}).items()
+    }
+
+
+def _percent(usage: float | None, allocatable: float | None) -> float | None:
+    if usage is None or not allocatable:
+        return None
+    return round(usage / allocatable * 100, 1)
+
+
+def join_node_metrics(nodes: List[client.V1Node], metrics_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Join the usage reported by the metrics API to the nodes by name
+    """
+    usage_by_node = {item["metadata"]["name"]: item["usage"] for item in metrics_items}
+
+    snapshot = []
+    for node in nodes:
+        allocatable = normalize_resources(node.status.allocatable)
+        usage = normalize_resources(usage_by_node.get(node.metadata.name))
+        snapshot.append({
+            "node": node.metadata.name,
+            "capacity": normalize_resources(node.status.capacity),
+            "allocatable": allocatable,
+            "usage": usage,
+            "cpu_usage_percent": _percent(usage.get("cpu"), allocatable.get("cpu")),
+            "memory_usage_percent": _percent(usage.get("memory"), allocatable.get("memory")),
+        })
+    return snapshot
+
+
+class NodeSnapshotService:
+    """
+    Snapshot of the capacity, allocatable resources and usage of every node, shared by the tools and the
+    pre-analysis and cached for a short time to live
+    """
+
+    def __init__(self, list_nodes: Callable[[], List[client.V1Node]],
+                 get_metrics_api: Callable[[], client.CustomObjectsApi], ttl: float = 10.0):
+        """
+        Initialize the service.
+
+        Parameters:
+        - list_nodes (callable): Returns the nodes of the cluster.
+        - get_metrics_api (callable): Returns the long-lived client of the metrics API.
+        - ttl (float): Seconds during which a snapshot is reused.
+        """
+        self.list_nodes = list_nodes
+        self.get_metrics_api = get_metrics_api
+        self.cache = TTLCache(max_size=1, ttl=ttl)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Get the current snapshot, CPU in millicores and memory in bytes
+        """
+        snapshot = self.cache.get("nodes")
+        if snapshot is MISSING:
+            node_metrics = self.get_metrics_api().list_cluster_custom_object("metrics.k8s.io", "v1beta1", "nodes")
+            snapshot = join_node_metrics(self.list_nodes(), node_metrics["items"])
+            self.cache.set("nodes", snapshot)
+        return snapshot
@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+import yaml
+from kubernetes import client
+
+from app.monitoring_agent.cache import MISSING, TTLCache
+
+# Fields of the containers that can be projected, all of them by default
+pod_spec_fields = ["image", "resources", "probes", "env", "ports", "restartCount", "state", "lastTermination"]
+
+# Values set by the API server when omitted, they carry no information for the diagnostic
+_probe_defaults = {"timeoutSeconds": 1, "periodSeconds": 10, "successThreshold": 1, "failureThreshold": 3}
+
+
+def to_manifest(obj: Any) -> Any:
+    """
+    Convert a Kubernetes model to plain data with the camelCase keys of the manifests, dropping unset values
+    """
+    if isinstance(obj, list):
+        return [to_manifest(item) for item in obj]
+    if isinstance(obj, dict):
+        return {key: to_manifest(value) for key, value in obj.items() if value is not None}
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if hasattr(obj, "openapi_types"):
+        return {
+            obj.attribute_map[attr]: to_manifest(getattr(obj, attr))
+            for attr in obj.openapi_types
+            if getattr(obj, attr) is not None
+        }
+    return obj
+
+
+def _probe(probe: client.V1Probe | None) -> Dict[str, Any] | None:
+    if probe is None:
+        return None
+    return {key: value for key, value in to_manifest(probe).items() if _probe_defaults.get(key) != value}
+
+
+def _container(container: client.V1Container, status: client.V1ContainerStatus | None,
+               fields: List[str]) -> Dict[str, Any]:
+    spec: Dict[str, Any] = {"name": container.name}
+    if "image" in fields:
+        spec["image"] = container.image
+    if "resources" in fields and container.resources:
+        spec["resources"] = to_manifest(container.resources)
+    if "probes" in fields:
+        for name in ("liveness_probe", "readiness_probe", "startup_probe"):
+            probe = _probe(getattr(container, name))
+            if probe:
+                spec[container.attribute_map[name]] = probe
+    if "env" in fields and container.env:
+        spec["env"] = [env.name for env in container.env]
+    if "ports" in fields and container.ports:
+        spec["ports"] = [port.container_port for port in container.ports]
+    if status is not None:
+        if "restartCount" in fields:
+            spec["restartCount"] = status.restart_count
+        if "state" in fields and status.state:
+            spec["state"] = to_manifest(status.state)
+        terminated = status.last_state and status.last_state.terminated
+        if "lastTermination" in fields and terminated:
+            spec["lastTermination"] = {
+                "reason": terminated.reason,
+                "exitCode": terminated.exit_code,
+                "finishedAt": to_manifest(terminated.finished_at),
+            }
+    return {key: value for key, value in spec.items() if value not in (None, {}, [])}
+
+
+def render_pod_spec(pod: client.V1Pod, fields: List[str] | None = None) -> str:
+    """
+    Render a compact YAML view of a pod, with its phase, node and the projected fields of each container. Managed
+    fields, status history and default values are left out.
+    """
+    fields = [field for field in (fields or pod_spec_fields) if field in pod_spec_fields] or pod_spec_fields
+    statuses = {status.name: status for status in (pod.status and pod.status.container_statuses) or []}
+
+    view = {
+        "name": pod.metadata.name,
+        "namespace": pod.metadata.namespace,
+        "labels": pod.metadata.labels,
+        "node": pod.spec.node_name,
+        "phase": pod.status and pod.status.phase,
+        "initContainers": [_container(c, statuses.get(c.name), fields) for c in pod.spec.init_containers or []],
+        "containers": [_container(c, statuses.get(c.name), fields) for c in pod.spec.containers],
+    }
+    view = {key: value for key, value in view.items() if value not in (None, {}, [])}
+    return yaml.safe_dump(view, sort_keys=False, default_flow_style=False)
+
+
+class PodSpecRenderer:
+    """
+    Render pod specs and cache them per pod and resourceVersion, a new version of a pod is rendered again
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 3600.0):
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def render(self, pod: client.V1Pod, fields: List[str] | None = None) -> str:
+        key = (pod.metadata.namespace, pod.metadata.name, pod.metadata.resource_version, tuple(fields or ()))
+        rendered = self.cache.get(key)
+        if rendered is MISSING:
+            rendered = render_pod_spec(pod, fields)
+            self.cache.set(key, rendered)
+        return rendered
@@ -1,15 +1,65 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
 from dotenv import load_dotenv
 from langchain_core.tools import tool
-from prometheus_api_client import PrometheusConnect
+
+from app.monitoring_agent.config.prometheus_config import PrometheusClient
+from app.monitoring_agent.tools.promql_cache import PromQLCache
+from app.monitoring_agent.tools.series_summary import format_summary, summarize_series
 
 load_dotenv()
 
+prometheus = PrometheusClient(
+    url=os.getenv("PROMETHEUS_URL", "http://localhost:9090"),
+    timeout=float(os.getenv("PROMETHEUS_TIMEOUT", "10")),
+    connect_timeout=float(os.getenv("PROMETHEUS_CONNECT_TIMEOUT", "3")),
+    pool_size=int(os.getenv("PROMETHEUS_POOL_SIZE", "10")),
+    health_interval=float(os.getenv("PROMETHEUS_HEALTH_INTERVAL", "30")),
+)
+
+# Shared by all the runs of the process, equivalent queries sent in the same time bucket hit Prometheus once
+promql_cache = PromQLCache(
+    prometheus,
+    ttl=float(os.getenv("PROMQL_CACHE_TTL", "30")),
+    step=float(os.getenv("PROMQL_CACHE_STEP", "15")),
+    max_size=int(os.getenv("PROMQL_CACHE_SIZE", "512")),
+)
+
+# Bounds the number of queries in flight to Prometheus for the whole process
+query_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PROMETHEUS_MAX_CONCURRENCY", "8")),
+    thread_name_prefix="prometheus-query",
+)
+
+
+def run_prometheus_query(query: str) -> str:
+    """
+    Execute a PromQL query with the shared Prometheus client and format the result for the LLM.
+    """
+    try:
+        if not prometheus.is_healthy():
+            return "Prometheus is not available"
+
+        # Sanitize input to avoid injection
+        sanitized_query = query.replace('\\"', '"')
+
+        # Execute the query
+        data = promql_cache.query(sanitized_query)
+
+        # Format the output
+        result = "\n".join([f"{metric['metric']}: {metric['value'][1]}" for metric in data])
+
+        return result
+    except Exception as e:
+        return f"Error executing Prometheus query: {e}"
+
 
 @tool
 def execute_prometheus_query(query: str) -> str:
     """
-    Executes a custom Prometheus query with the prometheus_api_client and returns the result.
+    Executes a custom Prometheus query with the shared Prometheus client and returns the result.
 
     Parameters:
     - query (str): The PromQL query to execute without query
@@ -26,27 +76,67 @@ def execute_prometheus_query(query: str) -> str:
     '{job="metric-app"}: 0'
     """
 
-    try:
-        prometheus_url = os.getenv("PROMETHEUS_URL", "http://localhost:9090")
+    return run_prometheus_query(query)
+
+
+@tool
+def execute_prometheus_queries(queries: List[str]) -> str:
+    """
+    Executes several Prometheus queries concurrently and returns all the results in a single response. Prefer this
+    tool over execute_prometheus_query when several metrics are needed, e.g. CPU, memory, network, requests per second
+    and latency of the pods of a namespace.
+
+    Parameters:
+    - queries (List[str]): The PromQL queries to execute.
+
+    Returns:
+    - str: The result of each query, labelled with the query.
+
+    Example usage:
+    >>> execute_prometheus_queries(['sum(rate(container_cpu_usage_seconds_total{namespace="default"}[5m])) by (pod)', 'sum(container_memory_working_set_bytes{namespace="default"}) by (pod)'])
+    '# sum(rate(container_cpu_usage_seconds_total{namespace="default"}[5m])) by (pod)\n{pod="pod1"}: 0.85\n\n# sum(container_memory_working_set_bytes{namespace="default"}) by (pod)\n{pod="pod1"}: 104857600'
+    """
+    results = query_executor.map(run_prometheus_query, queries)
+
+    return "\n\n".join([f"# {query}\n{result or 'No data found'}" for query, result in zip(queries, results, strict=True)])
 
-        # Connect to Prometheus
-        prometheus = PrometheusConnect(url=prometheus_url, disable_ssl=True)
 
-        if not prometheus.check_prometheus_connection():
+@tool
+def execute_prometheus_range_query(query: str, minutes: int = 5, step: int = 15, threshold: float | None = None) -> str:
+    """
+    Executes a Prometheus range query and returns a summary of each series instead of the raw samples. Use it to get
+    the trend of a metric over the last minutes.
+
+    Parameters:
+    - query (str): The PromQL query to execute.
+    - minutes (int): The size of the time window ending now, in minutes.
+    - step (int): The resolution of the query, in seconds.
+    - threshold (float): Optional threshold, the summary then includes the time spent above it.
+
+    Returns:
+    - str: For each series, the min, max, mean, p95, last value, slope per minute and time above the threshold.
+
+    Example usage:
+    Returns the trend of the CPU usage of the pods of a namespace over the last 5 minutes:
+    >>> execute_prometheus_range_query('sum(rate(container_cpu_usage_seconds_total{namespace="default"}[1m])) by (pod)', 5, 15, 0.8)
+    '{'pod': 'pod1'}: min=0.5 max=0.9 mean=0.7 p95=0.88 last=0.85 slope=+0.08/min above_0.8=90s/300s'
+    """
+    try:
+        if not prometheus.is_healthy():
             return "Prometheus is not available"
 
-        # Sanitize input to avoid injection
         sanitized_query = query.replace('\\"', '"')
+        data = promql_cache.query_range(sanitized_query, minutes=minutes, step=step)
 
-        # Execute the query
-        data = prometheus.custom_query(query=sanitized_query)
-
-        # Format the output
-        result = "\n".join([f"{metric['metric']}: {metric['value'][1]}" for metric in data])
+        result = "\n".join(
+            [format_summary(series["metric"], summarize_series(series["values"], threshold), threshold)
+             for series in data]
+        )
 
-        return result
+        return result or "No data found"
     except Exception as e:
-        return f"Error executing Prometheus query: {e}"
+        return f"Error executing Prometheus range query: {e}"
+
 
 @tool
 def get_http_request_per_seconds_by_job(job: str) -> str:
@@ -68,4 +158,4 @@ def get_http_request_per_seconds_by_job(job: str) -> str:
     """
 
     query = f'sum(rate(request_duration_seconds_count{{job="{job}"}}[5m])) by (job)'
-    return execute_prometheus_query(query)
\ No newline at end of file
+    return run_prometheus_query(query)
@@ -0,0 +1,118 @@
+import re
+import time
+from typing import Any
+
+from app.monitoring_agent.cache import MISSING, TTLCache
+from app.monitoring_agent.config.prometheus_config import PrometheusClient
+
+_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`[^`]*`|\s+|[A-Za-z0-9_:.]+|.')
+_WORD_RE = re.compile(r"[A-Za-z0-9_:.]+")
+
+
+def _split_list(tokens: list[str]) -> list[str]:
+    """
+    Split the tokens of a comma separated list and return the sorted items
+    """
+    items, current = [], []
+    for token in tokens:
+        if token == ",":
+            items.append("".join(current))
+            current = []
+        else:
+            current.append(token)
+    items.append("".join(current))
+    return sorted(item for item in items if item)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a PromQL query so semantically identical queries share the same text. Whitespace outside of string
+    literals is removed, label matchers and by/without grouping labels are sorted.
+
+    Example usage:
+    >>> normalize_query('sum(rate(x{pod="a", namespace="b"}[5m]))  by (pod, namespace)')
+    'sum(rate(x{namespace="b",pod="a"}[5m]))by(namespace,pod)'
+    """
+    tokens = _TOKEN_RE.findall(query.strip())
+
+    # Keep a single space only where it separates two words, e.g. "sum by" or "offset 5m"
+    compact: list[str] = []
+    for i, token in enumerate(tokens):
+        if token.isspace():
+            if compact and i + 1 < len(tokens) and _WORD_RE.fullmatch(compact[-1]) and _WORD_RE.fullmatch(tokens[i + 1]):
+                compact.append(" ")
+            continue
+        compact.append(token)
+
+    result: list[str] = []
+    i = 0
+    while i < len(compact):
+        token = compact[i]
+        closing = None
+        if token == "{":
+            closing = "}"
+        elif token == "(" and result and result[-1].lower() in ("by", "without"):
+            closing = ")"
+
+        if closing is None:
+            result.append(token)
+            i += 1
+            continue
+
+        end = i + 1
+        while end < len(compact) and compact[end] != closing:
+            end += 1
+        result.append(token + ",".join(_split_list(compact[i + 1:end])) + closing)
+        i = end + 1
+
+    return "".join(result)
+
+
+class PromQLCache:
+    """
+    Cache of PromQL instant query results keyed by the normalized query and the evaluation time bucket
+    """
+
+    def __init__(self, client: PrometheusClient, ttl: float = 30.0, step: float = 15.0, max_size: int = 512):
+        """
+        Initialize the cache. Queries are evaluated at the start of their time bucket of size step, so every query
+        sent in the same bucket returns exactly the same result.
+        """
+        self.client = client
+        self.step = step
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def bucket(self, now: float | None = None) -> float:
+        now = time.time() if now is None else now
+        if self.step <= 0:
+            return now
+        return (now // self.step) * self.step
+
+    def query(self, query: str, now: float | None = None) -> list[Any]:
+        """
+        Execute an instant query or return the cached result of an equivalent query in the same time bucket
+        """
+        evaluation_time = self.bucket(now)
+        key = (normalize_query(query), evaluation_time)
+
+        data = self.cache.get(key)
+        if data is MISSING:
+            data = self.client.query(query, time=evaluation_time)
+            self.cache.set(key, data)
+        return data
+
+    def query_range(self, query: str, minutes: float, step: float, now: float | None = None) -> list[Any]:
+        """
+        Execute a range query over the last minutes ending at the current time bucket, or return the cached result
+        """
+        end = self.bucket(now)
+        key = (normalize_query(query), end, minutes, step)
+
+        data = self.cache.get(key)
+        if data is MISSING:
+            data = self.client.query_range(query, start=end - minutes * 60, end=end, step=step)
+            self.cache.set(key, data)
+        return data
+
+    def stats(self) -> dict[str, Any]:
+        return self.cache.stats()
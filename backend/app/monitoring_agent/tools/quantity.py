@@ -0,0 +1,19 @@
+from kubernetes.utils import parse_quantity
+
+
+def to_millicores(quantity: str | None) -> float | None:
+    """
+    Convert a Kubernetes CPU quantity (e.g. "250m" or "2") to millicores
+    """
+    if quantity is None:
+        return None
+    return float(parse_quantity(quantity) * 1000)
+
+
+def to_bytes(quantity: str | None) -> float | None:
+    """
+    Convert a Kubernetes memory quantity (e.g. "128Mi" or "1G") to bytes
+    """
+    if quantity is None:
+        return None
+    return float(parse_quantity(quantity))
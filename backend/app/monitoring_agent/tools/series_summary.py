@@ -0,0 +1,62 @@
+from typing import Any
+
+import numpy as np
+
+
+def summarize_series(values: list[list[Any]], threshold: float | None = None) -> dict[str, float]:
+    """
+    Reduce the samples of a Prometheus matrix series to a compact summary.
+
+    Parameters:
+    - values (list): The [timestamp, "value"] samples of the series as returned by Prometheus.
+    - threshold (float): Optional threshold, the time spent above it is added to the summary.
+
+    Returns:
+    - dict: The min, max, mean, p95, last value and slope per minute of the series, the observed duration in seconds
+    and, if a threshold is given, the number of seconds above the threshold.
+    """
+    samples = np.asarray(values, dtype=float).reshape(-1, 2)
+    samples = samples[np.isfinite(samples[:, 1])]
+    if samples.size == 0:
+        return {}
+
+    timestamps, points = samples[:, 0], samples[:, 1]
+
+    # Each sample is considered valid until the next one, the last one for a typical interval
+    intervals = np.diff(timestamps)
+    last_interval = float(np.median(intervals)) if intervals.size else 0.0
+    intervals = np.append(intervals, last_interval)
+
+    if points.size > 1 and np.ptp(timestamps) > 0:
+        slope = float(np.polyfit(timestamps - timestamps[0], points, 1)[0]) * 60
+    else:
+        slope = 0.0
+
+    summary = {
+        "min": float(points.min()),
+        "max": float(points.max()),
+        "mean": float(points.mean()),
+        "p95": float(np.percentile(points, 95)),
+        "last": float(points[-1]),
+        "slope": slope,
+        "duration": float(intervals.sum()),
+    }
+    if threshold is not None:
+        summary["above"] = float(intervals[points > threshold].sum())
+    return summary
+
+
+def format_summary(metric: dict[str, str], summary: dict[str, float], threshold: float | None = None) -> str:
+    """
+    Format a series summary on a single line for the LLM
+    """
+    if not summary:
+        return f"{metric}: no data"
+
+    line = (
+        f"{metric}: min={summary['min']:.4g} max={summary['max']:.4g} mean={summary['mean']:.4g} "
+        f"p95={summary['p95']:.4g} last={summary['last']:.4g} slope={summary['slope']:+.4g}/min"
+    )
+    if threshold is not None:
+        line += f" above_{threshold:g}={summary['above']:.0f}s/{summary['duration']:.0f}s"
+    return line
@@ -0,0 +1,60 @@
+from typing import Callable, Dict, List, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+# Agents whose conclusions are passed to the later agents
+concluding_agents = ["metric_analyser", "diagnostic", "solution"]
+
+
+def conclusions(messages: Sequence[BaseMessage]) -> List[AIMessage]:
+    """
+    Final messages of the agents, without the tool calls and their outputs
+    """
+    return [
+        message for message in messages
+        if isinstance(message, AIMessage) and message.name in concluding_agents and not message.tool_calls
+        and message.content
+    ]
+
+
+def full_view(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """
+    All the messages, for the agents that work with the tool outputs
+    """
+    return list(messages)
+
+
+def conclusions_view(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """
+    The request followed by the conclusions of the previous agents
+    """
+    return [messages[0], *conclusions(messages)]
+
+
+def findings_view(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """
+    The request followed by a single message with the conclusion of each previous agent
+    """
+    sections = [f"## {message.name}\n{message.content}" for message in conclusions(messages)]
+    return [messages[0], HumanMessage(content="Findings of the previous agents:\n\n" + "\n\n".join(sections))]
+
+
+message_views: Dict[str, Callable[[Sequence[BaseMessage]], List[BaseMessage]]] = {
+    "full": full_view,
+    "conclusions": conclusions_view,
+    "findings": findings_view,
+}
+
+
+def parse_views(views: str | None) -> Dict[str, Callable[[Sequence[BaseMessage]], List[BaseMessage]]]:
+    """
+    Parse the views of the agents in the format "agent=view,agent=view", the other agents see all the messages
+    """
+    parsed = {}
+    for item in (views or "").split(","):
+        if "=" in item:
+            agent, view = item.split("=", 1)
+            if view.strip() not in message_views:
+                raise ValueError(f"Unknown message view: {view}, expected one of {', '.join(message_views)}")
+            parsed[agent.strip()] = message_views[view.strip()]
+    return parsed
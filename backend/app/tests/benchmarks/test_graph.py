@@ -0,0 +1,139 @@
+import asyncio
+import tracemalloc
+import uuid
+from collections import defaultdict
+from collections.abc import Generator
+from time import perf_counter
+from typing import Any
+
+import pytest
+from langchain_core.callbacks import AsyncCallbackHandler
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models import AgentRun, Event
+from app.monitoring_agent import main
+from app.monitoring_agent.fan_out import analysis_request
+from app.tests.support.agents import incident_script, install_scripted_agents
+from app.tests.support.fake_cluster import FakeCluster, install_fake_cluster
+from app.websocket.websocket import ConnectionManager
+
+NAMESPACES = ["boutique", "default", "payments"]
+LLM_LATENCY = 0.05
+
+
+class NodeTimer(AsyncCallbackHandler):
+    """
+    Wall time of every execution of the nodes of the graph, the nodes of a subgraph are counted under their own name
+    """
+
+    def __init__(self):
+        self.starts: dict[uuid.UUID, tuple[str, float]] = {}
+        self.durations: dict[str, list[float]] = defaultdict(list)
+
+    async def on_chain_start(self, serialized: dict[str, Any], inputs: dict[str, Any], *, run_id: uuid.UUID,
+                             metadata: dict[str, Any] | None = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self.starts[run_id] = (node, perf_counter())
+
+    async def on_chain_end(self, outputs: Any, *, run_id: uuid.UUID, **kwargs: Any) -> None:
+        if run_id in self.starts:
+            node, start = self.starts.pop(run_id)
+            self.durations[node].append(perf_counter() - start)
+
+
+class RecordingWebSocket:
+    """
+    WebSocket connection keeping the number of messages sent to the client
+    """
+
+    def __init__(self):
+        self.messages = 0
+
+    async def send_json(self, message: Any) -> None:
+        self.messages += 1
+
+
+@pytest.fixture
+def fake_workflow(monkeypatch: pytest.MonkeyPatch) -> Generator[None, None, None]:
+    monkeypatch.setenv("NAMESPACES", ",".join(NAMESPACES))
+    install_fake_cluster(monkeypatch, FakeCluster(NAMESPACES))
+    install_scripted_agents(monkeypatch, incident_script(NAMESPACES[0]), latency=LLM_LATENCY, streaming=True)
+    # The graph compiled by run() is cached for the process, it must not keep the scripted agents
+    main.get_graph.cache_clear()
+    yield
+    main.get_graph.cache_clear()
+
+
+@pytest.fixture
+def session() -> Generator[Session, None, None]:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine, tables=[AgentRun.__table__, Event.__table__])
+    with Session(engine) as session:
+        yield session
+
+
+async def run_workflow(session: Session) -> tuple[uuid.UUID, RecordingWebSocket]:
+    agent_run = AgentRun(status="running")
+    session.add(agent_run)
+    session.commit()
+
+    manager = ConnectionManager()
+    web_socket = RecordingWebSocket()
+    manager.active_connections.append(web_socket)  # type: ignore[arg-type]
+    await main.run(manager, session, agent_run.id)
+    return agent_run.id, web_socket
+
+
+def test_node_latency(fake_workflow: None) -> None:  # noqa: ARG001
+    graph = main.generate_graph()
+    timer = NodeTimer()
+    input = {"messages": [analysis_request(NAMESPACES)], "namespaces": NAMESPACES, "current_time": "2024-07-08 16:41:00"}
+
+    async def stream() -> int:
+        updates = 0
+        async for _ in graph.astream(input, stream_mode="updates", config={"callbacks": [timer]}):
+            updates += 1
+        return updates
+
+    start = perf_counter()
+    updates = asyncio.run(stream())
+    elapsed = perf_counter() - start
+
+    print(f"\n{len(NAMESPACES)} namespaces, scripted LLM latency {LLM_LATENCY * 1000:.0f} ms")
+    print("node | runs | mean ms | total ms")
+    for node, durations in timer.durations.items():
+        print(f"{node} | {len(durations)} | {sum(durations) / len(durations) * 1000:.1f} | {sum(durations) * 1000:.1f}")
+    print(f"end to end: {elapsed * 1000:.0f} ms, {updates} updates")
+
+    assert {"pre_analysis", "namespace_analyser", "metric_analyser", "diagnostic", "call_tool", "compaction",
+            "solution", "incident_reporter"} <= set(timer.durations)
+    assert len(timer.durations["namespace_analyser"]) == len(NAMESPACES)
+
+
+def test_run_throughput(fake_workflow: None, session: Session) -> None:  # noqa: ARG001
+    start = perf_counter()
+    run_id, web_socket = asyncio.run(run_workflow(session))
+    elapsed = perf_counter() - start
+
+    events = session.exec(select(Event).where(Event.run_id == run_id).order_by(Event.inserted_at)).all()
+    agent_run = session.get(AgentRun, run_id)
+
+    tracemalloc.start()
+    asyncio.run(run_workflow(session))
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Part of the run not spent waiting for the scripted LLM: 2 calls per namespace run concurrently, then 2 calls of
+    # the diagnostic and 1 of the solution and the incident reporter
+    overhead = elapsed - LLM_LATENCY * 6
+    print(f"\nrun: {elapsed * 1000:.0f} ms end to end, {overhead * 1000:.0f} ms outside of the LLM calls")
+    print(f"{len(events)} stored events, {web_socket.messages} WebSocket messages, "
+          f"{(len(events) + web_socket.messages) / elapsed:.0f} events/s")
+    print(f"allocations: {peak / 1024:.0f} KiB peak, {retained / 1024:.0f} KiB retained")
+
+    assert agent_run.status == "finished"
+    assert "incident_reporter" in events[-2].event_data
+    assert "llm_usage" in events[-1].event_data
+    assert web_socket.messages > len(events)
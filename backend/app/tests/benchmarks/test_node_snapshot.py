@@ -0,0 +1,63 @@
+from time import perf_counter
+from typing import Any
+
+from kubernetes import client
+
+from app.monitoring_agent.tools.node_snapshot import join_node_metrics
+
+
+def make_cluster(size: int) -> tuple[list[client.V1Node], list[dict[str, Any]]]:
+    nodes = [
+        client.V1Node(
+            metadata=client.V1ObjectMeta(name=f"node-{i}"),
+            status=client.V1NodeStatus(
+                capacity={"cpu": "4", "memory": "16Gi", "pods": "110"},
+                allocatable={"cpu": "3920m", "memory": "14Gi", "pods": "110"},
+            ),
+        )
+        for i in range(size)
+    ]
+    # The metrics API does not return the nodes in the same order
+    metrics = [
+        {"metadata": {"name": f"node-{i}"}, "usage": {"cpu": f"{(i + 500) * 1000000}n", "memory": f"{i + 1024}Mi"}}
+        for i in reversed(range(size))
+    ]
+    return nodes, metrics
+
+
+def scan_node_metrics(nodes: list[client.V1Node], metrics_items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Previous implementation of get_nodes_resources, scanning all the metrics for each node
+    """
+    node_resources = []
+    for node in nodes:
+        usage = next((item['usage'] for item in metrics_items if item['metadata']['name'] == node.metadata.name), {})
+        node_resources.append({
+            'node': node.metadata.name,
+            'capacity': node.status.capacity,
+            'allocatable': node.status.allocatable,
+            'usage': usage
+        })
+    return node_resources
+
+
+def test_join_node_metrics_scaling() -> None:
+    print()
+    for size in (250, 500, 1000):
+        nodes, metrics = make_cluster(size)
+
+        start = perf_counter()
+        scanned = scan_node_metrics(nodes, metrics)
+        scan_time = perf_counter() - start
+
+        start = perf_counter()
+        joined = join_node_metrics(nodes, metrics)
+        join_time = perf_counter() - start
+
+        print(f"{size} nodes: scan {scan_time * 1000:.1f} ms, indexed join {join_time * 1000:.1f} ms")
+
+        assert [node["node"] for node in joined] == [node["node"] for node in scanned]
+
+    assert joined[-1]["usage"] == {"cpu": 1499.0, "memory": 2023.0 * 1024 * 1024}
+    assert joined[-1]["allocatable"]["cpu"] == 3920.0
+    assert joined[-1]["cpu_usage_percent"] == round(1499 / 3920 * 100, 1)
@@ -0,0 +1,65 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+
+from app.monitoring_agent.tools import kubernetes_tool
+from app.monitoring_agent.tools.log_backends import FileLogBackend
+from app.monitoring_agent.tools.log_fetch import LogWindowCache, format_timestamp
+
+ENTRIES = 20000
+START = datetime(2024, 7, 8, 16, 0, tzinfo=timezone.utc)
+
+MESSAGES = [
+    ("INFO", "received ad request context_words {words} in {ms}ms"),
+    ("INFO", "GET /product/{id} 200 {ms}ms"),
+    ("WARNING", "slow response from currencyservice after {ms}ms"),
+    ("ERROR", "failed to retrieve ads for request {id}: connection refused"),
+]
+
+
+@pytest.fixture
+def log_file(tmp_path: Path) -> Path:
+    rng = random.Random(0)
+    path = tmp_path / "logs.jsonl"
+    with path.open("w") as file:
+        for i in range(ENTRIES):
+            severity, message = MESSAGES[0 if rng.random() < 0.6 else rng.randrange(1, len(MESSAGES))]
+            file.write(json.dumps({
+                "timestamp": format_timestamp(START + timedelta(milliseconds=180 * i)),
+                "severity": severity,
+                "textPayload": message.format(words=rng.choice(["shoes", "hats"]), ms=rng.randrange(500),
+                                              id=rng.randrange(10 ** 6)),
+                "resource": {"type": "k8s_container", "labels": {"namespace_name": "boutique"}},
+                "labels": {"k8s-pod/app": "adservice"},
+            }) + "\n")
+    return path
+
+
+def test_pod_logs_from_file(log_file: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    backend = FileLogBackend(str(log_file), LogWindowCache(), 50 * 10 ** 6)
+    monkeypatch.setattr(kubernetes_tool, "log_backend", backend)
+    logs_filter = (
+        f'resource.type="k8s_container" resource.labels.namespace_name="boutique" labels.k8s-pod/app="adservice" '
+        f'timestamp>="{format_timestamp(START)}" timestamp<="{format_timestamp(START + timedelta(hours=1))}"'
+    )
+
+    start = perf_counter()
+    summary = kubernetes_tool.get_pod_logs.invoke({"logs_filter": logs_filter})
+    cold_time = perf_counter() - start
+
+    start = perf_counter()
+    kubernetes_tool.get_pod_logs.invoke({"logs_filter": logs_filter})
+    cached_time = perf_counter() - start
+
+    raw_size = log_file.stat().st_size
+    print(f"\n{ENTRIES} entries, {raw_size / 10 ** 6:.1f} MB of raw logs")
+    print(f"templates: {len(summary)} characters, {cold_time * 1000:.0f} ms cold, {cached_time * 1000:.0f} ms cached")
+    print(summary)
+
+    assert summary.startswith(f"{ENTRIES} entries in 4 templates")
+    assert summary.splitlines()[2].startswith("ERROR")
+    assert len(summary) < raw_size / 1000
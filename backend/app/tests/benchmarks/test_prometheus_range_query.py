@@ -0,0 +1,78 @@
+from time import perf_counter, sleep
+from typing import Any
+
+import pytest
+
+from app.monitoring_agent.tools import prometheus_tool
+from app.monitoring_agent.tools.promql_cache import PromQLCache
+
+PODS = 50
+MINUTES = 5
+STEP = 15
+LATENCY = 0.02
+
+
+class FakePrometheusClient:
+    """
+    Prometheus stub returning synthetic CPU usage series after an artificial latency
+    """
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.requests = 0
+
+    def is_healthy(self) -> bool:
+        return True
+
+    def _value(self, pod: int, timestamp: float) -> str:
+        return str(0.5 + 0.001 * pod + 0.0005 * (timestamp % 600))
+
+    def query(self, query: str, time: float | None = None) -> list[Any]:  # noqa: ARG002
+        self.requests += 1
+        sleep(self.latency)
+        return [{"metric": {"pod": f"pod-{pod}"}, "value": [time, self._value(pod, time or 0)]} for pod in range(PODS)]
+
+    def query_range(self, query: str, start: float, end: float, step: float) -> list[Any]:  # noqa: ARG002
+        self.requests += 1
+        sleep(self.latency)
+        timestamps = [start + i * step for i in range(int((end - start) // step) + 1)]
+        return [
+            {"metric": {"pod": f"pod-{pod}"}, "values": [[t, self._value(pod, t)] for t in timestamps]}
+            for pod in range(PODS)
+        ]
+
+
+@pytest.fixture
+def fake_prometheus(monkeypatch: pytest.MonkeyPatch) -> FakePrometheusClient:
+    client = FakePrometheusClient(LATENCY)
+    monkeypatch.setattr(prometheus_tool, "prometheus", client)
+    monkeypatch.setattr(prometheus_tool, "promql_cache", PromQLCache(client, ttl=0, step=STEP))  # type: ignore[arg-type]
+    return client
+
+
+def test_range_summary_vs_raw_instant_queries(fake_prometheus: FakePrometheusClient) -> None:
+    query = 'sum(rate(container_cpu_usage_seconds_total{namespace="default"}[1m])) by (pod)'
+
+    # Raw path: one instant query per step to rebuild the trend over the window
+    start = perf_counter()
+    raw_outputs = [prometheus_tool.run_prometheus_query(query) for _ in range(MINUTES * 60 // STEP + 1)]
+    raw_time = perf_counter() - start
+    raw_output = "\n".join(raw_outputs)
+    raw_requests = fake_prometheus.requests
+
+    start = perf_counter()
+    summary_output = prometheus_tool.execute_prometheus_range_query.invoke(
+        {"query": query, "minutes": MINUTES, "step": STEP, "threshold": 0.8}
+    )
+    summary_time = perf_counter() - start
+    summary_requests = fake_prometheus.requests - raw_requests
+
+    print(
+        f"\nraw instant queries: {len(raw_output)} chars, {raw_requests} requests, {raw_time * 1000:.1f} ms"
+        f"\nrange summary:       {len(summary_output)} chars, {summary_requests} requests, {summary_time * 1000:.1f} ms"
+    )
+
+    assert summary_output.count("\n") == PODS - 1
+    assert "above_0.8=" in summary_output
+    assert len(summary_output) < len(raw_output)
+    assert summary_requests == 1
@@ -0,0 +1,156 @@
+import asyncio
+from time import perf_counter, sleep
+from typing import Any
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from app.monitoring_agent.tool_node import ConcurrentToolNode
+from app.monitoring_agent.tools import prometheus_tool
+from app.monitoring_agent.tools.promql_cache import PromQLCache
+
+CALLS = 8
+LATENCY = 0.1
+
+
+class SlowPrometheusClient:
+    """
+    Prometheus stub answering every query after an artificial latency
+    """
+
+    def is_healthy(self) -> bool:
+        return True
+
+    def query(self, query: str, time: float | None = None) -> list[Any]:  # noqa: ARG002
+        sleep(LATENCY)
+        return [{"metric": {"pod": "pod-0"}, "value": [time, "0.5"]}]
+
+
+@tool
+def hanging_tool(namespace: str) -> str:
+    """Stub tool answering after a long latency."""
+    sleep(LATENCY * 10)
+    return namespace
+
+
+@tool
+def slow_tool(namespace: str) -> str:
+    """Stub tool answering after a latency shorter than its timeout."""
+    sleep(LATENCY * 0.6)
+    return namespace
+
+
+@tool
+def failing_tool(namespace: str) -> str:
+    """Stub tool raising an exception."""
+    raise ValueError(f"namespace {namespace} not found")
+
+
+@pytest.fixture
+def slow_prometheus(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = SlowPrometheusClient()
+    monkeypatch.setattr(prometheus_tool, "prometheus", client)
+    monkeypatch.setattr(prometheus_tool, "promql_cache", PromQLCache(client, ttl=0))  # type: ignore[arg-type]
+
+
+def tool_calls_message(name: str, args: list[dict[str, Any]]) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": name, "args": arg, "id": f"call-{i}"} for i, arg in enumerate(args)])
+
+
+async def run_with_ticker(node: ConcurrentToolNode, message: AIMessage) -> tuple[dict[str, Any], int]:
+    """
+    Run the tool node while counting the ticks of a coroutine, the event loop is blocked if it cannot tick
+    """
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(LATENCY / 10)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    result = await node.ainvoke({"messages": [message]})
+    task.cancel()
+    return result, ticks
+
+
+def test_parallel_tool_calls_vs_sequential(slow_prometheus: None) -> None:  # noqa: ARG001
+    message = tool_calls_message(
+        "execute_prometheus_query", [{"query": f'up{{job="job-{i}"}}'} for i in range(CALLS)]
+    )
+
+    # Sequential path: one tool call after the other
+    start = perf_counter()
+    sequential = [prometheus_tool.execute_prometheus_query.invoke(call["args"]) for call in message.tool_calls]
+    sequential_time = perf_counter() - start
+
+    node = ConcurrentToolNode([prometheus_tool.execute_prometheus_query], max_concurrency=4)
+    start = perf_counter()
+    result, ticks = asyncio.run(run_with_ticker(node, message))
+    concurrent_time = perf_counter() - start
+
+    print(f"\n{CALLS} tool calls of {LATENCY * 1000:.0f} ms")
+    print(f"sequential: {sequential_time * 1000:.0f} ms")
+    print(f"concurrent (4 at once): {concurrent_time * 1000:.0f} ms, {ticks} event loop ticks")
+
+    assert [m.content for m in result["messages"]] == sequential
+    assert [m.tool_call_id for m in result["messages"]] == [f"call-{i}" for i in range(CALLS)]
+    assert concurrent_time < sequential_time / 2
+    assert ticks > 0
+
+
+def test_tool_call_timeout() -> None:
+    node = ConcurrentToolNode([hanging_tool], timeouts={"hanging_tool": LATENCY})
+
+    start = perf_counter()
+    result = asyncio.run(node.ainvoke({"messages": [tool_calls_message("hanging_tool", [{"namespace": "default"}])]}))
+
+    assert perf_counter() - start < LATENCY * 5
+    assert "timed out" in result["messages"][0].content
+
+
+def test_timed_out_calls_do_not_block_the_pool() -> None:
+    node = ConcurrentToolNode([hanging_tool, slow_tool], max_concurrency=2, max_workers=4,
+                              timeouts={"hanging_tool": LATENCY, "slow_tool": LATENCY})
+
+    hung = asyncio.run(node.ainvoke({"messages": [tool_calls_message("hanging_tool", [{"namespace": "a"}] * 2)]}))
+    # The hanging calls still hold their threads, the next calls run on the other workers
+    result = asyncio.run(node.ainvoke({"messages": [tool_calls_message("slow_tool", [{"namespace": "b"}] * 2)]}))
+
+    assert all("timed out" in message.content for message in hung["messages"])
+    assert [message.content for message in result["messages"]] == ["b", "b"]
+
+
+def test_timeout_starts_when_the_call_runs() -> None:
+    node = ConcurrentToolNode([slow_tool], max_concurrency=2, max_workers=1, timeouts={"slow_tool": LATENCY})
+
+    # The second call waits for the only worker longer than its timeout, but runs within it
+    result = asyncio.run(node.ainvoke({"messages": [tool_calls_message("slow_tool", [{"namespace": "a"}] * 2)]}))
+
+    assert [message.content for message in result["messages"]] == ["a", "a"]
+
+
+def test_wait_for_a_worker_is_bounded() -> None:
+    node = ConcurrentToolNode([hanging_tool], max_concurrency=2, max_workers=1, timeouts={"hanging_tool": LATENCY})
+
+    # The second call never gets the worker held by the first one
+    start = perf_counter()
+    result = asyncio.run(node.ainvoke({"messages": [tool_calls_message("hanging_tool", [{"namespace": "a"}] * 2)]}))
+
+    assert perf_counter() - start < LATENCY * 5
+    assert all("timed out" in message.content for message in result["messages"])
+
+
+def test_tool_exception_is_answered() -> None:
+    node = ConcurrentToolNode([failing_tool, slow_tool])
+
+    result = asyncio.run(node.ainvoke({"messages": [AIMessage(content="", tool_calls=[
+        {"name": "failing_tool", "args": {"namespace": "a"}, "id": "call-0"},
+        {"name": "slow_tool", "args": {"namespace": "b"}, "id": "call-1"},
+    ])]}))
+
+    assert [message.content for message in result["messages"]] == [
+        "Exception with failing_tool: namespace a not found", "b"
+    ]
@@ -0,0 +1,62 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.graph.message import add_messages
+
+from app.monitoring_agent.compaction import compact_messages, compaction_node, estimate_tokens
+from app.monitoring_agent.views import conclusions_view
+
+
+def diagnostic_messages() -> list:
+    return [
+        HumanMessage(content="Check the metrics of the boutique namespace", id="request"),
+        AIMessage(content="adservice uses 95% of its memory. DIAGNOSTIC NEEDED", name="metric_analyser", id="metrics"),
+        AIMessage(content="", name="diagnostic", id="call", tool_calls=[
+            {"name": "get_pod_logs", "args": {"logs_filter": "..."}, "id": "call-1"}
+        ]),
+        ToolMessage(content="ERROR | 3 | OOMKilled\n" + "INFO | 1 | request served\n" * 400, tool_call_id="call-1",
+                    id="logs"),
+        ToolMessage(content="name: adservice", tool_call_id="call-2", id="yaml"),
+        AIMessage(content="The memory limit is too low. GENERATE SOLUTIONS", name="diagnostic", id="conclusion"),
+    ]
+
+
+def test_bulky_tool_outputs_are_summarized() -> None:
+    messages = diagnostic_messages()
+
+    compacted, saved = compact_messages(messages, budget=10000)
+
+    assert [message.id for message in compacted] == ["logs"]
+    assert compacted[0].content.startswith("ERROR | 3 | OOMKilled")
+    assert "[compacted" in compacted[0].content
+    assert saved == estimate_tokens(messages[3]) - estimate_tokens(compacted[0])
+
+
+def test_compaction_replaces_the_messages_in_the_state() -> None:
+    messages = diagnostic_messages()
+
+    update = compaction_node({"messages": messages})
+    state = add_messages(messages, update["messages"])
+
+    assert [message.id for message in state] == [message.id for message in messages]
+    assert sum(estimate_tokens(message) for message in state) < sum(estimate_tokens(m) for m in messages)
+    assert update["tokens_saved"] > 0
+    assert state[-1].content == messages[-1].content
+
+
+def test_budget_shrinks_the_largest_messages() -> None:
+    messages = diagnostic_messages()
+    messages[1] = AIMessage(content="adservice report " * 200 + "DIAGNOSTIC NEEDED", id="metrics")
+
+    compacted, _ = compact_messages(messages, budget=500)
+
+    assert {message.id for message in compacted} == {"logs", "metrics"}
+
+
+def test_budget_is_measured_on_the_view_of_the_next_agent() -> None:
+    messages = diagnostic_messages()
+    messages[1] = AIMessage(content="adservice report " * 200 + "DIAGNOSTIC NEEDED", name="metric_analyser",
+                            id="metrics")
+
+    # The conclusions fit in the budget of an agent which does not see the tool outputs
+    compacted, _ = compact_messages(messages, budget=1000, view=conclusions_view)
+
+    assert [message.id for message in compacted] == ["logs"]
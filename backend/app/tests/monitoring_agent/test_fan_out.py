@@ -0,0 +1,53 @@
+from app.monitoring_agent.fan_out import fan_out, merge_findings_node
+
+
+def test_fan_out_sends_one_branch_per_namespace() -> None:
+    state = {
+        "namespaces": ["boutique", "default"],
+        "current_time": "2024-07-08 16:41:00",
+        "verdict_table": "namespace | pod | cpu_%\nboutique | adservice | 90.0\ndefault | api | 10.0",
+    }
+
+    sends = fan_out(state)
+
+    assert [send.node for send in sends] == ["namespace_analyser", "namespace_analyser"]
+    assert [send.arg["namespace"] for send in sends] == ["boutique", "default"]
+    table = sends[0].arg["messages"][1].content
+    assert "boutique | adservice" in table
+    assert "default | api" not in table
+
+
+def test_merge_findings_needs_diagnostic_when_one_namespace_does() -> None:
+    state = {"findings": [
+        {"namespace": "default", "report": "All pods are healthy. FINISHED"},
+        {"namespace": "boutique", "report": "adservice uses 90% of its CPU. DIAGNOSTIC NEEDED"},
+    ]}
+
+    message = merge_findings_node(state)["messages"][0]
+
+    assert message.name == "metric_analyser"
+    assert message.content.index("Namespace boutique") < message.content.index("Namespace default")
+    assert message.content.endswith("DIAGNOSTIC NEEDED")
+
+
+def test_merge_findings_finished_when_all_namespaces_are_healthy() -> None:
+    state = {"findings": [{"namespace": "default", "report": "All pods are healthy. FINISHED"}]}
+
+    assert merge_findings_node(state)["messages"][0].content.endswith("FINISHED")
+
+
+def test_merge_findings_diagnoses_reports_without_keyword() -> None:
+    state = {"findings": [
+        {"namespace": "default", "report": "All pods are healthy. FINISHED"},
+        {"namespace": "boutique", "report": "adservice restarts every few minutes."},
+    ]}
+
+    assert merge_findings_node(state)["messages"][0].content.endswith("DIAGNOSTIC NEEDED")
+
+
+def test_merge_findings_unsuccessful_only_when_every_namespace_is() -> None:
+    unsuccessful = {"namespace": "boutique", "report": "No metrics were found. UNSUCCESSFUL"}
+    healthy = {"namespace": "default", "report": "All pods are healthy. FINISHED"}
+
+    assert merge_findings_node({"findings": [unsuccessful, healthy]})["messages"][0].content.endswith("FINISHED")
+    assert merge_findings_node({"findings": [unsuccessful]})["messages"][0].content.endswith("UNSUCCESSFUL")
@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from app.monitoring_agent.graph_image import GraphImageCache, graph_version
+from app.monitoring_agent.main import get_graph
+
+
+class DrawableGraph:
+    """
+    Graph drawing stub counting the renders of its image
+    """
+
+    def __init__(self, mermaid: str):
+        self.mermaid = mermaid
+        self.renders = 0
+
+    def get_graph(self, xray: int = 0) -> "DrawableGraph":  # noqa: ARG002
+        return self
+
+    def draw_mermaid(self) -> str:
+        return self.mermaid
+
+    def draw_mermaid_png(self) -> bytes:
+        self.renders += 1
+        return f"png of {self.mermaid}".encode()
+
+
+def test_graph_image_rendered_once_per_version(tmp_path: Path) -> None:
+    graph, changed = DrawableGraph("graph TD; a-->b"), DrawableGraph("graph TD; a-->c")
+    images = GraphImageCache(str(tmp_path))
+
+    assert images.get(graph) == images.get(graph) == b"png of graph TD; a-->b"
+    assert images.get(changed) == b"png of graph TD; a-->c"
+    assert (graph.renders, changed.renders) == (1, 1)
+
+    # A new process reads the rendered image from the directory
+    assert GraphImageCache(str(tmp_path)).get(graph) == b"png of graph TD; a-->b"
+    assert graph.renders == 1
+    assert (tmp_path / f"graph-{graph_version(graph)}.png").exists()
+
+
+def test_graph_compiled_once_per_variant() -> None:
+    assert get_graph() is get_graph()
+    assert get_graph(debug=True) is not get_graph()
+    assert graph_version(get_graph()) == graph_version(get_graph(debug=True))
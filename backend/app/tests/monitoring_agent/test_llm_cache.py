@@ -0,0 +1,74 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.monitoring_agent.llm_cache import LLMCacheMiss, RecordedResponseCache
+
+MESSAGES = [HumanMessage(content="Check the metrics of the boutique namespace")]
+
+
+def fake_model(cache: RecordedResponseCache, responses: list[AIMessage]) -> GenericFakeChatModel:
+    return GenericFakeChatModel(messages=iter(responses), cache=cache)
+
+
+def test_record_then_replay(tmp_path: Path) -> None:
+    recorded = AIMessage(content="", tool_calls=[{"name": "get_pod_names", "args": {"namespace": "boutique"},
+                                                  "id": "call-1"}])
+    model = fake_model(RecordedResponseCache(str(tmp_path)), [recorded, AIMessage(content="other")])
+
+    first = model.invoke(MESSAGES)
+    second = model.invoke(MESSAGES)
+
+    assert first.tool_calls == recorded.tool_calls
+    assert second.tool_calls == recorded.tool_calls
+
+    replayed = fake_model(RecordedResponseCache(str(tmp_path), mode="replay"), []).invoke(MESSAGES)
+    assert replayed.tool_calls == recorded.tool_calls
+
+
+def test_replay_miss_raises(tmp_path: Path) -> None:
+    model = fake_model(RecordedResponseCache(str(tmp_path), mode="replay"), [AIMessage(content="live")])
+
+    with pytest.raises(LLMCacheMiss):
+        model.invoke(MESSAGES)
+
+
+def test_size_bounded_eviction(tmp_path: Path) -> None:
+    cache = RecordedResponseCache(str(tmp_path), max_bytes=2000)
+    model = fake_model(cache, [AIMessage(content="x" * 400) for _ in range(10)])
+
+    for i in range(10):
+        model.invoke([HumanMessage(content=f"question {i}")])
+
+    assert sum(file.stat().st_size for file in tmp_path.glob("*.json")) <= 2000
+    assert 0 < len(list(tmp_path.glob("*.json"))) < 10
+
+
+def test_replay_whole_graph(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.monitoring_agent.fan_out import analysis_request
+    from app.monitoring_agent.main import generate_graph
+    from app.tests.support.agents import incident_script, install_scripted_agents
+    from app.tests.support.fake_cluster import FakeCluster, install_fake_cluster
+
+    namespaces = ["boutique", "default"]
+    script = incident_script(namespaces[0])
+    install_fake_cluster(monkeypatch, FakeCluster(namespaces))
+
+    async def run_graph(current_time: str) -> list[str]:
+        input = {"messages": [analysis_request(namespaces)], "namespaces": namespaces, "current_time": current_time}
+        result = await generate_graph().ainvoke(input)
+        return [message.content for message in result["messages"]]
+
+    install_scripted_agents(monkeypatch, script, cache=RecordedResponseCache(str(tmp_path)))
+    recorded = asyncio.run(run_graph("2024-07-08 16:41:00"))
+
+    # The second run has new message ids and another time, every call is served from the recording
+    install_scripted_agents(monkeypatch, {name: [AIMessage(content="live")] for name in script},
+                            cache=RecordedResponseCache(str(tmp_path), mode="replay"))
+    replayed = asyncio.run(run_graph("2024-07-08 17:02:00"))
+
+    assert replayed == recorded
+    assert recorded[-1].endswith("FINISHED")
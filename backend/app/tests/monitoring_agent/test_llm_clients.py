@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from langchain_core.caches import InMemoryCache
+
+from app.monitoring_agent.llm_clients import LLMClientRegistry
+
+
+def test_agents_share_the_model_and_its_connection_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    registry = LLMClientRegistry(max_connections=4)
+
+    metric_analyser = registry.get_chat_openai("gpt-4o")
+    diagnostic = registry.get_chat_openai("gpt-4o")
+    reporter = registry.get_chat_openai("gpt-4o-mini")
+
+    assert metric_analyser is diagnostic
+    assert reporter is not metric_analyser
+    assert reporter.http_async_client is metric_analyser.http_async_client
+    assert len(registry.http_clients) == 1
+
+    assert registry.get_chat_openai("gpt-4o", streaming=True) is not metric_analyser
+
+
+def test_closed_registry_keeps_the_clients_of_the_agents(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    registry = LLMClientRegistry()
+    diagnostic = registry.get_chat_openai("gpt-4o")
+
+    asyncio.run(registry.aclose())
+
+    # A second lifespan of the application reuses the models built when the agents were imported
+    assert not diagnostic.http_async_client.is_closed
+    assert registry.get_chat_openai("gpt-4o") is diagnostic
+
+
+def test_warm_builds_the_model_of_the_agents(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_API_BASE", "http://llm.invalid/v1")
+    registry = LLMClientRegistry()
+    cache = InMemoryCache()
+
+    asyncio.run(registry.warm("gpt-4o", cache=cache, streaming=True))
+
+    # The agents get the model warmed at startup instead of building a new one
+    warmed = registry.chat_models[("http://llm.invalid/v1", "gpt-4o", id(cache), True)]
+    assert registry.get_chat_openai("gpt-4o", cache=cache, streaming=True) is warmed
+    assert len(registry.chat_models) == 1
@@ -0,0 +1,113 @@
+import asyncio
+from typing import Any
+from uuid import uuid4
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.runnables import RunnableLambda
+
+from app.monitoring_agent.agent import create_agent
+from app.monitoring_agent.agent_nodes import agent_node, metric_analyser_tools
+from app.monitoring_agent.llm_usage import LLMUsage
+from app.monitoring_agent.model_routing import escalation_reason, model_provider, parse_models
+from app.monitoring_agent.streaming import TokenStreamHandler
+from app.tests.support.fake_llm import ScriptedChatModel, final, tool_calls
+
+
+def test_parse_models() -> None:
+    assert parse_models(" metric_analyser=gpt-4o-mini, diagnostic=gpt-4o") == {
+        "metric_analyser": "gpt-4o-mini", "diagnostic": "gpt-4o"
+    }
+    assert parse_models(None) == {}
+    with pytest.raises(ValueError):
+        parse_models("diagnostic=")
+
+
+def test_model_provider() -> None:
+    assert model_provider("gpt-4o-mini") == "openai"
+    assert model_provider("llama3") == "ollama"
+
+
+def test_escalation_reason() -> None:
+    malformed = AIMessage(content="", invalid_tool_calls=[
+        {"name": "get_pod_names", "args": "{namespace:", "id": "call-0", "error": "Invalid JSON"}
+    ])
+
+    assert escalation_reason(final("adservice uses 90% of its CPU. DIAGNOSTIC NEEDED"), metric_analyser_tools) is None
+    assert escalation_reason(tool_calls(("get_pod_names", {"namespace": "default"})), metric_analyser_tools) is None
+    assert escalation_reason(final("No metrics were found. UNSUCCESSFUL"), metric_analyser_tools) == "the agent gave up"
+    assert escalation_reason(malformed, metric_analyser_tools) == "malformed tool calls get_pod_names"
+    assert escalation_reason(tool_calls(("get_pod_logs", {})), metric_analyser_tools) == "unknown tools get_pod_logs"
+
+
+def agent(model: ScriptedChatModel):
+    return create_agent(model, metric_analyser_tools, system_prompt="Analyse the metrics.")
+
+
+def test_agent_node_escalates_when_the_model_gives_up() -> None:
+    cheap = ScriptedChatModel(agent="metric_analyser", responses=[final("No metrics were found. UNSUCCESSFUL")])
+    strong = ScriptedChatModel(agent="metric_analyser", responses=[tool_calls(("get_pod_names", {"namespace": "a"}))])
+    state = {"messages": [HumanMessage(content="Check the metrics of the pods in namespace a")]}
+
+    kept = asyncio.run(agent_node(state, agent(strong), "metric_analyser", escalation=agent(cheap),
+                                  tools=metric_analyser_tools))
+    escalated = asyncio.run(agent_node(state, agent(cheap), "metric_analyser", escalation=agent(strong),
+                                       tools=metric_analyser_tools))
+    without_escalation = asyncio.run(agent_node(state, agent(cheap), "metric_analyser"))
+
+    assert kept["messages"][0].tool_calls[0]["name"] == "get_pod_names"
+    assert escalated["messages"][0].tool_calls[0]["name"] == "get_pod_names"
+    assert escalated["messages"][0].name == "metric_analyser"
+    assert without_escalation["messages"][0].content.endswith("UNSUCCESSFUL")
+
+
+def test_escalation_discards_the_streamed_response() -> None:
+    cheap = ScriptedChatModel(agent="metric_analyser", responses=[final("No metrics were found. UNSUCCESSFUL")],
+                              streaming=True)
+    strong = ScriptedChatModel(agent="metric_analyser", responses=[final("adservice uses 90% of its CPU.")],
+                               streaming=True)
+    state = {"messages": [HumanMessage(content="Check the metrics of the pods in namespace a")]}
+    frames: list[dict[str, Any]] = []
+
+    async def send(frame: dict[str, Any]) -> None:
+        frames.append(frame)
+
+    async def node(state: dict) -> dict:
+        return await agent_node(state, agent(cheap), "metric_analyser", escalation=agent(strong),
+                                tools=metric_analyser_tools)
+
+    asyncio.run(RunnableLambda(node).ainvoke(state, config={
+        "callbacks": [TokenStreamHandler(send, min_chars=1)], "metadata": {"langgraph_node": "metric_analyser"}
+    }))
+
+    rejected = frames[0]["message_id"]
+    discard = next(i for i, frame in enumerate(frames) if frame["type"] == "discard")
+    assert frames[discard] == {"type": "discard", "node": "metric_analyser", "message_id": rejected}
+    assert all(frame["message_id"] == rejected for frame in frames[:discard])
+    assert "".join(frame["delta"] for frame in frames[discard + 1:]) == "adservice uses 90% of its CPU."
+
+
+def test_usage_per_agent() -> None:
+    usage = LLMUsage()
+    calls = [("metric_analyser", "gpt-4o-mini", 1000, 50), ("metric_analyser", "gpt-4o", 1200, 80),
+             ("diagnostic", "gpt-4o", 3000, 200)]
+
+    async def call(node: str, model: str, input_tokens: int, output_tokens: int) -> None:
+        run_id = uuid4()
+        await usage.on_chat_model_start({}, [[]], run_id=run_id, metadata={"langgraph_node": node,
+                                                                            "ls_model_name": model})
+        await usage.on_llm_end(LLMResult(
+            generations=[[ChatGeneration(message=AIMessage(content="FINISHED"))]],
+            llm_output={"token_usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens}},
+        ), run_id=run_id)
+
+    for args in calls:
+        asyncio.run(call(*args))
+    agents = usage.summary()["agents"]
+
+    assert agents["metric_analyser"]["calls"] == 2
+    assert agents["metric_analyser"]["models"] == ["gpt-4o-mini", "gpt-4o"]
+    assert agents["metric_analyser"]["input_tokens"] == 2200
+    assert agents["diagnostic"]["output_tokens"] == 200
+    assert agents["diagnostic"]["latency"] >= 0
@@ -0,0 +1,102 @@
+import math
+
+import pytest
+from kubernetes import client
+
+from app.monitoring_agent import pre_analysis
+from app.monitoring_agent.pre_analysis import all_healthy, collect_allocations, compute_verdicts, format_verdicts, \
+    healthy_report
+
+
+def make_pod(name: str, resources: list[dict[str, dict[str, str]]]) -> client.V1Pod:
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(name=name, namespace="default"),
+        spec=client.V1PodSpec(containers=[
+            client.V1Container(name=f"container-{i}", resources=client.V1ResourceRequirements(**container))
+            for i, container in enumerate(resources)
+        ]),
+    )
+
+
+def test_compute_verdicts_percentages_and_breaches() -> None:
+    usage = {
+        "cpu": {("default", "api"): 0.9, ("default", "worker"): 0.1},
+        "memory": {("default", "api"): 100.0, ("default", "worker"): 450.0},
+        "rps": {("default", "api"): 150.0},
+        "latency": {("default", "api"): 0.1},
+    }
+    allocations = {
+        ("default", "api"): {"cpu": 1.0, "memory": 1000.0},
+        ("default", "worker"): {"cpu": 0.0, "memory": 500.0},
+    }
+
+    verdicts = compute_verdicts(usage, allocations)
+
+    assert verdicts["pod"] == ["api", "worker"]
+    assert math.isclose(verdicts["cpu"][0], 90.0)
+    assert math.isnan(verdicts["cpu"][1])
+    assert math.isclose(verdicts["memory"][1], 90.0)
+    assert verdicts["breaches"] == [["cpu", "rps"], ["memory"]]
+
+
+def test_compute_verdicts_network_bandwidth() -> None:
+    usage = {"network": {("default", "api"): 900.0}}
+    allocations = {("default", "api"): {"cpu": 1.0, "memory": 1000.0}}
+
+    assert compute_verdicts(usage, allocations)["breaches"] == [[]]
+    assert compute_verdicts(usage, allocations, network_bandwidth=1000.0)["breaches"] == [["network"]]
+
+
+def test_format_verdicts() -> None:
+    verdicts = compute_verdicts({}, {("default", "api"): {"cpu": 1.0, "memory": 1000.0}})
+
+    table = format_verdicts(verdicts)
+
+    assert "default | api | - | - | - | - | - | OK" in table
+    assert table.endswith("1 pods checked, 0 over a threshold")
+
+
+def test_all_healthy() -> None:
+    allocations = {("default", "api"): {"cpu": 1.0, "memory": 1000.0}}
+    healthy = compute_verdicts({"cpu": {("default", "api"): 0.2}, "memory": {("default", "api"): 200.0}}, allocations)
+    unhealthy = compute_verdicts({"cpu": {("default", "api"): 0.9}, "memory": {("default", "api"): 200.0}}, allocations)
+    no_data = compute_verdicts({}, allocations)
+
+    assert all_healthy(healthy)
+    assert not all_healthy(unhealthy)
+    assert not all_healthy(no_data)
+
+
+def test_pods_without_percentages_are_not_healthy() -> None:
+    allocations = {("default", "a"): {"cpu": 1.0, "memory": 1000.0}}
+    # Pod b has no limits or requests, its usage cannot be judged
+    verdicts = compute_verdicts({"cpu": {("default", "a"): 0.1, ("default", "b"): 7.9},
+                                 "memory": {("default", "a"): 100.0, ("default", "b"): 9e9}}, allocations)
+
+    assert verdicts["breaches"] == [[], []]
+    assert not all_healthy(verdicts)
+
+
+def test_healthy_report_lists_the_checked_criteria() -> None:
+    allocations = {("default", "api"): {"cpu": 1.0, "memory": 1000.0}}
+    verdicts = compute_verdicts({"cpu": {("default", "api"): 0.2}, "memory": {("default", "api"): 200.0}}, allocations)
+
+    report = healthy_report(verdicts, ["default"])
+
+    assert "none of them exceeds the CPU (80%) or memory (80%) thresholds" in report
+    assert "network" not in report.split("\n")[1]
+
+
+def test_allocations_are_unknown_when_a_container_declares_none(monkeypatch: pytest.MonkeyPatch) -> None:
+    pods = [
+        make_pod("api", [{"limits": {"cpu": "500m", "memory": "256Mi"}}, {"requests": {"cpu": "250m"}}]),
+        make_pod("worker", [{"requests": {"memory": "128Mi"}}, {}]),
+    ]
+    monkeypatch.setattr(pre_analysis, "list_pods", lambda namespace: pods)
+
+    allocations = collect_allocations(["default"])
+
+    assert allocations[("default", "api")]["cpu"] == 0.75
+    assert math.isnan(allocations[("default", "api")]["memory"])
+    assert math.isnan(allocations[("default", "worker")]["cpu"])
+    assert math.isnan(allocations[("default", "worker")]["memory"])
@@ -0,0 +1,40 @@
+from typing import Any
+
+import requests
+
+from app.monitoring_agent.config.prometheus_config import PrometheusClient
+
+
+class FlakySession:
+    """
+    HTTP session stub failing the first requests with a connection error
+    """
+
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.urls: list[str] = []
+
+    def get(self, url: str, **kwargs: Any) -> Any:  # noqa: ARG002
+        self.urls.append(url)
+        if self.failures:
+            self.failures -= 1
+            raise requests.ConnectionError("connection refused")
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"status": "success", "data": {"resultType": "vector", "result": []}}'
+        return response
+
+
+def test_unhealthy_state_is_checked_again() -> None:
+    client = PrometheusClient("http://prometheus:9090", health_interval=0)
+    client.session = FlakySession(failures=1)
+
+    try:
+        client.query("up")
+    except requests.ConnectionError:
+        pass
+
+    # The failed query marked Prometheus unhealthy, the next call checks the health endpoint and queries again
+    assert client.is_healthy()
+    assert client.query("up") == []
+    assert client.session.urls[1] == "http://prometheus:9090/-/healthy"
@@ -0,0 +1,51 @@
+import asyncio
+from uuid import uuid4
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from app.monitoring_agent.agent import create_agent
+from app.monitoring_agent.llm_usage import LLMUsage
+from app.monitoring_agent.prompt_compiler import compile_system_prompt, volatile_messages
+
+TOOLS = ("get_pod_names", "execute_prometheus_query")
+
+
+def test_system_prompt_is_static() -> None:
+    prompt = compile_system_prompt("analyse_metric_task", TOOLS)
+
+    compile_system_prompt.cache_clear()
+    assert compile_system_prompt("analyse_metric_task", TOOLS) == prompt
+    assert "get_pod_names, execute_prometheus_query" in prompt
+    assert '"tool": "execute_prometheus_query"' in prompt
+
+
+def test_volatile_values_come_last() -> None:
+    agent = create_agent(GenericFakeChatModel(messages=iter([])), [], compile_system_prompt("provide_solution_task", ()))
+    state = {"messages": [HumanMessage(content="Check the metrics")], "current_time": "2024-07-08 16:41:00"}
+
+    messages = agent.first.invoke({"messages": state["messages"], "volatile": volatile_messages(state)}).to_messages()
+
+    assert isinstance(messages[0], SystemMessage) and "Solution expert" in messages[0].content
+    assert "2024-07-08" not in messages[0].content + messages[1].content
+    assert messages[-1].content == "Current time is 2024-07-08 16:41:00 UTC."
+
+
+def test_cached_token_ratio() -> None:
+    usage = LLMUsage()
+    run_id = uuid4()
+    result = LLMResult(
+        generations=[[ChatGeneration(message=AIMessage(content="FINISHED"))]],
+        llm_output={"token_usage": {"prompt_tokens": 2000, "prompt_tokens_details": {"cached_tokens": 1536}}},
+    )
+
+    async def call() -> None:
+        await usage.on_chat_model_start({}, [[]], run_id=run_id, metadata={"langgraph_node": "diagnostic"})
+        await usage.on_llm_end(result, run_id=run_id)
+
+    asyncio.run(call())
+
+    call = usage.summary()["calls"][0]
+    assert (call["node"], call["input_tokens"], call["cached_tokens"], call["cached_ratio"]) == \
+           ("diagnostic", 2000, 1536, 0.768)
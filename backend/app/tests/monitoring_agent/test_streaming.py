@@ -0,0 +1,45 @@
+import asyncio
+from typing import Any
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, StateGraph
+
+from app.monitoring_agent.state import AgentState
+from app.monitoring_agent.streaming import TokenStreamHandler
+
+REPORT = "All pods of the boutique namespace are healthy. FINISHED"
+
+
+def test_tokens_are_forwarded_per_node() -> None:
+    model = GenericFakeChatModel(messages=iter([AIMessage(content=REPORT)]))
+
+    async def incident_reporter(state: AgentState, config: dict) -> dict:
+        chunks = [chunk async for chunk in model.astream(state["messages"], config)]
+        return {"messages": [AIMessage(content="".join(chunk.content for chunk in chunks), name="incident_reporter")]}
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("incident_reporter", incident_reporter)
+    workflow.set_entry_point("incident_reporter")
+    workflow.add_edge("incident_reporter", END)
+    graph = workflow.compile()
+
+    frames: list[dict[str, Any]] = []
+
+    async def send(frame: dict[str, Any]) -> None:
+        frames.append(frame)
+
+    async def run() -> list[dict[str, Any]]:
+        return [update async for update in graph.astream(
+            {"messages": [("human", "Report")]}, stream_mode="updates",
+            config={"callbacks": [TokenStreamHandler(send, min_chars=10)]},
+        )]
+
+    updates = asyncio.run(run())
+
+    assert len(updates) == 1
+    assert {frame["node"] for frame in frames} == {"incident_reporter"}
+    assert len({frame["message_id"] for frame in frames}) == 1
+    assert "".join(frame["delta"] for frame in frames) == REPORT
+    assert all(len(frame["delta"]) >= 10 for frame in frames[:-1])
+    assert frames[-1]["done"]
@@ -0,0 +1,35 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.monitoring_agent.views import conclusions_view, findings_view, parse_views
+
+MESSAGES = [
+    HumanMessage(content="Check the metrics of the boutique namespace"),
+    HumanMessage(content="namespace | pod | cpu_%", name="pre_analysis"),
+    AIMessage(content="adservice uses 95% of its memory. DIAGNOSTIC NEEDED", name="metric_analyser"),
+    AIMessage(content="", name="diagnostic", tool_calls=[{"name": "get_pod_logs", "args": {}, "id": "call-1"}]),
+    ToolMessage(content="OOMKilled", tool_call_id="call-1"),
+    AIMessage(content="The memory limit is too low. GENERATE SOLUTIONS", name="diagnostic"),
+    AIMessage(content="Raise the memory limit to 512Mi.", name="solution"),
+]
+
+
+def test_conclusions_view_drops_the_tool_calls() -> None:
+    view = conclusions_view(MESSAGES)
+
+    assert [message.content for message in view] == [
+        MESSAGES[0].content, MESSAGES[2].content, MESSAGES[5].content, MESSAGES[6].content
+    ]
+
+
+def test_findings_view_is_a_single_message() -> None:
+    view = findings_view(MESSAGES)
+
+    assert len(view) == 2
+    assert "## diagnostic\nThe memory limit is too low." in view[1].content
+    assert "OOMKilled" not in view[1].content
+
+
+def test_parse_views() -> None:
+    assert parse_views("solution=conclusions, incident_reporter=findings") == {
+        "solution": conclusions_view, "incident_reporter": findings_view
+    }
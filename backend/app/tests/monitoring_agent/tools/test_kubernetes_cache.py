@@ -0,0 +1,94 @@
+from typing import Any
+
+import pytest
+from kubernetes import client
+
+from app.monitoring_agent.tools import kubernetes_cache
+from app.monitoring_agent.tools.kubernetes_cache import Informer, pod_indexers, pod_key
+
+
+def make_pod(name: str, namespace: str = "default", labels: dict[str, str] | None = None) -> client.V1Pod:
+    return client.V1Pod(metadata=client.V1ObjectMeta(name=name, namespace=namespace, labels=labels))
+
+
+class FakeCoreV1Api:
+    def __init__(self, pods: list[client.V1Pod]) -> None:
+        self.pods = pods
+        self.list_calls = 0
+
+    def list_pod_for_all_namespaces(self, **kwargs: Any) -> client.V1PodList:  # noqa: ARG002
+        self.list_calls += 1
+        return client.V1PodList(items=self.pods, metadata=client.V1ListMeta(resource_version="1"))
+
+
+class FakeWatch:
+    events: list[dict[str, Any]] = []
+
+    def __init__(self) -> None:
+        self.resource_version = None
+
+    def stream(self, func: Any, **kwargs: Any) -> Any:  # noqa: ARG002
+        for event in FakeWatch.events:
+            self.resource_version = event["object"].metadata.resource_version
+            yield event
+        FakeWatch.events = []
+
+    def stop(self) -> None:
+        pass
+
+
+def make_informer(api: FakeCoreV1Api) -> Informer:
+    return Informer("pods", lambda: api, "list_pod_for_all_namespaces", pod_key, indexers=pod_indexers,
+                    resync_period=0.05)
+
+
+def test_informer_list_and_indexes() -> None:
+    api = FakeCoreV1Api([make_pod("api", labels={"app": "api"}), make_pod("db", namespace="data")])
+    informer = make_informer(api)
+
+    assert not informer.is_ready()
+    informer._list()
+
+    assert informer.is_ready()
+    assert informer.get(("default", "api")).metadata.name == "api"
+    assert [pod.metadata.name for pod in informer.by_index("namespace", "data")] == ["db"]
+    assert [pod.metadata.name for pod in informer.by_index("label", "app=api")] == ["api"]
+    assert informer.resource_version == "1"
+
+
+def test_informer_applies_watch_events(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(kubernetes_cache.watch, "Watch", FakeWatch)
+    api = FakeCoreV1Api([make_pod("api", labels={"app": "api"}), make_pod("db")])
+    informer = make_informer(api)
+    informer._list()
+
+    relabelled = make_pod("api", labels={"app": "web"})
+    relabelled.metadata.resource_version = "2"
+    deleted = make_pod("db")
+    deleted.metadata.resource_version = "3"
+    FakeWatch.events = [{"type": "MODIFIED", "object": relabelled}, {"type": "DELETED", "object": deleted}]
+    informer._watch_until_resync()
+
+    assert informer.by_index("label", "app=api") == []
+    assert [pod.metadata.name for pod in informer.by_index("label", "app=web")] == ["api"]
+    assert [pod.metadata.name for pod in informer.by_index("namespace", "default")] == ["api"]
+    assert informer.resource_version == "3"
+
+
+def test_informer_restarts_after_stop(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(kubernetes_cache.watch, "Watch", FakeWatch)
+    api = FakeCoreV1Api([make_pod("api")])
+    informer = make_informer(api)
+
+    informer.start()
+    assert informer.wait_until_ready(1)
+    first = informer._thread
+    informer.stop()
+
+    assert not informer.is_ready()
+    informer.start()
+    assert informer.wait_until_ready(1)
+    assert informer._thread is not first and informer._thread.is_alive()
+    first.join(1)
+    assert not first.is_alive()
+    informer.stop()
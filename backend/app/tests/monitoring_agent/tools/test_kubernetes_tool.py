@@ -0,0 +1,38 @@
+import pytest
+from kubernetes import client
+
+from app.monitoring_agent.tools import kubernetes_tool
+
+
+def make_pod(name: str, requests: dict[str, str], limits: dict[str, str] | None = None) -> client.V1Pod:
+    container = client.V1Container(
+        name="app", resources=client.V1ResourceRequirements(requests=requests, limits=limits)
+    )
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(name=name, namespace="default"), spec=client.V1PodSpec(containers=[container])
+    )
+
+
+def test_resource_table_normalizes_quantities() -> None:
+    table = kubernetes_tool.resource_table([make_pod("api", {"cpu": "250m", "memory": "128Mi"}, {"cpu": "1"})])
+
+    assert table == {
+        "pod": ["api"],
+        "container": ["app"],
+        "cpu_request": [250.0],
+        "cpu_limit": [1000.0],
+        "memory_request": [134217728.0],
+        "memory_limit": [None],
+    }
+
+
+def test_get_namespace_resources(monkeypatch: pytest.MonkeyPatch) -> None:
+    pods = [make_pod("worker", {"cpu": "100m"}), make_pod("api", {"memory": "1Gi"}, {"memory": "2Gi"})]
+    monkeypatch.setattr(kubernetes_tool, "list_pods", lambda namespace: pods)  # noqa: ARG005
+
+    result = kubernetes_tool.get_namespace_resources.invoke({"namespace": "default"})
+
+    assert result.splitlines()[1:] == [
+        "api | app | - | - | 1073741824 | 2147483648",
+        "worker | app | 100 | - | - | -",
+    ]
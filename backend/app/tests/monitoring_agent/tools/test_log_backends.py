@@ -0,0 +1,120 @@
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from kubernetes import client
+
+from app.monitoring_agent.tools.log_backends import FileLogBackend, KubernetesLogBackend, parse_log_filter
+from app.monitoring_agent.tools.log_fetch import LogWindowCache, format_timestamp
+
+START = datetime(2024, 7, 8, 16, 40, tzinfo=timezone.utc)
+
+WINDOW = f'timestamp>="{format_timestamp(START)}" timestamp<="{format_timestamp(START + timedelta(minutes=1))}"'
+
+
+def make_pod(name: str, app: str, containers: list[str]) -> client.V1Pod:
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(name=name, namespace="boutique", labels={"app": app}),
+        spec=client.V1PodSpec(containers=[client.V1Container(name=container) for container in containers]),
+    )
+
+
+class FakeCoreV1Api:
+    """
+    API server stub returning two timestamped lines per container
+    """
+
+    def __init__(self) -> None:
+        self.reads: list[tuple[str, str]] = []
+
+    def read_namespaced_pod_log(self, name: str, namespace: str, container: str, **kwargs: object) -> str:  # noqa: ARG002
+        self.reads.append((name, container))
+        offset = len(container)
+        return "\n".join([
+            f"2024-07-08T16:40:{offset:02d}.123456789Z INFO serving {container}",
+            f"2024-07-08T16:40:{offset + 10:02d}.000000000Z ERROR {container} failed",
+        ])
+
+
+class ChattyCoreV1Api:
+    """
+    API server stub with one line per second from the start of the window for two minutes, read forward from
+    since_seconds up to limit_bytes
+    """
+
+    def read_namespaced_pod_log(self, name: str, namespace: str, container: str, limit_bytes: int,  # noqa: ARG002
+                                **kwargs: object) -> str:
+        text = "\n".join(f"{format_timestamp(START + timedelta(seconds=i))} INFO request {i}" for i in range(120))
+        return text.encode()[:limit_bytes].decode()
+
+
+def test_parse_log_filter() -> None:
+    fields, min_severity = parse_log_filter(
+        'resource.labels.namespace_name="boutique" labels.k8s-pod/app="adservice" severity>=WARNING'
+    )
+
+    assert fields == {"resource.labels.namespace_name": "boutique", "labels.k8s-pod/app": "adservice"}
+    assert min_severity == "WARNING"
+
+
+def test_kubernetes_backend_reads_containers_concurrently() -> None:
+    api = FakeCoreV1Api()
+    pods = [make_pod("adservice-1", "adservice", ["server", "proxy"]), make_pod("cart-1", "cart", ["server"])]
+    backend = KubernetesLogBackend(lambda: api, lambda namespace: pods, LogWindowCache(), 10 ** 6)
+
+    entries, complete = backend.fetch(
+        f'resource.type="k8s_container" resource.labels.project_id="project" '
+        f'resource.labels.namespace_name="boutique" labels.k8s-pod/app="adservice" severity>=DEFAULT {WINDOW}'
+    )
+
+    assert complete
+    assert sorted(api.reads) == [("adservice-1", "proxy"), ("adservice-1", "server")]
+    assert [entry["textPayload"] for entry in entries] == [
+        "INFO serving proxy", "INFO serving server", "ERROR proxy failed", "ERROR server failed"
+    ]
+    assert entries[2]["severity"] == "ERROR"
+    assert entries[0]["resource"]["labels"]["container_name"] == "proxy"
+
+
+def test_file_backend_applies_the_filter(tmp_path: Path) -> None:
+    path = tmp_path / "logs.jsonl"
+    with path.open("w") as file:
+        for i in range(120):
+            file.write(json.dumps({
+                "timestamp": format_timestamp(START + timedelta(seconds=i)),
+                "severity": "ERROR" if i % 10 == 0 else "INFO",
+                "textPayload": f"request {i}",
+                "resource": {"labels": {"namespace_name": "boutique"}},
+            }) + "\n")
+    backend = FileLogBackend(str(path), LogWindowCache(), 10 ** 6)
+
+    entries, complete = backend.fetch(f'resource.labels.namespace_name="boutique" severity>=ERROR {WINDOW}')
+
+    assert complete
+    assert [entry["textPayload"] for entry in entries] == [f"request {i}" for i in range(0, 61, 10)]
+
+
+def test_kubernetes_backend_marks_the_read_limit() -> None:
+    pods = [make_pod("adservice-1", "adservice", ["server"])]
+    cache = LogWindowCache(settle=0)
+    backend = KubernetesLogBackend(lambda: ChattyCoreV1Api(), lambda namespace: pods, cache, 10 ** 6,
+                                   limit_bytes=1000)
+
+    entries, complete = backend.fetch(f'resource.labels.namespace_name="boutique" {WINDOW}')
+
+    # The window stops at the last line read, only the part before it is cached
+    assert not complete
+    assert 0 < len(entries) < 30
+    assert entries[-1]["textPayload"] == f"INFO request {len(entries) - 1}"
+    assert cache.missing('resource.labels.namespace_name="boutique"', START, START + timedelta(minutes=1))[0][0] == \
+           START + timedelta(seconds=len(entries) - 1)
+
+
+def test_kubernetes_backend_reads_a_past_window() -> None:
+    pods = [make_pod("adservice-1", "adservice", ["server"])]
+    backend = KubernetesLogBackend(lambda: ChattyCoreV1Api(), lambda namespace: pods, LogWindowCache(), 10 ** 6)
+
+    entries, complete = backend.fetch(f'resource.labels.namespace_name="boutique" {WINDOW}')
+
+    assert complete
+    assert [entry["textPayload"] for entry in entries] == [f"INFO request {i}" for i in range(61)]
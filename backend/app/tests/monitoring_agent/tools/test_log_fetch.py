@@ -0,0 +1,113 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app.monitoring_agent.tools.log_fetch import LogWindowCache, format_timestamp, split_time_window
+
+START = datetime(2024, 7, 8, 16, 40, tzinfo=timezone.utc)
+
+
+class FakeLogs:
+    """
+    Log source with one entry per second, recording the windows fetched
+    """
+
+    def __init__(self) -> None:
+        self.windows: list[tuple[datetime, datetime]] = []
+        self.consumed = 0
+
+    def fetch_range(self, start: datetime, end: datetime):
+        self.windows.append((start, end))
+        timestamp = start
+        while timestamp < end:
+            self.consumed += 1
+            yield {"timestamp": format_timestamp(timestamp), "textPayload": "request served"}
+            timestamp += timedelta(seconds=1)
+
+
+def test_split_time_window() -> None:
+    resource, start, end = split_time_window(
+        'resource.labels.namespace_name="boutique" timestamp>="2024-07-08T16:40:00Z" '
+        'timestamp<="2024-07-08T16:41:00Z"'
+    )
+
+    assert resource == 'resource.labels.namespace_name="boutique"'
+    assert start == START
+    assert end == START + timedelta(minutes=1, microseconds=1)
+
+
+def test_split_time_window_removes_the_operators() -> None:
+    resource, start, end = split_time_window(
+        'resource.type="k8s_container" AND severity>=ERROR AND timestamp>="2024-07-08T16:40:00Z" AND '
+        'timestamp<="2024-07-08T16:41:00Z"'
+    )
+    assert resource == 'resource.type="k8s_container" AND severity>=ERROR'
+    assert (start, end) == (START, START + timedelta(minutes=1, microseconds=1))
+
+    resource, _, _ = split_time_window('timestamp>="2024-07-08T16:40:00Z" AND severity>=ERROR')
+    assert resource == 'severity>=ERROR'
+
+
+def test_overlapping_window_fetches_only_the_missing_part() -> None:
+    cache, logs = LogWindowCache(), FakeLogs()
+
+    first, complete = cache.fetch("pod", START, START + timedelta(seconds=60), logs.fetch_range, 10 ** 6)
+    second, _ = cache.fetch("pod", START + timedelta(seconds=30), START + timedelta(seconds=90), logs.fetch_range,
+                            10 ** 6)
+
+    assert complete
+    assert len(first) == 60 and len(second) == 60
+    assert logs.windows[1] == (START + timedelta(seconds=60), START + timedelta(seconds=90))
+    assert logs.consumed == 90
+
+
+def test_budget_stops_the_stream() -> None:
+    cache, logs = LogWindowCache(), FakeLogs()
+
+    entries, complete = cache.fetch("pod", START, START + timedelta(hours=1), logs.fetch_range, 1000)
+
+    assert not complete
+    assert 0 < len(entries) < 20
+    assert logs.consumed == len(entries) + 1
+    # The part read before the budget was reached is cached, the next call resumes from the last entry
+    assert cache.missing("pod", START, START + timedelta(hours=1))[0][0] == START + timedelta(seconds=len(entries) - 1)
+
+
+def test_concurrent_fetches_do_not_duplicate_entries() -> None:
+    cache, logs = LogWindowCache(), FakeLogs()
+    results = []
+    barrier = threading.Barrier(4)
+
+    def fetch() -> None:
+        barrier.wait()
+        results.append(cache.fetch("pod", START, START + timedelta(seconds=60), logs.fetch_range, 10 ** 6)[0])
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert logs.consumed == 60
+    assert all(len(entries) == 60 for entries in results)
+    assert len(cache.entries("pod", START, START + timedelta(seconds=60))) == 60
+
+
+def test_budget_stops_before_the_next_cached_segment() -> None:
+    cache, logs = LogWindowCache(), FakeLogs()
+    cache.fetch("pod", START + timedelta(seconds=600), START + timedelta(seconds=660), logs.fetch_range, 10 ** 6)
+
+    entries, complete = cache.fetch("pod", START, START + timedelta(seconds=660), logs.fetch_range, 1000)
+
+    # The entries stop at the budget, the cached segment after the missing part is not returned
+    assert not complete
+    assert 0 < len(entries) < 20
+    assert entries[-1]["timestamp"] == format_timestamp(START + timedelta(seconds=len(entries) - 1))
+
+
+def test_resource_locks_do_not_outlive_the_fetches() -> None:
+    cache, logs = LogWindowCache(), FakeLogs()
+
+    for i in range(100):
+        cache.fetch(f"pod-{i}", START, START + timedelta(seconds=1), logs.fetch_range, 10 ** 6)
+
+    assert len(cache.resource_locks) == 0
@@ -0,0 +1,60 @@
+from app.monitoring_agent.tools.log_templates import TemplateMiner, entry_message
+
+
+def test_similar_lines_share_a_template() -> None:
+    miner = TemplateMiner()
+    for i in range(5):
+        miner.add(f"received ad request for user {1000 + i} in {i * 3}ms", "INFO", f"2024-07-08T16:41:0{i}Z")
+    miner.add("failed to retrieve ads: connection refused", "ERROR", "2024-07-08T16:41:03Z")
+
+    ranked = miner.ranked()
+
+    assert len(ranked) == 2
+    assert ranked[0].severity == "ERROR"
+    assert ranked[1].template == "received ad request for user <*> in <*>"
+    assert ranked[1].count == 5
+    assert (ranked[1].first, ranked[1].last) == ("2024-07-08T16:41:00Z", "2024-07-08T16:41:04Z")
+
+
+def test_rarest_templates_first_within_a_severity() -> None:
+    miner = TemplateMiner()
+    for _ in range(3):
+        miner.add("cache refreshed", "INFO")
+    miner.add("leader election lost", "INFO")
+
+    assert [template.template for template in miner.ranked()] == ["leader election lost", "cache refreshed"]
+    assert miner.summary().splitlines()[0] == "4 entries in 2 templates, showing 2"
+
+
+def test_template_cap_applies_to_new_groups() -> None:
+    miner = TemplateMiner(max_templates=3)
+    miner.add("cache refreshed", "INFO")
+    miner.add("leader election lost", "INFO")
+    for i in range(5):
+        miner.add(f"{'word ' * (i + 1)}failed", "ERROR", f"2024-07-08T16:41:0{i}Z")
+
+    templates = miner.ranked()
+
+    assert len(templates) == 3
+    assert (templates[0].template, templates[0].count, templates[0].severity) == ("<*>", 5, "ERROR")
+    assert (templates[0].first, templates[0].last) == ("2024-07-08T16:41:00Z", "2024-07-08T16:41:04Z")
+
+
+def test_summary_fits_the_character_budget() -> None:
+    miner = TemplateMiner()
+    miner.add(entry_message({"jsonPayload": {"stack": "x" * 5000}}), "ERROR")
+    for i in range(100):
+        miner.add(f"{'word ' * (i % 20 + 1)}{'step ' * (i // 20)}done", "INFO")
+
+    summary = miner.summary(limit=200, max_chars=2000, max_template_chars=100)
+    lines = summary.splitlines()
+
+    assert len(summary) <= 2000 + len(lines[0]) + len(lines[1])
+    assert len(lines) - 2 < len(miner.templates)
+    assert lines[2].endswith("x" * 83 + "...")
+    assert lines[0] == f"101 entries in {len(miner.templates)} templates, showing {len(lines) - 2}"
+
+
+def test_entry_message_from_json_payload() -> None:
+    assert entry_message({"jsonPayload": {"message": "request failed", "code": 500}}) == "request failed"
+    assert entry_message({"textPayload": "GET /healthz 200"}) == "GET /healthz 200"
@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+
+import yaml
+from kubernetes import client
+
+from app.monitoring_agent.tools.pod_spec import PodSpecRenderer, render_pod_spec
+
+
+def make_pod(resource_version: str = "1") -> client.V1Pod:
+    container = client.V1Container(
+        name="server",
+        image="adservice:v1",
+        resources=client.V1ResourceRequirements(limits={"memory": "300Mi"}),
+        env=[client.V1EnvVar(name="PORT", value="9555")],
+        liveness_probe=client.V1Probe(
+            tcp_socket=client.V1TCPSocketAction(port=9555), period_seconds=10, timeout_seconds=1,
+            initial_delay_seconds=20,
+        ),
+        termination_message_path="/dev/termination-log",
+    )
+    status = client.V1ContainerStatus(
+        name="server",
+        image="adservice:v1",
+        image_id="sha256:abc",
+        ready=True,
+        restart_count=3,
+        last_state=client.V1ContainerState(
+            terminated=client.V1ContainerStateTerminated(
+                exit_code=137, reason="OOMKilled", finished_at=datetime(2024, 7, 8, 16, 41, tzinfo=timezone.utc)
+            )
+        ),
+    )
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(
+            name="adservice", namespace="boutique", resource_version=resource_version,
+            managed_fields=[client.V1ManagedFieldsEntry(manager="kubectl", operation="Update")],
+        ),
+        spec=client.V1PodSpec(containers=[container], node_name="node-1"),
+        status=client.V1PodStatus(phase="Running", container_statuses=[status]),
+    )
+
+
+def test_render_pod_spec() -> None:
+    spec = yaml.safe_load(render_pod_spec(make_pod()))
+
+    assert spec["phase"] == "Running"
+    assert "managedFields" not in spec
+    assert spec["containers"] == [{
+        "name": "server",
+        "image": "adservice:v1",
+        "resources": {"limits": {"memory": "300Mi"}},
+        "livenessProbe": {"initialDelaySeconds": 20, "tcpSocket": {"port": 9555}},
+        "env": ["PORT"],
+        "restartCount": 3,
+        "lastTermination": {"reason": "OOMKilled", "exitCode": 137, "finishedAt": "2024-07-08T16:41:00+00:00"},
+    }]
+
+
+def test_render_pod_spec_projection() -> None:
+    spec = yaml.safe_load(render_pod_spec(make_pod(), ["restartCount"]))
+
+    assert spec["containers"] == [{"name": "server", "restartCount": 3}]
+
+
+def test_renderer_caches_by_resource_version() -> None:
+    renderer = PodSpecRenderer()
+
+    renderer.render(make_pod("1"))
+    renderer.render(make_pod("1"))
+    renderer.render(make_pod("2"))
+
+    assert renderer.cache.stats()["hits"] == 1
+    assert renderer.cache.stats()["size"] == 2
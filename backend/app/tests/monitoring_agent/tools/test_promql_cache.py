@@ -0,0 +1,64 @@
+from typing import Any
+
+from app.monitoring_agent.tools.promql_cache import PromQLCache, normalize_query
+
+
+class FakePrometheusClient:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, float | None]] = []
+
+    def query(self, query: str, time: float | None = None) -> list[Any]:
+        self.calls.append((query, time))
+        return [{"metric": {"pod": "pod1"}, "value": [time, "0.85"]}]
+
+
+def test_normalize_query_whitespace_and_label_order() -> None:
+    query_a = 'sum(rate(container_cpu_usage_seconds_total{namespace="default", pod="pod1"}[5m])) by (pod)'
+    query_b = 'sum( rate(container_cpu_usage_seconds_total{pod="pod1",namespace="default"}[5m]) )  by (pod)'
+    assert normalize_query(query_a) == normalize_query(query_b)
+
+
+def test_normalize_query_keeps_string_literals() -> None:
+    query_a = 'up{job="my  job"}'
+    query_b = 'up{job="my job"}'
+    assert normalize_query(query_a) != normalize_query(query_b)
+
+
+def test_normalize_query_sorts_grouping_labels() -> None:
+    assert normalize_query("sum by (pod, namespace) (up)") == normalize_query("sum by (namespace,pod) (up)")
+
+
+def test_cache_hits_in_same_bucket() -> None:
+    client = FakePrometheusClient()
+    cache = PromQLCache(client, ttl=30, step=15)  # type: ignore[arg-type]
+
+    first = cache.query('up{a="1", b="2"}', now=100)
+    second = cache.query('up{b="2",a="1"}', now=104)
+
+    assert first == second
+    assert client.calls == [('up{a="1", b="2"}', 90)]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_misses_in_new_bucket() -> None:
+    client = FakePrometheusClient()
+    cache = PromQLCache(client, ttl=30, step=15)  # type: ignore[arg-type]
+
+    cache.query("up", now=100)
+    cache.query("up", now=106)
+
+    assert [call[1] for call in client.calls] == [90, 105]
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    client = FakePrometheusClient()
+    cache = PromQLCache(client, ttl=30, step=15, max_size=2)  # type: ignore[arg-type]
+
+    cache.query("a", now=100)
+    cache.query("b", now=100)
+    cache.query("a", now=100)
+    cache.query("c", now=100)
+    cache.query("b", now=100)
+
+    assert [call[0] for call in client.calls] == ["a", "b", "c", "b"]
@@ -0,0 +1,91 @@
+import functools
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import pytest
+from langchain_core.caches import BaseCache
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from app.monitoring_agent import agent_nodes, main
+from app.monitoring_agent.agent import create_agent
+from app.monitoring_agent.prompt_compiler import compile_system_prompt
+from app.tests.support.fake_llm import ScriptedChatModel, final, tool_calls
+
+# Task and tools of each agent of the workflow
+agent_tasks = {
+    "metric_analyser": ("analyse_metric_task", agent_nodes.metric_analyser_tools),
+    "diagnostic": ("diagnose_issue_task", agent_nodes.diagnostic_tools),
+    "solution": ("provide_solution_task", agent_nodes.solution_tools),
+    "incident_reporter": ("report_incident_task", agent_nodes.incident_tools),
+}
+
+HOT_POD = "app-0-7d9c8f6b7-x2k4p"
+
+
+def requested_namespace(messages: List[BaseMessage]) -> str:
+    """
+    Namespace of the analysis request, the first human message of the prompt
+    """
+    request = next(message for message in messages if isinstance(message, HumanMessage))
+    return re.search(r"namespaces ([\w-]+)", request.content).group(1)
+
+
+def incident_script(namespace: str) -> Dict[str, List[Any]]:
+    """
+    Script of a run finding the hot pod of each namespace, diagnosing the one of the given namespace from its logs,
+    spec and metrics, and reporting a solution
+    """
+    now = datetime.now(timezone.utc)
+    window = f'timestamp>="{(now - timedelta(minutes=5)):%Y-%m-%dT%H:%M:%SZ}" timestamp<="{now:%Y-%m-%dT%H:%M:%SZ}"'
+
+    def analyse(messages: List[BaseMessage]) -> AIMessage:
+        ns = requested_namespace(messages)
+        return tool_calls(
+            ("get_namespace_resources", {"namespace": ns}),
+            ("execute_prometheus_queries", {"queries": [
+                f'sum(rate(container_cpu_usage_seconds_total{{namespace="{ns}"}}[5m])) by (pod)',
+                f'sum(container_memory_working_set_bytes{{namespace="{ns}"}}) by (pod)',
+            ]}),
+        )
+
+    def report(messages: List[BaseMessage]) -> AIMessage:
+        ns = requested_namespace(messages)
+        return final(f"Pod {HOT_POD} of {ns} uses 95% of its CPU and memory limits. DIAGNOSTIC NEEDED")
+
+    return {
+        "metric_analyser": [analyse, report],
+        "diagnostic": [
+            tool_calls(
+                ("get_pod_logs", {"logs_filter": f'resource.type="k8s_container" resource.labels.namespace_name='
+                                                 f'"{namespace}" labels.k8s-pod/app="app-0" severity>=DEFAULT {window}'}),
+                ("get_pod_yaml", {"pod": HOT_POD, "namespace": namespace}),
+                ("execute_prometheus_range_query", {
+                    "query": f'sum(container_memory_working_set_bytes{{namespace="{namespace}", pod="{HOT_POD}"}})',
+                    "minutes": 30,
+                }),
+            ),
+            final(f"{HOT_POD} fails to allocate buffers and runs out of memory close to its 256Mi limit. "
+                  f"GENERATE SOLUTIONS"),
+        ],
+        "solution": [final("Raise the memory limit of the server container of app-0 to 512Mi and its CPU limit to "
+                           "1 core.")],
+        "incident_reporter": [final(f"Incident report: {HOT_POD} in {namespace} runs out of memory. Raise its limits. "
+                                    f"FINISHED")],
+    }
+
+
+def install_scripted_agents(monkeypatch: pytest.MonkeyPatch, script: Dict[str, List[Any]], latency: float = 0.0,
+                            token_latency: float = 0.0, streaming: bool = False,
+                            cache: BaseCache | None = None) -> Dict[str, ScriptedChatModel]:
+    """
+    Replace the LLM of every agent of the graph built by main.generate_graph with a scripted model. The agents keep
+    their prompt, tools and message view.
+    """
+    models = {}
+    for name, (task, tools) in agent_tasks.items():
+        models[name] = ScriptedChatModel(agent=name, responses=script[name], latency=latency,
+                                         token_latency=token_latency, streaming=streaming, cache=cache)
+        agent = create_agent(models[name], tools, compile_system_prompt(task, tuple(tool.name for tool in tools)))
+        monkeypatch.setattr(main, f"{name}_node", functools.partial(agent_nodes.agent_node, agent=agent, name=name))
+    return models
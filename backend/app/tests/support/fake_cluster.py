@@ -0,0 +1,244 @@
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pytest
+from kubernetes import client
+
+from app.monitoring_agent import pre_analysis
+from app.monitoring_agent.tools import kubernetes_tool, prometheus_tool
+from app.monitoring_agent.tools.log_backends import LogBackend, matches, parse_log_filter
+from app.monitoring_agent.tools.log_fetch import LogWindowCache, format_timestamp
+from app.monitoring_agent.tools.node_snapshot import NodeSnapshotService
+from app.monitoring_agent.tools.promql_cache import PromQLCache
+
+PodKey = Tuple[str, str]
+
+CPU_LIMIT = 0.5
+MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Metric names of the queries, mapped to the usage they return
+_metric_kinds = [
+    ("container_cpu_usage", "cpu"),
+    ("container_memory", "memory"),
+    ("container_network", "network"),
+    ("http_request_duration", "latency"),
+    ("http_requests_total", "rps"),
+]
+
+_label = re.compile(r'\b(namespace|pod)\s*(=~|=)\s*"([^"]*)"')
+
+
+class FakeCluster:
+    """
+    In-memory cluster of a few namespaces of pods. The hot pods use 95% of their CPU and memory limits and log errors,
+    the other pods 20%. Every backend call waits latency seconds.
+    """
+
+    def __init__(self, namespaces: List[str], pods_per_namespace: int = 4, hot_pods: int = 1, nodes: int = 3,
+                 latency: float = 0.0, entries_per_minute: int = 600):
+        self.namespaces = namespaces
+        self.latency = latency
+        self.entries_per_minute = entries_per_minute
+        self.pods: Dict[PodKey, client.V1Pod] = {}
+        self.usage: Dict[PodKey, Dict[str, float]] = {}
+        for namespace in namespaces:
+            for i in range(pods_per_namespace):
+                pod = make_pod(namespace, f"app-{i}", f"node-{i % nodes}")
+                ratio = 0.95 if i < hot_pods else 0.2
+                self.pods[(namespace, pod.metadata.name)] = pod
+                self.usage[(namespace, pod.metadata.name)] = {
+                    "cpu": CPU_LIMIT * ratio, "memory": MEMORY_LIMIT * ratio, "network": 1000.0, "rps": 10.0,
+                    "latency": 0.05,
+                }
+        self.nodes = [make_node(f"node-{i}") for i in range(nodes)]
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def is_hot(self, key: PodKey) -> bool:
+        return self.usage[key]["cpu"] > CPU_LIMIT * 0.9
+
+    def select(self, query: str) -> List[PodKey]:
+        """
+        Pods matching the namespace and pod selectors of a PromQL query
+        """
+        keys = list(self.pods)
+        for label, operator, value in _label.findall(query):
+            index = 0 if label == "namespace" else 1
+            if operator == "=~":
+                keys = [key for key in keys if re.fullmatch(value, key[index])]
+            else:
+                keys = [key for key in keys if key[index] == value]
+        return keys
+
+
+def make_pod(namespace: str, app: str, node: str) -> client.V1Pod:
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(name=f"{app}-7d9c8f6b7-x2k4p", namespace=namespace, labels={"app": app}),
+        spec=client.V1PodSpec(node_name=node, containers=[client.V1Container(
+            name="server",
+            image=f"registry.example.com/{app}:1.0.0",
+            resources=client.V1ResourceRequirements(
+                requests={"cpu": "250m", "memory": "128Mi"}, limits={"cpu": "500m", "memory": "256Mi"}
+            ),
+        )]),
+        status=client.V1PodStatus(phase="Running", container_statuses=[client.V1ContainerStatus(
+            name="server", image=f"registry.example.com/{app}:1.0.0", image_id="", ready=True, restart_count=0,
+        )]),
+    )
+
+
+def make_node(name: str) -> client.V1Node:
+    return client.V1Node(
+        metadata=client.V1ObjectMeta(name=name),
+        status=client.V1NodeStatus(
+            capacity={"cpu": "4", "memory": "16Gi", "pods": "110"},
+            allocatable={"cpu": "3920m", "memory": "14Gi", "pods": "110"},
+        ),
+    )
+
+
+class FakeCoreV1Api:
+    """
+    The calls of CoreV1Api used by the tools, served from the fake cluster
+    """
+
+    def __init__(self, cluster: FakeCluster):
+        self.cluster = cluster
+
+    def list_namespaced_pod(self, namespace: str, **kwargs: Any) -> client.V1PodList:
+        self.cluster.wait()
+        return client.V1PodList(items=[pod for key, pod in self.cluster.pods.items() if key[0] == namespace])
+
+    def list_pod_for_all_namespaces(self, **kwargs: Any) -> client.V1PodList:
+        self.cluster.wait()
+        return client.V1PodList(items=list(self.cluster.pods.values()))
+
+    def read_namespaced_pod(self, name: str, namespace: str, **kwargs: Any) -> client.V1Pod:
+        self.cluster.wait()
+        if (namespace, name) not in self.cluster.pods:
+            raise client.ApiException(status=404, reason=f'pods "{name}" not found')
+        return self.cluster.pods[(namespace, name)]
+
+    def list_node(self, **kwargs: Any) -> client.V1NodeList:
+        self.cluster.wait()
+        return client.V1NodeList(items=self.cluster.nodes)
+
+
+class FakeMetricsApi:
+    """
+    The node metrics of the metrics API, served from the fake cluster
+    """
+
+    def __init__(self, cluster: FakeCluster):
+        self.cluster = cluster
+
+    def list_cluster_custom_object(self, group: str, version: str, plural: str) -> Dict[str, Any]:
+        self.cluster.wait()
+        return {"items": [
+            {"metadata": {"name": node.metadata.name}, "usage": {"cpu": "1500000000n", "memory": "6Gi"}}
+            for node in self.cluster.nodes
+        ]}
+
+
+class FakePrometheusClient:
+    """
+    Prometheus answering the instant and range queries with the usage of the pods selected by the query
+    """
+
+    def __init__(self, cluster: FakeCluster):
+        self.cluster = cluster
+
+    def is_healthy(self) -> bool:
+        return True
+
+    def kind(self, query: str) -> str | None:
+        return next((kind for metric, kind in _metric_kinds if metric in query), None)
+
+    def query(self, query: str, time: float | None = None) -> List[Dict[str, Any]]:
+        self.cluster.wait()
+        kind = self.kind(query)
+        if kind is None:
+            return []
+        usage = self.cluster.usage
+        return [
+            {"metric": {"namespace": namespace, "pod": pod}, "value": [time, str(usage[(namespace, pod)][kind])]}
+            for namespace, pod in self.cluster.select(query)
+        ]
+
+    def query_range(self, query: str, start: float, end: float, step: float) -> List[Dict[str, Any]]:
+        self.cluster.wait()
+        kind = self.kind(query)
+        if kind is None:
+            return []
+        steps = int((end - start) // step) + 1
+        return [
+            {
+                "metric": {"namespace": namespace, "pod": pod},
+                "values": [[start + i * step, str(self.cluster.usage[(namespace, pod)][kind])] for i in range(steps)],
+            }
+            for namespace, pod in self.cluster.select(query)
+        ]
+
+
+class FakeLogBackend(LogBackend):
+    """
+    Logs generated for the pods of the fake cluster, entries_per_minute request lines per pod where every 20th line of
+    the hot pods is an out of memory error
+    """
+
+    def __init__(self, cluster: FakeCluster, cache: LogWindowCache, budget: int):
+        super().__init__(cache, budget)
+        self.cluster = cluster
+
+    def stream(self, resource: str, start: datetime | None, end: datetime | None) -> Iterator[Dict[str, Any]]:
+        self.cluster.wait()
+        fields, min_severity = parse_log_filter(resource)
+        end = end or datetime.now(timezone.utc)
+        start = start or end - timedelta(minutes=5)
+        interval = timedelta(minutes=1) / self.cluster.entries_per_minute
+
+        pods = [(key, pod) for key, pod in self.cluster.pods.items()
+                if fields.get("resource.labels.namespace_name", key[0]) == key[0]]
+        timestamp, i = start, 0
+        while timestamp < end:
+            for key, pod in pods:
+                if self.cluster.is_hot(key) and i % 20 == 0:
+                    severity, message = "ERROR", f"failed to allocate buffer of {4096 + i} bytes: out of memory"
+                else:
+                    severity, message = "INFO", f"GET /api/products/{i % 97} 200 {i % 13 + 2}ms"
+                entry = {
+                    "timestamp": format_timestamp(timestamp),
+                    "severity": severity,
+                    "textPayload": message,
+                    "resource": {"type": "k8s_container", "labels": {
+                        "namespace_name": key[0], "pod_name": key[1], "container_name": "server",
+                    }},
+                    "labels": {"k8s-pod/app": pod.metadata.labels["app"]},
+                }
+                if matches(entry, fields, min_severity):
+                    yield entry
+            timestamp, i = timestamp + interval, i + 1
+
+
+def install_fake_cluster(monkeypatch: pytest.MonkeyPatch, cluster: FakeCluster) -> None:
+    """
+    Point the Prometheus, Kubernetes and logging clients of the tools and the pre-analysis to the fake cluster
+    """
+    core_api, metrics_api, prometheus = FakeCoreV1Api(cluster), FakeMetricsApi(cluster), FakePrometheusClient(cluster)
+    promql_cache = PromQLCache(prometheus, ttl=0)  # type: ignore[arg-type]
+    node_snapshots = NodeSnapshotService(kubernetes_tool.list_nodes, lambda: metrics_api, ttl=0)
+
+    monkeypatch.setattr(kubernetes_tool, "informers_enabled", False)
+    monkeypatch.setattr(kubernetes_tool.k8s_config, "get_client", lambda: core_api)
+    monkeypatch.setattr(kubernetes_tool, "node_snapshots", node_snapshots)
+    monkeypatch.setattr(kubernetes_tool, "log_backend", FakeLogBackend(
+        cluster, LogWindowCache(ttl=0), kubernetes_tool.log_fetch_budget
+    ))
+    monkeypatch.setattr(prometheus_tool, "prometheus", prometheus)
+    monkeypatch.setattr(prometheus_tool, "promql_cache", promql_cache)
+    monkeypatch.setattr(pre_analysis, "promql_cache", promql_cache)
+    monkeypatch.setattr(pre_analysis, "node_snapshots", node_snapshots)
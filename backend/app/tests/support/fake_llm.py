@@ -0,0 +1,107 @@
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Union
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.chat_models import agenerate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import BaseTool
+
+Response = Union[AIMessage, Callable[[List[BaseMessage]], AIMessage]]
+
+
+def tool_calls(*calls: tuple[str, Dict[str, Any]]) -> AIMessage:
+    """
+    Scripted response calling the tools, each call is a (name, args) pair
+    """
+    return AIMessage(content="", tool_calls=[
+        {"name": name, "args": args, "id": f"call_{name}_{i}"} for i, (name, args) in enumerate(calls)
+    ])
+
+
+def final(content: str) -> AIMessage:
+    """
+    Scripted response ending the turn of an agent
+    """
+    return AIMessage(content=content)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model answering with a predefined script instead of calling a provider. The n-th response of the script is
+    returned when the messages already contain n responses of the agent, so concurrent branches of the same agent
+    each follow the script from the start. A response is either a message or a function of the messages.
+
+    The model waits latency seconds before answering and token_latency seconds between the streamed chunks.
+    """
+
+    agent: str
+    responses: List[Any]
+    latency: float = 0.0
+    token_latency: float = 0.0
+    chunk_size: int = 8
+    streaming: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Sequence[BaseTool], **kwargs: Any):
+        """
+        Bind the tools like a provider model, the scripted tool calls must use one of them
+        """
+        return self.bind(tools=[tool.name for tool in tools])
+
+    def turn(self, messages: List[BaseMessage]) -> int:
+        return sum(1 for message in messages if isinstance(message, AIMessage) and message.name == self.agent)
+
+    def respond(self, messages: List[BaseMessage], tools: Optional[List[str]] = None) -> AIMessage:
+        """
+        Next response of the script, the last one is repeated once the script is exhausted
+        """
+        response: Response = self.responses[min(self.turn(messages), len(self.responses) - 1)]
+        message = response(messages) if callable(response) else response
+        for tool_call in message.tool_calls:
+            if tool_call["name"] not in (tools or []):
+                raise ValueError(f"Scripted tool call to {tool_call['name']} which is not bound to {self.agent}")
+        return AIMessage(content=message.content, tool_calls=message.tool_calls)
+
+    def chunks(self, message: AIMessage) -> List[AIMessageChunk]:
+        """
+        Split a response in chunks like a streamed provider response, the tool calls come in a single chunk
+        """
+        if message.tool_calls:
+            return [AIMessageChunk(content=message.content, tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ])]
+        content = message.content
+        return [AIMessageChunk(content=content[i:i + self.chunk_size]) for i in range(0, len(content), self.chunk_size)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages, kwargs.get("tools")))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        message = self.respond(messages, kwargs.get("tools"))
+        await asyncio.sleep(self.latency)
+        for i, chunk in enumerate(self.chunks(message)):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.streaming:
+            return await agenerate_from_stream(self._astream(messages, stop, run_manager, **kwargs))
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages, kwargs.get("tools")))])
@@ -26,6 +26,13 @@ class ConnectionManager:
             self.current_run_json.append(message)
             await connection.send_json(message)
 
+    async def send_frame(self, message: Any):
+        """
+        Send a transient message, like the tokens being generated, which is not replayed to the new connections
+        """
+        for connection in self.active_connections:
+            await connection.send_json(message)
+
     async def send_text(self, message: str):
         logging.warning(f"Sent message: {message}")
         for connection in self.active_connections: